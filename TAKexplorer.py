@@ -1,10 +1,12 @@
 import getopt
 import sys
+from contextlib import nullcontext
 from base_types import BoardSize
 
 import db_extractor
 import ptn_parser
 from position_db import PositionDataBase
+from profiling import Profiler
 from statistics_generator import StatisticsGenerator
 
 
@@ -19,16 +21,20 @@ def main(args):
         num_plies = 1
         num_games = sys.maxsize
         min_rating = 0
+        jobs = 1
+        profile = False
+        profile_file = None
 
         try:
-            opts, args = getopt.getopt(argv, "hi:o:p:n:r:b:w:",
+            opts, args = getopt.getopt(argv, "hi:o:p:n:r:b:w:j:",
                                        ["ifile=", "ofile=",
                                         "min_plies=", "max_games=", "min_rating=",
-                                        "black=", "white="])
+                                        "black=", "white=", "jobs=", "profile", "profile-json="])
         except getopt.GetoptError:
             print(
                 'TAKexplorer.py extract -i <database file> -o <output file> [ -p <minimum plies> ] [ -n <maximum '
-                'games> ] [ -r <minimum rating> ] [ -b <black player> ] [ -w <white player>]')
+                'games> ] [ -r <minimum rating> ] [ -b <black player> ] [ -w <white player>] [ -j <worker processes> ] '
+                '[ --profile ] [ --profile-json <output file> ]')
             sys.exit(2)
 
         player_black = None
@@ -38,7 +44,8 @@ def main(args):
             if opt == '-h':
                 print(
                     'TAKexplorer.py extract -i <database file> -o <output file> [ -p <minimum plies> ] [ -n <maximum '
-                    'games> ] [ -r <minimum rating> ] [ -b <black player> ] [ -w <white player>]')
+                    'games> ] [ -r <minimum rating> ] [ -b <black player> ] [ -w <white player>] [ -j <worker processes> ] '
+                    '[ --profile ] [ --profile-json <output file> ]')
                 sys.exit()
             elif opt in ('-i', '--ifile'):
                 db_file = arg
@@ -54,10 +61,22 @@ def main(args):
                 player_white = arg
             elif opt in ('-b', '--black'):
                 player_black = arg
-
-        with PositionDataBase(target_file) as db:
-            games = db_extractor.get_games_from_db(
-                db_file,
+            elif opt in ('-j', '--jobs'):
+                jobs = int(arg)
+            elif opt == '--profile':
+                profile = True
+            elif opt == '--profile-json':
+                profile = True
+                profile_file = arg
+
+        profiler = Profiler() if profile else None
+        if profiler is not None and jobs > 1:
+            print("profiling replays the games in this process, ignoring --jobs")
+            jobs = 1
+
+        with PositionDataBase(target_file) as db, (profiler.instrument() if profiler else nullcontext()):
+            games_query = dict(
+                db_file=db_file,
                 board_size=BoardSize(6),
                 num_plies=num_plies,
                 num_games=num_games,
@@ -67,9 +86,15 @@ def main(args):
                 start_id=db.max_id,
                 exclude_bots=True,
             )
-            ptn_parser.add_games_to_db(games, db)
+            games = db_extractor.get_games_from_db(**games_query)
+            ptn_parser.add_games_to_db(games, db, jobs=jobs, total=db_extractor.estimate_games_from_db(**games_query))
             db.commit()
 
+        if profiler is not None:
+            profiler.print_report()
+            if profile_file:
+                profiler.write_report(profile_file)
+
     elif task == 'explore':
         import data_collector  # pylint: disable=import-outside-toplevel
         data_collector.collector_main(argv[0])
@@ -117,8 +142,8 @@ def main(args):
             elif opt in ('-b', '--black'):
                 player_black = arg
 
-        games = db_extractor.get_games_from_db(
-            db_file,
+        games_query = dict(
+            db_file=db_file,
             board_size=BoardSize(6),
             num_plies=num_plies,
             num_games=num_games,
@@ -127,9 +152,10 @@ def main(args):
             player_white=player_white,
             exclude_bots=True
         )
+        games = db_extractor.get_games_from_db(**games_query)
 
         stats_gen = StatisticsGenerator(target_file)
-        ptn_parser.add_games_to_db(games, stats_gen)
+        ptn_parser.add_games_to_db(games, stats_gen, total=db_extractor.estimate_games_from_db(**games_query))
         stats_gen.print_results()
 
 
@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Generic, Hashable, Optional, TypeVar
+
+V = TypeVar('V')
+
+
+class VersionedLruCache(Generic[V]):
+    """
+    Thread safe, size bounded LRU cache whose entries belong to a database.
+    Every entry is tagged with the generation of its database when it was computed,
+    `invalidate` bumps the generation so older entries are dropped when they are requested next.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple[int, Hashable], tuple[int, V]] = OrderedDict()
+        self.generations: dict[int, int] = {}
+        self.lock = threading.Lock()
+
+    def generation(self, db_id: int) -> int:
+        """Current generation of `db_id`, read it before computing a value to `put`"""
+        return self.generations.get(db_id, 0)
+
+    def invalidate(self, db_id: int):
+        """Marks all entries of `db_id` as stale, e.g. after new games were imported"""
+        with self.lock:
+            self.generations[db_id] = self.generation(db_id) + 1
+
+    def get(self, db_id: int, key: Hashable) -> Optional[V]:
+        with self.lock:
+            entry = self.entries.get((db_id, key))
+            if entry is None:
+                return None
+            generation, value = entry
+            if generation != self.generation(db_id):
+                del self.entries[(db_id, key)]
+                return None
+            self.entries.move_to_end((db_id, key))
+            return value
+
+    def put(self, db_id: int, key: Hashable, value: V, generation: int):
+        """
+        Stores `value` computed while `db_id` was at `generation`.
+        Values computed before an invalidation are not stored.
+        """
+        with self.lock:
+            if generation != self.generation(db_id):
+                return
+            self.entries[(db_id, key)] = (generation, value)
+            self.entries.move_to_end((db_id, key))
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self) -> int:
+        return len(self.entries)
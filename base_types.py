@@ -1,4 +1,4 @@
-from typing import NewType, Union, Literal
+from typing import NewType, Optional, Union, Literal
 
 
 TpsSymmetry = NewType("TpsSymmetry", int)
@@ -7,6 +7,7 @@ TpsStringExpanded = NewType("TpsStringExpanded", str) # with xn expanded to x,x,
 NormalizedTpsString = NewType("NormalizedTpsString", str)
 BoardSize = NewType("BoardSize", int)
 PlayerToMove = Union[Literal["white"], Literal["black"]]
+ResultCategory = Union[Literal["white"], Literal["black"], Literal["draw"]]
 
 def color_to_place_from_tps(tps: str) -> PlayerToMove:
     """
@@ -24,3 +25,16 @@ def get_opponent(player_to_move: PlayerToMove) -> PlayerToMove:
     if player_to_move == "black":
         return "white"
     return "black"
+
+def result_category(result: str) -> Optional[ResultCategory]:
+    """
+    Who won a game with the playtak `result` (e.g. `R-0`, `0-F`, `1/2-1/2`).
+    `None` for results that are neither a win nor a draw.
+    """
+    if result.startswith('0-'):
+        return "black"
+    if result.endswith('-0'):
+        return "white"
+    if result == '1/2-1/2':
+        return "draw"
+    return None
@@ -0,0 +1,20 @@
+"""
+The benchmark cases for pytest-benchmark, which is not a dependency of the server:
+
+    pip install pytest-benchmark
+    python -m pytest benchmarks/bench_suite.py --benchmark-json results.json
+"""
+
+import pytest
+
+from benchmarks.cases import all_cases
+
+pytest.importorskip('pytest_benchmark')
+
+cases = all_cases()
+
+
+@pytest.mark.parametrize('case', cases, ids=[case.name for case in cases])
+def test_benchmark(benchmark, case):
+    benchmark.extra_info['items'] = case.items
+    benchmark(case.function)
@@ -0,0 +1,148 @@
+"""
+Benchmark cases of the engine and the import, shared by the standalone runner (`python -m benchmarks.run`)
+and pytest-benchmark (`python -m pytest benchmarks/bench_suite.py`).
+All cases work on a fixed corpus of random games, see `synthetic_games`.
+"""
+
+import io
+import os
+import random
+import tempfile
+from contextlib import redirect_stderr
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable
+
+import ptn_parser
+import symmetry_normalisator
+from base_types import BoardSize, TpsString, TpsSymmetry
+from db_extractor import get_moves_array, to_playtak_notation
+from position_db import PositionDataBase
+from synthetic_games import random_game
+from tak import GameState
+
+CORPUS_SEED = 1
+BOARD_SIZES = (3, 4, 5, 6, 7, 8)
+CORPUS_GAMES_PER_SIZE = 50
+CORPUS_MAX_PLIES = 60
+IMPORT_CORPUS_GAMES = 300
+IMPORT_BOARD_SIZE = 6
+IMPORT_MAX_PLIES = 30
+
+
+@dataclass
+class BenchmarkCase:
+    name: str
+    function: Callable[[], Any]
+    items: int # operations per call, to compare the time per operation
+
+
+@lru_cache(maxsize=None)
+def corpus(size: int, num_games: int = CORPUS_GAMES_PER_SIZE) -> list[tuple[list[str], str]]:
+    """PTN moves and result of random games, the same on every run"""
+    rng = random.Random(CORPUS_SEED * 100 + size)
+    return [random_game(rng, size, CORPUS_MAX_PLIES) for _ in range(num_games)]
+
+
+def import_corpus() -> list[dict]:
+    """Rows of the playtak `games` table of `IMPORT_CORPUS_GAMES` games, as read by `db_extractor.get_games_from_db`"""
+    players = ['alice', 'bob', 'carol', 'dave', 'TopazBot']
+    return [
+        {
+            'id': game_id,
+            'date': 1_500_000_000_000 + game_id * 60_000,
+            'size': IMPORT_BOARD_SIZE,
+            'player_white': players[game_id % len(players)],
+            'player_black': players[(game_id * 3 + 1) % len(players)],
+            'notation': to_playtak_notation(moves),
+            'result': result,
+            'komi': 0,
+            'rating_white': 1500,
+            'rating_black': 1500,
+            'tournament': 0,
+        }
+        for game_id, (moves, result) in enumerate(corpus(IMPORT_BOARD_SIZE, IMPORT_CORPUS_GAMES), start=1)
+    ]
+
+
+def replay(size: int, moves: list[str]) -> list[GameState]:
+    """Game states after every move of `moves`"""
+    game = GameState(size)
+    states = []
+    for move in moves:
+        game.move(move)
+        states.append(game.clone())
+    return states
+
+
+def engine_cases(size: int) -> list[BenchmarkCase]:
+    games = [moves for moves, _result in corpus(size)]
+    num_moves = sum(map(len, games))
+    states = [state for moves in games for state in replay(size, moves)]
+    tps_list = [TpsString(state.get_tps()) for state in states]
+    orientations = [TpsSymmetry(orientation) for orientation in range(8)]
+    notations = [to_playtak_notation(moves) for moves in games]
+    board_size = BoardSize(size)
+    # without the cache, which would answer every call after the first round
+    get_tps_orientation = symmetry_normalisator.get_tps_orientation.__wrapped__
+
+    def move():
+        for moves in games:
+            game = GameState(size)
+            for ptn in moves:
+                game.move(ptn)
+
+    def clone():
+        for state in states:
+            state.clone()
+
+    def get_tps():
+        for state in states:
+            state.row_tps = [None] * size
+            state.get_tps()
+
+    def tps_orientation():
+        for tps in tps_list:
+            get_tps_orientation(tps)
+
+    def transform_move():
+        for moves in games:
+            for ptn in moves:
+                for orientation in orientations:
+                    symmetry_normalisator.transform_move(ptn, orientation, board_size)
+
+    def transposed_transform_move():
+        for moves in games:
+            for ptn in moves:
+                for orientation in orientations:
+                    symmetry_normalisator.transposed_transform_move(ptn, orientation, board_size)
+
+    def moves_array():
+        for notation in notations:
+            get_moves_array(notation)
+
+    return [
+        BenchmarkCase(f"GameState.move[{size}]", move, num_moves),
+        BenchmarkCase(f"GameState.clone[{size}]", clone, len(states)),
+        BenchmarkCase(f"GameState.get_tps[{size}]", get_tps, len(states)),
+        BenchmarkCase(f"get_tps_orientation[{size}]", tps_orientation, len(tps_list)),
+        BenchmarkCase(f"transform_move[{size}]", transform_move, num_moves * len(orientations)),
+        BenchmarkCase(f"transposed_transform_move[{size}]", transposed_transform_move, num_moves * len(orientations)),
+        BenchmarkCase(f"get_moves_array[{size}]", moves_array, num_moves),
+    ]
+
+
+def import_case(jobs: int = 1) -> BenchmarkCase:
+    games = import_corpus()
+
+    def add_games_to_db():
+        with tempfile.TemporaryDirectory() as tmp_dir, redirect_stderr(io.StringIO()):
+            with PositionDataBase(os.path.join(tmp_dir, 'openings.db')) as db:
+                ptn_parser.add_games_to_db(games, db, max_plies=IMPORT_MAX_PLIES, jobs=jobs, total=len(games))
+                db.commit()
+
+    return BenchmarkCase(f"add_games_to_db[{IMPORT_BOARD_SIZE},jobs={jobs}]", add_games_to_db, len(games))
+
+
+def all_cases() -> list[BenchmarkCase]:
+    return [*(case for size in BOARD_SIZES for case in engine_cases(size)), import_case()]
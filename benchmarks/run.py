@@ -0,0 +1,99 @@
+"""
+Standalone runner of the benchmark cases (see `benchmarks/cases.py`), without pytest-benchmark.
+Writes the results as JSON and compares them to the results of an earlier run:
+
+    python -m benchmarks.run -o baseline.json
+    python -m benchmarks.run -o results.json --baseline baseline.json -k get_tps
+"""
+
+import argparse
+import json
+import platform
+import sqlite3
+import statistics
+import sys
+import timeit
+from datetime import datetime
+from typing import Optional
+
+from benchmarks.cases import BenchmarkCase, all_cases
+
+
+def measure(case: BenchmarkCase, rounds: int) -> dict:
+    """Seconds per call of `case`, each round calls it often enough to take at least 0.2 seconds"""
+    timer = timeit.Timer(case.function)
+    calls, _seconds = timer.autorange()
+    times = [seconds / calls for seconds in timer.repeat(repeat=rounds, number=calls)]
+    return {
+        'items': case.items,
+        'rounds': rounds,
+        'calls_per_round': calls,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+        'stdev': statistics.stdev(times) if rounds > 1 else 0.0,
+        'ns_per_item': min(times) / case.items * 1e9,
+    }
+
+
+def compare(results: dict, baseline: dict) -> dict[str, float]:
+    """Change of the fastest round of every benchmark in both runs, in percent"""
+    return {
+        name: (result['min'] / baseline[name]['min'] - 1) * 100
+        for name, result in results.items()
+        if name in baseline
+    }
+
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', help="JSON file to write the results to")
+    parser.add_argument('-k', '--filter', default='', help="only run benchmarks whose name contains this")
+    parser.add_argument('-r', '--rounds', type=int, default=5, help="rounds per benchmark")
+    parser.add_argument('--baseline', help="JSON file of an earlier run to compare with")
+    parser.add_argument(
+        '--max-regression', type=float, default=None,
+        help="exit with 1 if a benchmark got slower than the baseline by more than this many percent",
+    )
+    options = parser.parse_args(args)
+
+    baseline: Optional[dict] = None
+    if options.baseline:
+        with open(options.baseline, encoding='utf-8') as input_file:
+            baseline = json.load(input_file)['benchmarks']
+
+    results = {}
+    print(f"{'benchmark':<40} {'min ms':>10} {'median ms':>10} {'ns/item':>10} {'change':>8}")
+    for case in all_cases():
+        if options.filter not in case.name:
+            continue
+        result = measure(case, options.rounds)
+        results[case.name] = result
+        change = compare({case.name: result}, baseline).get(case.name) if baseline else None
+        print(
+            f"{case.name:<40} {result['min'] * 1e3:>10.3f} {result['median'] * 1e3:>10.3f} "
+            f"{result['ns_per_item']:>10.1f} {'' if change is None else f'{change:+.1f}%':>8}",
+            flush=True,
+        )
+
+    if options.output:
+        with open(options.output, 'w', encoding='utf-8') as output_file:
+            json.dump({
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'machine': platform.platform(),
+                'benchmarks': results,
+            }, output_file, indent=2)
+
+    if baseline is not None and options.max_regression is not None:
+        regressions = {name: change for name, change in compare(results, baseline).items() if change > options.max_regression}
+        for name, change in regressions.items():
+            print(f"{name} is {change:.1f}% slower than the baseline")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
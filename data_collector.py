@@ -96,7 +96,11 @@ class TAKexplorer:
         self.board_image.image = render
         self.tps.set(tps)
 
-        select_results_sql = f"SELECT * FROM positions WHERE tps='{sym_tps}';"
+        select_results_sql = f"""
+            SELECT positions.*, IFNULL(SUM(position_results.white), 0) AS wwins, IFNULL(SUM(position_results.black), 0) AS bwins
+            FROM positions LEFT JOIN position_results ON position_results.position_id = positions.id
+            WHERE tps='{sym_tps}'
+            GROUP BY positions.id;"""
 
         cur.execute(select_results_sql)
         row = dict(cur.fetchone())
@@ -106,14 +110,8 @@ class TAKexplorer:
         textvar = f"white <- {row['wwins']}  :  {row['bwins']} -> black"
         self.win_rate.set(textvar)
 
-        position_moves = row['moves']
-        if position_moves == '':
-            position_moves = []
-        else:
-            position_moves = position_moves.split(';')
-
-        moves_list = list(map(lambda x: x.split(','), position_moves))
-        moves_list.sort(key=lambda x: int(x[2]), reverse=True)
+        cur.execute("SELECT move, next_position_id FROM position_moves WHERE position_id=?;", (pos_id,))
+        moves_list = cur.fetchall()
 
         result = []
 
@@ -136,7 +134,11 @@ class TAKexplorer:
             tps = cloned_game.get_tps()
             tps = symmetry_normalisator.transform_tps(tps, symmetry_normalisator.get_tps_orientation(tps)[1])
 
-            select_results_sql = f"SELECT * FROM positions WHERE tps='{tps}';"
+            select_results_sql = f"""
+                SELECT positions.*, IFNULL(SUM(position_results.white), 0) AS wwins, IFNULL(SUM(position_results.black), 0) AS bwins
+                FROM positions LEFT JOIN position_results ON position_results.position_id = positions.id
+                WHERE tps='{tps}'
+                GROUP BY positions.id;"""
 
             cur.execute(select_results_sql)
             exe_res = cur.fetchone()
@@ -0,0 +1,71 @@
+import os
+import sqlite3
+import threading
+from typing import Optional
+from urllib.parse import quote
+
+# bytes of the database file SQLite may map into memory, shared by all connections through the OS page cache
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+# page cache of each connection in KiB (negative values are KiB for `PRAGMA cache_size`)
+DEFAULT_CACHE_SIZE_KIB = 16 * 1024
+
+
+def read_only_uri(db_file: str) -> str:
+    """URI opening `db_file` read-only, with its path quoted as `?`, `#` and `%` are special in URIs"""
+    return f"file:{quote(os.path.abspath(db_file))}?mode=ro"
+
+
+class ReadOnlyConnections:
+    """
+    Read-only connections to the SQLite database `db_file`, one per thread, kept open between requests
+    so the page cache and the parsed schema survive.
+
+    A connection is reopened when the database file is replaced (e.g. by `import_worker` renaming a new file
+    over it) or after `recycle` was called. Until then it keeps reading the file it opened.
+    """
+
+    def __init__(
+        self,
+        db_file: str,
+        mmap_size: int = DEFAULT_MMAP_SIZE,
+        cache_size_kib: int = DEFAULT_CACHE_SIZE_KIB,
+    ):
+        self.db_file = db_file
+        self.mmap_size = mmap_size
+        self.cache_size_kib = cache_size_kib
+        self.generation = 0
+        self.local = threading.local()
+
+    def file_identity(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = os.stat(self.db_file)
+        except FileNotFoundError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(read_only_uri(self.db_file), uri=True)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = 1;")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)};")
+        conn.execute(f"PRAGMA cache_size = {-int(self.cache_size_kib)};")
+        return conn
+
+    def connection(self) -> sqlite3.Connection:
+        """The connection of the calling thread, (re)opened if necessary"""
+        identity = (self.file_identity(), self.generation)
+        conn: Optional[sqlite3.Connection] = getattr(self.local, 'conn', None)
+        if conn is not None and self.local.identity == identity:
+            return conn
+
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+        conn = self.open()
+        self.local.conn = conn
+        self.local.identity = identity
+        return conn
+
+    def recycle(self):
+        """Makes every thread reopen its connection on its next request"""
+        self.generation += 1
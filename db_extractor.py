@@ -1,9 +1,10 @@
 import sqlite3
 from contextlib import closing
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Any, Iterator, Optional
 
 from base_types import BoardSize
+from tak import DIRECTION_OFFSETS
 
 BOTLIST = [
     'WilemBot',
@@ -72,22 +73,41 @@ def convert_move(move: str):
     return ''
 
 
-def get_moves(notation: str):
+def format_moves(ptn_moves: list[str]):
     moves = ''
     count = 0
-    for move in notation.split(','):
+    for move in ptn_moves:
         if count%2 == 0:
             moves += f'\n{int(count/2+1)}.'
         moves += ' '
-        moves += convert_move(move)
+        moves += move
         count += 1
     return moves
 
+def get_moves(notation: str):
+    return format_moves(get_moves_array(notation))
+
 def get_moves_array(notation: str):
     return [convert_move(move) for move in notation.split(',')]
 
 
-def get_ptn(game) -> str:
+def to_playtak_move(move: str) -> str:
+    """The PTN `move` in playtak notation, the inverse of `convert_move`"""
+    if move[0].isdecimal():
+        square, direction, drops = move[1:3], move[3], move[4:]
+        dx, dy = DIRECTION_OFFSETS[direction]
+        end_square = chr(ord(square[0]) + dx * len(drops)) + str(int(square[1]) + dy * len(drops))
+        return f"M {square.upper()} {end_square.upper()} {' '.join(drops)}"
+    stone = {'S': ' W', 'C': ' C'}.get(move[0], '')
+    return f"P {move.lstrip('SC').upper()}{stone}"
+
+
+def to_playtak_notation(moves: list[str]) -> str:
+    return ','.join(to_playtak_move(move) for move in moves)
+
+
+def get_ptn(game, moves: Optional[list[str]] = None) -> str:
+    """PTN of a row of the playtak `games` table, with the PTN `moves` instead of its `notation` if given"""
     ptn = ''
 
     white_name = 'Anon' if game['date'] < 1461430800000 else game['player_white']
@@ -125,13 +145,87 @@ def get_ptn(game) -> str:
     komi = int(game['komi'] or 0)/2
     ptn += get_header('Komi', f"{komi:.2g}")
 
-    ptn += get_moves(game['notation'])
+    ptn += format_moves(moves) if moves is not None else get_moves(game['notation'])
     ptn += ' ' + game['result']  # result follows straight after the last move
     ptn += '\n\n\n'
 
     return ptn
 
 
+# columns of the playtak games table needed to import a game
+GAME_COLUMNS = [
+    'id',
+    'date',
+    'size',
+    'player_white',
+    'player_black',
+    'notation',
+    'result',
+    'timertime',
+    'timerinc',
+    'unrated',
+    'pieces',
+    'capstones',
+    'rating_white',
+    'rating_black',
+    'komi',
+    'tournament',
+]
+# rows fetched from the games database at once
+GAMES_FETCH_SIZE = 1000
+
+
+def build_games_query_conditions(
+    board_size: BoardSize,
+    num_plies: int,
+    min_rating: int,
+    player_white: Optional[str] = None,
+    player_black: Optional[str] = None,
+    start_id = 0,
+    exclude_bots: bool = False,
+) -> tuple[list[str], dict[str, Any]]:
+    conditions = [
+        "LENGTH(notation) - LENGTH(REPLACE(notation, ',', '')) - 1 > :num_plies",
+        "rating_white >= :min_rating",
+        "rating_black >= :min_rating",
+        "id > :start_id",
+        "size = :size",
+    ]
+    params: dict[str, Any] = {
+        'num_plies': num_plies,
+        'min_rating': min_rating,
+        'start_id': start_id,
+        'size': board_size,
+    }
+    if player_white is not None:
+        conditions.append("player_white = :player_white")
+        params['player_white'] = player_white
+    elif exclude_bots:
+        conditions.append(f"player_white NOT IN {BOTNAMES}")
+
+    if player_black is not None:
+        conditions.append("player_black = :player_black")
+        params['player_black'] = player_black
+    elif exclude_bots:
+        conditions.append(f"player_black NOT IN {BOTNAMES}")
+
+    return conditions, params
+
+
+def estimate_games_from_db(db_file: str, board_size: BoardSize, num_games: int, start_id = 0, **_conditions) -> int:
+    """
+    Upper bound of the number of games `get_games_from_db` yields for the same arguments, for progress bars.
+    Only counts the games of `board_size` after `start_id`, the other conditions read more of every row
+    and the size is stored before the long notation.
+    """
+    with closing(sqlite3.connect(db_file)) as db:
+        with closing(db.execute(
+            "SELECT COUNT(*) FROM games WHERE id > :start_id AND size = :size;",
+            {'start_id': start_id, 'size': board_size},
+        )) as cursor:
+            return min(cursor.fetchone()[0], num_games)
+
+
 def get_games_from_db(
     db_file: str,
     board_size: BoardSize,
@@ -142,35 +236,27 @@ def get_games_from_db(
     player_black: Optional[str] = None,
     start_id = 0,
     exclude_bots: bool = False,
-):
+) -> Iterator[dict]:
+    """
+    Yields the matching games ordered by id, reading only `GAMES_FETCH_SIZE` rows at once.
+    The database stays open until the generator is exhausted or closed.
+    """
+    conditions, params = build_games_query_conditions(
+        board_size, num_plies, min_rating, player_white, player_black, start_id, exclude_bots
+    )
+    params['num_games'] = num_games
+
+    games_query = f"""
+        SELECT {', '.join(GAME_COLUMNS)}
+        FROM games
+        WHERE
+            {' AND '.join(conditions)}
+        ORDER BY id
+        LIMIT :num_games
+    ;"""
     with closing(sqlite3.connect(db_file)) as db:
         db.row_factory = sqlite3.Row
-
-        conditions = [
-            f"numplies>{num_plies}",
-            f"rating_white >= {min_rating}",
-            f"rating_black >= {min_rating}",
-            f"id > {start_id}",
-            f"size = {board_size}",
-        ]
-        if player_white is not None:
-            conditions.append(f"player_white = {player_white}")
-        elif exclude_bots:
-            conditions.append(f"player_white NOT IN {BOTNAMES}")
-
-        if player_black is not None:
-            conditions.append(f"player_black = {player_black}")
-        elif exclude_bots:
-            conditions.append(f"player_black NOT IN {BOTNAMES}")
-
-        games_query = f"""
-            SELECT *, LENGTH(notation) - LENGTH(REPLACE(notation,',','')) - 1 AS numplies
-            FROM games
-            WHERE
-                {' AND '.join(conditions)}
-            LIMIT {num_games}
-        ;"""
-        with closing(db.execute(games_query)) as cursor:
-            games = cursor.fetchall()
-            games = [dict(game) for game in games]
-            return games
+        with closing(db.execute(games_query, params)) as cursor:
+            while games := cursor.fetchmany(GAMES_FETCH_SIZE):
+                for game in games:
+                    yield dict(game)
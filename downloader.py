@@ -0,0 +1,142 @@
+"""
+Streaming download of the playtak games database.
+
+The file is written in chunks to `<destination>.part` and renamed over `destination` once it is complete
+and passed `verify_games_db`, so a broken or partial download never replaces a working database.
+The validators of the server (`ETag`, `Last-Modified`) are kept in `<destination>.meta`:
+they make the next download conditional (nothing is transferred if the file did not change)
+and let an interrupted download resume with a range request.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from typing import Callable, Optional
+
+import requests
+
+from db_connections import read_only_uri
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+# seconds to connect and between two received chunks, not for the whole download
+DOWNLOAD_TIMEOUT = 60
+PART_SUFFIX = '.part'
+META_SUFFIX = '.meta'
+
+
+class DownloadError(Exception):
+    pass
+
+
+def read_metadata(meta_file: str) -> dict:
+    try:
+        with open(meta_file, encoding='utf-8') as input_file:
+            return json.load(input_file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def write_metadata(meta_file: str, metadata: dict):
+    with open(meta_file + PART_SUFFIX, 'w', encoding='utf-8') as output_file:
+        json.dump(metadata, output_file)
+    os.replace(meta_file + PART_SUFFIX, meta_file)
+
+
+def remove_file(file_name: str):
+    if os.path.exists(file_name):
+        os.remove(file_name)
+
+
+def response_metadata(url: str, response: requests.Response) -> dict:
+    return {
+        'url': url,
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+    }
+
+
+def verify_games_db(db_file: str) -> bool:
+    """Whether `db_file` is an intact SQLite database with a readable `games` table"""
+    try:
+        with closing(sqlite3.connect(read_only_uri(db_file), uri=True)) as conn:
+            if conn.execute("PRAGMA quick_check;").fetchone()[0] != 'ok':
+                return False
+            conn.execute("SELECT id FROM games LIMIT 1;").fetchall()
+    except sqlite3.DatabaseError:
+        return False
+    return True
+
+
+def request_headers(url: str, destination: str, part_metadata: dict, part_size: int) -> dict:
+    if part_size > 0 and part_metadata.get('url') == url:
+        validator = part_metadata.get('etag') or part_metadata.get('last_modified')
+        if validator:
+            # the server only sends the rest if the file is still the one the part belongs to, otherwise all of it
+            return {'Range': f'bytes={part_size}-', 'If-Range': validator}
+
+    headers = {}
+    metadata = read_metadata(destination + META_SUFFIX)
+    if os.path.exists(destination) and metadata.get('url') == url:
+        if metadata.get('etag'):
+            headers['If-None-Match'] = metadata['etag']
+        if metadata.get('last_modified'):
+            headers['If-Modified-Since'] = metadata['last_modified']
+    return headers
+
+
+def download_file(
+    url: str,
+    destination: str,
+    verify: Callable[[str], bool] = verify_games_db,
+    session: Optional[requests.Session] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> bool:
+    """
+    Downloads `url` to `destination` unless it did not change since the last download.
+    Returns whether `destination` was replaced. Raises `DownloadError` if the download fails verification
+    and `requests.RequestException` on network errors, in which case a partial download is kept for resuming.
+    """
+    part_file = destination + PART_SUFFIX
+    part_meta_file = part_file + META_SUFFIX
+    part_metadata = read_metadata(part_meta_file)
+    part_size = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+    headers = request_headers(url, destination, part_metadata, part_size)
+
+    http = session or requests
+    with http.get(url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code == 304:
+            print("Playtak database did not change since the last download")
+            return False
+        if response.status_code == 416:
+            # the part does not fit the file on the server anymore
+            remove_file(part_file)
+            remove_file(part_meta_file)
+            return download_file(url, destination, verify, session, chunk_size)
+        response.raise_for_status()
+
+        resume = response.status_code == 206
+        if resume:
+            content_range = response.headers.get('Content-Range', '')
+            if not content_range.startswith(f'bytes {part_size}-'):
+                raise DownloadError(f"Unexpected Content-Range '{content_range}' resuming at byte {part_size}")
+            print(f"Resuming download at {part_size} bytes...")
+        else:
+            write_metadata(part_meta_file, response_metadata(url, response))
+
+        with open(part_file, 'ab' if resume else 'wb') as output_file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                output_file.write(chunk)
+
+        metadata = read_metadata(part_meta_file)
+
+    if not verify(part_file):
+        remove_file(part_file)
+        remove_file(part_meta_file)
+        raise DownloadError(f"Downloaded file from {url} failed verification")
+
+    # replace the old file at once, so open read connections can tell it changed
+    os.replace(part_file, destination)
+    write_metadata(destination + META_SUFFIX, metadata)
+    remove_file(part_meta_file)
+    return True
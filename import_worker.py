@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Imports new playtak games into all openings databases, run by the server in its own process.
+
+Every database is updated in a staging copy which then replaces the database with a rename,
+so readers keep a consistent snapshot and never wait for the import.
+A JSON summary of the run is written to `--summary`, and rewritten after every swapped database
+so the server can drop what it cached about that database while the import goes on.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from contextlib import closing, nullcontext
+from typing import Optional
+from datetime import datetime
+
+import requests
+
+import ptn_parser
+from db_connections import read_only_uri
+from db_extractor import estimate_games_from_db, get_games_from_db
+from downloader import DownloadError, download_file
+from openings_config import (
+    DATA_DIR, IMPORT_JOBS, IMPORT_SUMMARY_FILE, MAX_PLIES, NUM_GAMES, NUM_PLIES, PLAYTAK_GAMES_DB,
+    PLAYTAK_GAMES_DB_URL, OpeningsDbConfig, openings_db_configs,
+)
+from position_db import PositionDataBase
+from profiling import Profiler
+
+STAGING_SUFFIX = '.staging'
+
+
+def download_playtak_db(url: str, destination: str):
+    print("Fetching latest playtak games DB...")
+    try:
+        download_file(url, destination)
+    except (requests.RequestException, DownloadError) as exc:
+        print(f"Cannot download playtak games database: {exc}")
+        if not os.path.exists(destination):
+            print("No saved games database. exiting.")
+            raise Exception("Failed to download playtak games database") from exc # pylint: disable=broad-exception-raised
+        print("Using potentially outdated save of games database.")
+
+
+def remove_database(db_file: str):
+    """Removes `db_file` and its journal files, if they exist"""
+    for file_name in (db_file, db_file + '-journal', db_file + '-wal', db_file + '-shm'):
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+
+def create_staging_copy(db_file: str) -> str:
+    """
+    Copies `db_file` (if it exists) including everything committed to its WAL to a staging file.
+    Returns the name of the staging file.
+    """
+    staging_file = db_file + STAGING_SUFFIX
+    remove_database(staging_file)
+    if os.path.exists(db_file):
+        with closing(sqlite3.connect(read_only_uri(db_file), uri=True)) as source, \
+                closing(sqlite3.connect(staging_file)) as staging:
+            source.backup(staging)
+    return staging_file
+
+
+def swap_in(staging_file: str, db_file: str):
+    """Replaces `db_file` with `staging_file` at once"""
+    # readers open the swapped in file read-only, so it must not depend on a WAL
+    with closing(sqlite3.connect(staging_file)) as staging:
+        staging.execute("PRAGMA journal_mode=DELETE;").close()
+    os.replace(staging_file, db_file)
+    for file_name in (db_file + '-wal', db_file + '-shm'):
+        if os.path.exists(file_name):
+            os.remove(file_name)
+
+
+def update_openings_db(
+    playtak_db: str,
+    config: OpeningsDbConfig,
+    jobs: int = IMPORT_JOBS,
+    profiler: Optional[Profiler] = None,
+) -> int:
+    """
+    Imports the new games of `playtak_db` into a staging copy of the database of `config`
+    and swaps it in, also without new games as opening the database may have migrated it.
+    Returns the number of imported games.
+    """
+    print(f"extracting games from {playtak_db} to {config.db_file_name}")
+    staging_file = create_staging_copy(config.db_file_name)
+    try:
+        with PositionDataBase(staging_file) as pos_db, (profiler.instrument() if profiler else nullcontext()):
+            max_game_id = pos_db.max_game_id
+            games_query = dict(
+                db_file=playtak_db,
+                board_size=config.size,
+                num_plies=NUM_PLIES,
+                num_games=NUM_GAMES,
+                min_rating=config.min_rating,
+                player_white=None,
+                player_black=None,
+                start_id=pos_db.max_id,
+                exclude_bots=not config.include_bot_games,
+            )
+            games = get_games_from_db(**games_query)
+
+            print("building opening table...")
+            ptn_parser.add_games_to_db(
+                games, pos_db, max_plies=MAX_PLIES, jobs=jobs, total=estimate_games_from_db(**games_query)
+            )
+            pos_db.commit()
+            imported_games = pos_db.max_game_id - max_game_id
+
+        swap_in(staging_file, config.db_file_name)
+        print("...done!")
+        return imported_games
+    finally:
+        remove_database(staging_file)
+
+
+def write_import_summary(summary_file: str, summary: dict):
+    """Replaces `summary_file` at once, so it is never read half written"""
+    with open(summary_file + '.part', 'w', encoding='utf-8') as output_file:
+        json.dump(summary, output_file, indent=2)
+    os.replace(summary_file + '.part', summary_file)
+
+
+def import_playtak_games(summary_file: str, download: bool = True, jobs: int = IMPORT_JOBS, profile: bool = False) -> dict:
+    """
+    Downloads the playtak games and updates all openings databases, see `update_openings_db`.
+    With `profile` the import of every database is profiled with one job and the report added to the summary.
+    The summary lists every database right after it was swapped in and gets its total `seconds` at the end.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if profile:
+        jobs = 1
+    started = time.time()
+    summary: dict = {
+        'started': datetime.utcfromtimestamp(started).isoformat(),
+        'databases': [],
+    }
+    if download:
+        download_playtak_db(PLAYTAK_GAMES_DB_URL, PLAYTAK_GAMES_DB)
+
+    for db_id, config in enumerate(openings_db_configs):
+        db_started = time.time()
+        profiler = Profiler() if profile else None
+        imported_games = update_openings_db(PLAYTAK_GAMES_DB, config, jobs, profiler)
+        database_summary = {
+            'db_id': db_id,
+            'file': config.db_file_name,
+            'imported_games': imported_games,
+            'seconds': round(time.time() - db_started, 3),
+        }
+        if profiler is not None:
+            profiler.print_report()
+            database_summary['profile'] = profiler.report()
+        summary['databases'].append(database_summary)
+        write_import_summary(summary_file, summary)
+    print(f"updated {len(openings_db_configs)} opening dbs")
+
+    summary['seconds'] = round(time.time() - started, 3)
+    write_import_summary(summary_file, summary)
+    return summary
+
+
+def read_import_summary(summary_file: str) -> dict:
+    with open(summary_file, encoding='utf-8') as input_file:
+        return json.load(input_file)
+
+
+def main(args: list[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--summary', default=IMPORT_SUMMARY_FILE, help="JSON file to write the summary of the import to")
+    parser.add_argument('--no-download', action='store_true', help="import from the existing games database")
+    parser.add_argument('-j', '--jobs', type=int, default=IMPORT_JOBS, help="worker processes replaying games")
+    parser.add_argument('--profile', action='store_true', help="time the import stages (with one job) and add them to the summary")
+    options = parser.parse_args(args)
+    import_playtak_games(options.summary, download=not options.no_download, jobs=options.jobs, profile=options.profile)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
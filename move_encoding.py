@@ -0,0 +1,114 @@
+"""
+Compact binary encoding of the PTN moves of a game, stored in `game_moves.moves` of the openings databases.
+
+Squares are numbered `column + 8 * row`, so the encoding does not depend on the board size (at most 8x8).
+Every move starts with one byte, the two high bits tell its type and the low six bits its square:
+
+    placement  00ssssss (flat), 01ssssss (wall), 10ssssss (capstone)
+    spread     11ssssss  dd ccc ppppppp (two more bytes, big endian)
+
+A spread stores its direction `dd` (index in `DIRECTIONS`), the count of carried stones minus one `ccc`
+and the drops as bit `i` of `ppppppp` set when the stones after the first `i + 1` carried stones are dropped
+on the next square. So a game takes about one byte per ply.
+
+Decoded moves always state count and drops of spreads (`1a1>1`, not `a1>`), like `db_extractor.convert_move`.
+"""
+
+import re
+from functools import lru_cache
+
+MAX_BOARD_SIZE = 8
+STONES = ('', 'S', 'C')
+DIRECTIONS = ('+', '-', '<', '>')
+SPREAD = 3 # type of spreads in the two high bits of the first byte
+
+PLACEMENT_RE = re.compile(r'([SC]?)([a-h][1-8])')
+SPREAD_RE = re.compile(r'([1-8]?)([a-h][1-8])([-+<>])([1-8]*)')
+
+
+def square_name(square: int) -> str:
+    return chr(ord('a') + square % MAX_BOARD_SIZE) + str(square // MAX_BOARD_SIZE + 1)
+
+
+def square_index(name: str) -> int:
+    return ord(name[0]) - ord('a') + (int(name[1]) - 1) * MAX_BOARD_SIZE
+
+
+def drops_from_mask(count: int, mask: int) -> str:
+    drops = []
+    dropped = 0
+    for carried in range(1, count):
+        if mask >> (carried - 1) & 1:
+            drops.append(carried - dropped)
+            dropped = carried
+    drops.append(count - dropped)
+    return ''.join(map(str, drops))
+
+
+def mask_from_drops(drops: str) -> int:
+    mask = 0
+    carried = 0
+    for drop in drops[:-1]:
+        carried += int(drop)
+        mask |= 1 << (carried - 1)
+    return mask
+
+
+# decoded placements by first byte, `None` for the first byte of a spread
+PLACEMENTS: list = [
+    STONES[byte >> 6] + square_name(byte & 0x3f) if byte >> 6 != SPREAD else None
+    for byte in range(256)
+]
+SQUARE_NAMES = [square_name(square) for square in range(MAX_BOARD_SIZE ** 2)]
+# (count, direction and drops) of spreads by their last two bytes, `None` for impossible drops
+SPREADS: list = [None] * 2 ** 12
+for _count in range(1, MAX_BOARD_SIZE + 1):
+    for _mask in range(2 ** (_count - 1)):
+        for _direction, _direction_name in enumerate(DIRECTIONS):
+            SPREADS[_direction << 10 | (_count - 1) << 7 | _mask] = (
+                str(_count),
+                _direction_name + drops_from_mask(_count, _mask),
+            )
+
+
+@lru_cache(maxsize=2**16)
+def encode_move(move: str) -> bytes:
+    """The encoding of the PTN `move`, raises `ValueError` for anything but a plain placement or spread"""
+    placement = PLACEMENT_RE.fullmatch(move)
+    if placement is not None:
+        stone, square = placement.groups()
+        return bytes((STONES.index(stone) << 6 | square_index(square),))
+
+    spread = SPREAD_RE.fullmatch(move)
+    if spread is None:
+        raise ValueError(f"Move '{move}' is no placement or spread")
+    count_string, square, direction, drops = spread.groups()
+    count = int(count_string or 1)
+    drops = drops or str(count)
+    if sum(map(int, drops)) != count:
+        raise ValueError(f"Drops of move '{move}' do not add up to the carried stones")
+    tail = DIRECTIONS.index(direction) << 10 | (count - 1) << 7 | mask_from_drops(drops)
+    return bytes((SPREAD << 6 | square_index(square), tail >> 8, tail & 0xff))
+
+
+def encode_moves(moves: list[str]) -> bytes:
+    return b''.join(map(encode_move, moves))
+
+
+def decode_moves(data: bytes) -> list[str]:
+    moves = []
+    i = 0
+    while i < len(data):
+        byte = data[i]
+        placement = PLACEMENTS[byte]
+        if placement is not None:
+            moves.append(placement)
+            i += 1
+            continue
+        spread = SPREADS[data[i + 1] << 8 | data[i + 2]] if i + 2 < len(data) else None
+        if spread is None:
+            raise ValueError(f"Invalid spread at byte {i} of encoded moves")
+        count, rest = spread
+        moves.append(count + SQUARE_NAMES[byte & 0x3f] + rest)
+        i += 3
+    return moves
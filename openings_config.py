@@ -0,0 +1,41 @@
+import os
+from dataclasses import dataclass
+
+from base_types import BoardSize
+
+DATA_DIR = 'data'
+PLAYTAK_GAMES_DB = os.path.join(DATA_DIR, 'games_anon.db')
+PLAYTAK_GAMES_DB_URL = 'https://www.playtak.com/games_anon.db'
+# `False` imports from the existing `PLAYTAK_GAMES_DB`, e.g. one written by `util/generate_games_db.py`
+DOWNLOAD_PLAYTAK_DB = True
+# summary of the last run of `import_worker`
+IMPORT_SUMMARY_FILE = os.path.join(DATA_DIR, 'import_summary.json')
+MAX_PLIES = 30
+NUM_PLIES = 12
+NUM_GAMES = 100_000
+MIN_RATING = 1200
+IMPORT_JOBS = os.cpu_count() or 1
+# profile the scheduled imports of the server, see `profiling.py`, the reports are added to `IMPORT_SUMMARY_FILE`
+PROFILE_IMPORT = False
+
+@dataclass
+class OpeningsDbConfig:
+    min_rating: int
+    include_bot_games: bool
+    size: BoardSize = BoardSize(6)
+
+    @property
+    def db_file_name(self):
+        bots_text = "bots" if self.include_bot_games else "nobots"
+        file_name = f"openings_s{self.size}_{self.min_rating}_{bots_text}.db"
+        return os.path.join(DATA_DIR, file_name)
+
+
+openings_db_configs = [
+    OpeningsDbConfig(min_rating=MIN_RATING, include_bot_games=False, size=BoardSize(6)),
+    OpeningsDbConfig(min_rating=1700, include_bot_games=True, size=BoardSize(6)),
+    OpeningsDbConfig(min_rating=1200, include_bot_games=True, size=BoardSize(7)),
+    OpeningsDbConfig(min_rating=1500, include_bot_games=True, size=BoardSize(8)),
+    # careful, 5x5 with 1500 elo and bots contains ~60k
+    OpeningsDbConfig(min_rating=1500, include_bot_games=True, size=BoardSize(5)),
+]
@@ -1,22 +1,130 @@
+from collections import OrderedDict
 from contextlib import closing
+import hashlib
 import os
 import sqlite3
 from typing import Optional, Union
-from base_types import BoardSize, PlayerToMove, TpsString
+from base_types import BoardSize, NormalizedTpsString, PlayerToMove, TpsString, TpsSymmetry, result_category
 
 import symmetry_normalisator
+from db_extractor import BOTLIST
+from move_encoding import encode_moves
 from position_processor import PositionProcessor
 from tak import GameState
 
+# (normalized tps, player to move, normalized move, normalized next tps, next player to move)
+# the last three are `None` for the final position of a game
+NormalizedPly = tuple[
+    NormalizedTpsString,
+    PlayerToMove,
+    Optional[str],
+    Optional[NormalizedTpsString],
+    Optional[PlayerToMove],
+]
+
+DEFAULT_POSITION_CACHE_SIZE = 250_000
+DEFAULT_WRITE_BATCH_SIZE = 10_000
+
+INSERT_GAME_SQL = """
+    INSERT INTO games (
+        id, playtak_id, size, white, black, result, komi, rating_white, rating_black, 'date', tournament, timertime, timerinc,
+        unrated, pieces, capstones
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+INSERT_GAME_MOVES_SQL = "INSERT INTO game_moves (game_id, moves) VALUES (?, ?);"
+INSERT_POSITION_SQL = "INSERT INTO positions (id, key, tps, player_to_move) VALUES (?, ?, ?, ?);"
+SELECT_POSITION_SQL = "SELECT id FROM positions WHERE key=:key AND tps=:tps AND player_to_move=:player_to_move;"
+INSERT_POSITION_MOVE_SQL = "INSERT OR IGNORE INTO position_moves (position_id, move, next_position_id) VALUES (?, ?, ?);"
+INSERT_XREF_SQL = "INSERT INTO game_position_xref (game_id, position_id) VALUES (?, ?);"
+ADD_POSITION_RESULTS_SQL = """
+    INSERT INTO position_results (position_id, bot_game, white, black, draw)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (position_id, bot_game) DO UPDATE SET
+        white = white + excluded.white,
+        black = black + excluded.black,
+        draw = draw + excluded.draw;
+"""
+ADD_PLAYER_GAMES_SQL = """
+    INSERT INTO players (name, white_games, black_games)
+    VALUES (?, ?, ?)
+    ON CONFLICT (name) DO UPDATE SET
+        white_games = white_games + excluded.white_games,
+        black_games = black_games + excluded.black_games;
+"""
+# index of each result category in the pending result counters
+RESULT_INDEX = { 'white': 0, 'black': 1, 'draw': 2 }
+
+
+def position_key(tps: NormalizedTpsString, player_to_move: PlayerToMove) -> int:
+    """
+    64 bit hash of a position, indexed instead of the much longer tps.
+    Not unique, lookups must also compare `tps` and `player_to_move`.
+    """
+    digest = hashlib.blake2b(f"{tps} {player_to_move}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little', signed=True) # sqlite integers are signed
+
+
+class CachedPosition:
+    """
+    In-memory copy of a `positions` row.
+    `moves` holds the moves known in `position_moves`, it is loaded on first use (`None` until then).
+    """
+    __slots__ = ('id', 'moves')
+
+    def __init__(self, position_id: int, moves: Optional[set[str]]):
+        self.id = position_id
+        self.moves = moves
+
+
+def parse_moves_string(moves_string: Optional[str]) -> list[tuple[str, int]]:
+    """Parses the legacy `positions.moves` format `move,next_id;move,next_id;...`"""
+    if not moves_string:
+        return []
+    moves = []
+    for entry in moves_string.split(';'):
+        move, next_id = entry.split(',')
+        moves.append((move, int(next_id)))
+    return moves
+
 
 class PositionDataBase(PositionProcessor):
 
-    def __init__(self, db_file_name: str):
+    def __init__(
+        self,
+        db_file_name: str,
+        position_cache_size: int = DEFAULT_POSITION_CACHE_SIZE,
+        write_batch_size: int = DEFAULT_WRITE_BATCH_SIZE,
+    ):
         assert db_file_name
+        assert position_cache_size > 0
+        assert write_batch_size > 0
         self.conn: Optional[sqlite3.Connection] = None
         self.max_id = 0
         self.db_file_name = db_file_name
 
+        # positions by (normalized tps, player to move), least recently used first.
+        # Writes to `positions` are deferred until `flush()`, so ids are assigned here instead of by sqlite.
+        self.position_cache_size = position_cache_size
+        self.position_cache: OrderedDict[tuple[str, PlayerToMove], CachedPosition] = OrderedDict()
+        self.max_position_id = 0
+        self.new_positions: list[tuple[int, int, str, PlayerToMove]] = []
+
+        # rows for `games`, `game_moves`, `position_moves` and `game_position_xref`,
+        # written with executemany every `write_batch_size` rows
+        self.write_batch_size = write_batch_size
+        self.max_game_id = 0
+        self.pending_games: list[tuple] = []
+        self.pending_game_moves: list[tuple[int, bytes]] = []
+        self.pending_moves: list[tuple[int, str, int]] = []
+        self.pending_xrefs: list[tuple[int, int]] = []
+
+        # increments of `position_results` by (position id, bot game), as [white, black, draw]
+        self.pending_results: dict[tuple[int, bool], list[int]] = {}
+        self.last_game: tuple[int, bool] = (0, False) # (id, bot game) of the last added game
+        # increments of `players` by name, as [white games, black games]
+        self.pending_players: dict[str, list[int]] = {}
+
     def __enter__(self):
         create_tables_sql = ["""
             CREATE TABLE IF NOT EXISTS games (
@@ -30,18 +138,58 @@ class PositionDataBase(PositionProcessor):
                 rating_white integer DEFAULT 1000,
                 rating_black integer DEFAULT 1000,
                 date integer,
-                tournament integer
+                tournament integer,
+                timertime integer,
+                timerinc integer,
+                unrated integer,
+                pieces integer,
+                capstones integer
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS game_moves (
+                game_id integer PRIMARY KEY,
+                moves blob NOT NULL,
+                FOREIGN KEY (game_id) REFERENCES games(id)
             );
             """,
             """
             CREATE TABLE IF NOT EXISTS positions (
                 id integer PRIMARY KEY,
+                key integer NOT NULL,
                 tps text NOT NULL,
-                player_to_move text NOT NULL,
-                moves text
+                player_to_move text NOT NULL
             );
             """,
             """
+            CREATE TABLE IF NOT EXISTS position_moves (
+                position_id integer NOT NULL,
+                move text NOT NULL,
+                next_position_id integer NOT NULL,
+                PRIMARY KEY (position_id, move),
+                FOREIGN KEY (position_id) REFERENCES positions(id),
+                FOREIGN KEY (next_position_id) REFERENCES positions(id)
+            ) WITHOUT ROWID;
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS position_results (
+                position_id integer NOT NULL,
+                bot_game integer NOT NULL,
+                white integer NOT NULL DEFAULT 0,
+                black integer NOT NULL DEFAULT 0,
+                draw integer NOT NULL DEFAULT 0,
+                PRIMARY KEY (position_id, bot_game),
+                FOREIGN KEY (position_id) REFERENCES positions(id)
+            ) WITHOUT ROWID;
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS players (
+                name text PRIMARY KEY,
+                white_games integer NOT NULL DEFAULT 0,
+                black_games integer NOT NULL DEFAULT 0
+            ) WITHOUT ROWID;
+            """,
+            """
             CREATE TABLE IF NOT EXISTS game_position_xref (
                 id integer PRIMARY KEY,
                 game_id integer,
@@ -54,7 +202,8 @@ class PositionDataBase(PositionProcessor):
         create_index_sql = [
             "CREATE        INDEX IF NOT EXISTS idx_xref_game_id ON game_position_xref (game_id);",
             "CREATE        INDEX IF NOT EXISTS idx_xref_position_id ON game_position_xref (position_id);",
-            "CREATE UNIQUE INDEX IF NOT EXISTS idx_position_tps ON positions (tps, player_to_move);",
+            "CREATE        INDEX IF NOT EXISTS idx_position_key ON positions (key);",
+            "CREATE        INDEX IF NOT EXISTS idx_games_playtak_id ON games (playtak_id);",
             "CREATE        INDEX IF NOT EXISTS idx_games_white ON games (white);",
             "CREATE        INDEX IF NOT EXISTS idx_games_black ON games (black);",
             "CREATE        INDEX IF NOT EXISTS idx_games_rating_white ON games (rating_white);",
@@ -67,11 +216,20 @@ class PositionDataBase(PositionProcessor):
         try:
             if os.path.exists(self.db_file_name):
                 self.conn = sqlite3.connect(self.db_file_name)
+                self.conn.row_factory = sqlite3.Row
+
+                for query in create_tables_sql:
+                    self.conn.execute(query).close()
+
+                self.migrate_moves_column()
+                self.migrate_position_results()
+                self.migrate_position_keys()
+                self.migrate_players()
+                self.migrate_game_columns()
 
                 for query in create_index_sql:
                     self.conn.execute(query)
 
-                self.conn.row_factory = sqlite3.Row
                 with closing(self.conn.cursor()) as cur:
                     get_highest_id_sql = """
                         SELECT MAX(playtak_id) AS max_id, COUNT(ALL playtak_id) AS games_count FROM games;
@@ -87,6 +245,11 @@ class PositionDataBase(PositionProcessor):
                             print("max game ID in loaded DB: ", max_id)
                             print("number of games in loaded DB:", games_count)
                             self.max_id = max_id
+
+                    cur.execute("SELECT MAX(id) FROM positions;")
+                    self.max_position_id = cur.fetchone()[0] or 0
+                    cur.execute("SELECT MAX(id) FROM games;")
+                    self.max_game_id = cur.fetchone()[0] or 0
                     return self
 
             self.conn = sqlite3.connect(self.db_file_name)
@@ -107,11 +270,220 @@ class PositionDataBase(PositionProcessor):
         if self.conn is not None:
             self.conn.close()
             self.conn = None
+        self.position_cache.clear()
+        self.new_positions.clear()
+        self.pending_games.clear()
+        self.pending_game_moves.clear()
+        self.pending_moves.clear()
+        self.pending_xrefs.clear()
+        self.pending_results.clear()
+        self.pending_players.clear()
+
+    def migrate_moves_column(self):
+        """
+        Older databases stored the moves of a position as `positions.moves` string.
+        Moves them to the `position_moves` table and drops the column.
+        """
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as cur:
+            cur.execute("PRAGMA table_info(positions);")
+            if 'moves' not in [row['name'] for row in cur.fetchall()]:
+                return
+
+            print("migrating positions.moves to position_moves table...")
+            cur.execute("SELECT id, moves FROM positions WHERE moves != '';")
+            while rows := cur.fetchmany(self.write_batch_size):
+                self.conn.executemany(
+                    INSERT_POSITION_MOVE_SQL,
+                    [(row['id'], move, next_id) for row in rows for move, next_id in parse_moves_string(row['moves'])],
+                )
+            cur.execute("ALTER TABLE positions DROP COLUMN moves;")
+        self.conn.commit()
+
+    def migrate_position_results(self):
+        """Fills `position_results` from the games of older databases that did not have it"""
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM position_results), EXISTS (SELECT 1 FROM game_position_xref);")
+            has_results, has_positions = cur.fetchone()
+            if has_results or not has_positions:
+                return
+
+            print("counting results per position...")
+            bot_names = ','.join('?' * len(BOTLIST))
+            # same categories as `base_types.result_category`
+            cur.execute(f"""
+                INSERT INTO position_results (position_id, bot_game, white, black, draw)
+                SELECT game_position_xref.position_id,
+                    games.white IN ({bot_names}) OR games.black IN ({bot_names}) AS bot_game,
+                    SUM(SUBSTR(games.result, 1, 2) != '0-' AND SUBSTR(games.result, -2) = '-0'),
+                    SUM(SUBSTR(games.result, 1, 2) = '0-'),
+                    SUM(games.result = '1/2-1/2')
+                FROM game_position_xref, games
+                WHERE games.id = game_position_xref.game_id
+                GROUP BY game_position_xref.position_id, bot_game;
+            """, [*BOTLIST, *BOTLIST])
+        self.conn.commit()
+
+    def migrate_position_keys(self):
+        """Older databases indexed positions by their full tps, adds and indexes `positions.key` instead"""
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as cur:
+            cur.execute("PRAGMA table_info(positions);")
+            if 'key' in [row['name'] for row in cur.fetchall()]:
+                return
+
+            print("adding position keys...")
+            cur.execute("ALTER TABLE positions ADD COLUMN key integer NOT NULL DEFAULT 0;")
+            cur.execute("SELECT id, tps, player_to_move FROM positions;")
+            while rows := cur.fetchmany(self.write_batch_size):
+                self.conn.executemany(
+                    "UPDATE positions SET key=? WHERE id=?;",
+                    [(position_key(row['tps'], row['player_to_move']), row['id']) for row in rows],
+                )
+            cur.execute("DROP INDEX IF EXISTS idx_position_tps;")
+        self.conn.commit()
+
+    def migrate_players(self):
+        """Fills `players` from the games of older databases that did not have it"""
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as cur:
+            cur.execute("SELECT EXISTS (SELECT 1 FROM players), EXISTS (SELECT 1 FROM games);")
+            has_players, has_games = cur.fetchone()
+            if has_players or not has_games:
+                return
+
+            print("counting games per player...")
+            cur.execute("""
+                INSERT INTO players (name, white_games, black_games)
+                SELECT name, SUM(as_white), SUM(NOT as_white)
+                FROM (
+                    SELECT white AS name, 1 AS as_white FROM games
+                    UNION ALL
+                    SELECT black AS name, 0 AS as_white FROM games
+                )
+                GROUP BY name;
+            """)
+        self.conn.commit()
+
+    def migrate_game_columns(self):
+        """
+        Older databases did not store the time control, `unrated`, `pieces` and `capstones` of games,
+        adds the columns (`NULL` for existing games)
+        """
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as cur:
+            cur.execute("PRAGMA table_info(games);")
+            columns = [row['name'] for row in cur.fetchall()]
+            for column in ('timertime', 'timerinc', 'unrated', 'pieces', 'capstones'):
+                if column not in columns:
+                    cur.execute(f"ALTER TABLE games ADD COLUMN {column} integer;")
+        self.conn.commit()
+
+    def flush(self):
+        """Writes all deferred inserts and updates to the database (without committing)"""
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as curr:
+            if self.pending_games:
+                curr.executemany(INSERT_GAME_SQL, self.pending_games)
+                self.pending_games.clear()
+            if self.pending_game_moves:
+                curr.executemany(INSERT_GAME_MOVES_SQL, self.pending_game_moves)
+                self.pending_game_moves.clear()
+            if self.new_positions:
+                curr.executemany(INSERT_POSITION_SQL, self.new_positions)
+                self.new_positions.clear()
+            if self.pending_moves:
+                curr.executemany(INSERT_POSITION_MOVE_SQL, self.pending_moves)
+                self.pending_moves.clear()
+            if self.pending_xrefs:
+                curr.executemany(INSERT_XREF_SQL, self.pending_xrefs)
+                self.pending_xrefs.clear()
+            if self.pending_results:
+                curr.executemany(
+                    ADD_POSITION_RESULTS_SQL,
+                    [(position_id, bot_game, *counts) for (position_id, bot_game), counts in self.pending_results.items()],
+                )
+                self.pending_results.clear()
+            if self.pending_players:
+                curr.executemany(
+                    ADD_PLAYER_GAMES_SQL,
+                    [(name, *counts) for name, counts in self.pending_players.items()],
+                )
+                self.pending_players.clear()
 
     def commit(self):
         assert self.conn is not None
+        self.flush()
         self.conn.commit()
 
+    def get_position(self, tps: NormalizedTpsString, player_to_move: PlayerToMove) -> CachedPosition:
+        """Returns the position from the cache, loading or creating it if necessary"""
+        assert self.conn is not None
+        cache_key = (tps, player_to_move)
+        position = self.position_cache.get(cache_key)
+        if position is not None:
+            self.position_cache.move_to_end(cache_key)
+            return position
+
+        key = position_key(tps, player_to_move)
+        with closing(self.conn.cursor()) as curr:
+            curr.execute(SELECT_POSITION_SQL, { 'key': key, 'tps': tps, 'player_to_move': player_to_move })
+            row = curr.fetchone()
+
+        if row is None:
+            # if this position does not exist, create it
+            self.max_position_id += 1
+            position = CachedPosition(self.max_position_id, set())
+            self.new_positions.append((position.id, key, tps, player_to_move))
+        else:
+            position = CachedPosition(row['id'], None)
+
+        self.position_cache[cache_key] = position
+        if len(self.position_cache) > self.position_cache_size:
+            self.evict_positions()
+        return position
+
+    def evict_positions(self):
+        # pending writes must reach the database first, otherwise evicted positions could not be found again
+        self.flush()
+        target_size = self.position_cache_size - self.position_cache_size // 8
+        while len(self.position_cache) > target_size:
+            self.position_cache.popitem(last=False)
+
+    @staticmethod
+    def normalize_position(
+        move: Optional[str],
+        tps: TpsString,
+        next_tps: Union[TpsString, None],
+        tak: GameState,
+    ) -> tuple[NormalizedPly, TpsSymmetry]:
+        """
+        Normalizes a position and the move played from it for symmetries.
+        This is the CPU heavy part of `add_position`, it does not need the database.
+        """
+        assert bool(next_tps) == bool(move) # either none or both must be set
+
+        # In the beginning of the game, on ply 2 and 3, white is placed consecutively
+        color_to_place = tak.colour_to_play(tak.ply_counter - 1)
+
+        # normalize for symmetries
+        tps_normalized, own_symmetry = symmetry_normalisator.get_tps_orientation(tps)
+
+        if next_tps is None or move is None:
+            return (tps_normalized, color_to_place, None, None, None), own_symmetry
+
+        color_to_place_next = tak.colour_to_play(tak.ply_counter)
+        next_tps_normalized, _next_symmetry = symmetry_normalisator.get_tps_orientation(next_tps)
+
+        # orient move to previous symmetry
+        move = symmetry_normalisator.transform_move(
+            move=move,
+            orientation=own_symmetry,
+            board_size=tak.size,
+        )
+        return (tps_normalized, color_to_place, move, next_tps_normalized, color_to_place_next), own_symmetry
+
     def add_position(
         self,
         game_id: int,
@@ -121,98 +493,62 @@ class PositionDataBase(PositionProcessor):
         next_tps: Union[TpsString, None],
         tak: GameState
     ) -> int:
+        ply, own_symmetry = self.normalize_position(move, tps, next_tps, tak)
+        self.add_normalized_position(game_id, result, ply)
+        return own_symmetry
+
+    def add_normalized_position(self, game_id: int, result: str, ply: NormalizedPly):
+        """Adds a position that was already normalized with `normalize_position`"""
         assert self.conn is not None
-        assert bool(next_tps) == bool(move) # either none or both must be set
-        with  closing(self.conn.cursor()) as curr:
-
-            # In the beginning of the game, on ply 2 and 3, white is placed consecutively
-            color_to_place = tak.colour_to_play(tak.ply_counter - 1)
-            color_to_place_next = tak.colour_to_play(tak.ply_counter)
-
-            # normalize for symmetries
-            tps_normalized, own_symmetry = symmetry_normalisator.get_tps_orientation(tps)
-            select_position_row_sql = f"""
-                SELECT *
-                FROM positions
-                WHERE tps = '{tps_normalized}' AND player_to_move = '{color_to_place}'
-                ;
-            """
+        tps_normalized, color_to_place, move, next_tps_normalized, color_to_place_next = ply
+        position = self.get_position(tps_normalized, color_to_place)
+
+        # update the game-move crossreference table
+        self.pending_xrefs.append((game_id, position.id))
+
+        # and the result counters of the position
+        counts = self.pending_results.setdefault((position.id, self.is_bot_game(game_id)), [0, 0, 0])
+        category = result_category(result)
+        if category is not None:
+            counts[RESULT_INDEX[category]] += 1
+
+        if len(self.pending_xrefs) >= self.write_batch_size or len(self.pending_results) >= self.write_batch_size:
+            self.flush()
+
+        if move is not None and next_tps_normalized is not None and color_to_place_next is not None:
+            next_position = self.get_position(next_tps_normalized, color_to_place_next)
 
-            curr.execute(select_position_row_sql)
+            # if a move is given also update the move table
+            if position.moves is None:
+                position.moves = self.load_moves(position.id)
+            if move not in position.moves:
+                position.moves.add(move)
+                self.pending_moves.append((position.id, move, next_position.id))
+                if len(self.pending_moves) >= self.write_batch_size:
+                    self.flush()
+
+    def is_bot_game(self, game_id: int) -> bool:
+        if self.last_game[0] == game_id:
+            return self.last_game[1]
+
+        assert self.conn is not None
+        self.flush()
+        with closing(self.conn.cursor()) as curr:
+            curr.execute("SELECT white, black FROM games WHERE id=:game_id;", { 'game_id': game_id })
             row = curr.fetchone()
+        assert row is not None, f"game {game_id} does not exist"
+        self.last_game = (game_id, row['white'] in BOTLIST or row['black'] in BOTLIST)
+        return self.last_game[1]
 
-            # if this position does not exist, create it
-            if row is None:
-                self.create_position_entry(tps_normalized, color_to_place)
-                curr.execute(select_position_row_sql)
-                row = curr.fetchone()
-
-            # update the game-move crossreference table
-            row_dict = dict(row)
-            position_id = row_dict['id']
-
-            curr.execute(
-                "INSERT INTO game_position_xref (game_id, position_id) VALUES (:game_id, :position_id);",
-                { 'game_id': game_id, 'position_id': position_id }
-            )
-
-            if next_tps is not None and move is not None:
-                next_tps_normalized, _next_symmetry = symmetry_normalisator.get_tps_orientation(next_tps)
-                select_next_position_row_sql = f"""
-                    SELECT *
-                    FROM positions
-                    WHERE tps = '{next_tps_normalized}'
-                    AND player_to_move = '{color_to_place_next}'
-                    ;
-                """
-                curr.execute(select_next_position_row_sql)
-                next_pos = curr.fetchone()
-
-                # if next position does not exist, create it
-                if next_pos is None:
-                    self.create_position_entry(next_tps_normalized, color_to_place_next)
-                    curr.execute(select_next_position_row_sql)
-                    next_pos = curr.fetchone()
-
-                next_pos_id = dict(next_pos)['id']
-
-                # if a move is given also update the move table
-                # orient move to previous symmetry
-                move = symmetry_normalisator.transform_move(
-                    move=move,
-                    orientation=own_symmetry,
-                    board_size=tak.size,
-                )
-                position_moves = row_dict['moves']
-                if position_moves != '':
-                    position_moves = row_dict['moves'].split(';')
-                else:
-                    position_moves = []
-                moves_list = list(map(lambda x: x.split(','), position_moves))
-
-                # if move is in moves_list, update count
-                move_found = False
-                for moves in moves_list:
-                    if moves[0] == move:
-                        move_found = True
-                        break
-
-                if not move_found:
-                    # append new move to moves_list
-                    moves_list.append((move, str(next_pos_id)))
-
-                    # transform moves_list into db string format
-                    position_moves = ';'.join(map(','.join, moves_list))
-
-                    curr.execute(
-                        "UPDATE positions SET moves=:position_moves WHERE id=:position_id",
-                        { 'position_moves': position_moves, 'position_id': position_id }
-                    )
-
-            return own_symmetry
+    def load_moves(self, position_id: int) -> set[str]:
+        assert self.conn is not None
+        with closing(self.conn.cursor()) as curr:
+            curr.execute("SELECT move FROM position_moves WHERE position_id=:position_id;", { 'position_id': position_id })
+            return { row['move'] for row in curr.fetchall() }
 
     def dump(self):
         assert self.conn is not None
+        self.flush()
         for line in self.conn.iterdump():
             print(line)
 
@@ -227,23 +563,30 @@ class PositionDataBase(PositionProcessor):
             rating_white: int,
             rating_black: int,
             date: int, # timestamp
-            tournament: bool
+            tournament: bool,
+            timertime: Optional[int] = None, # seconds
+            timerinc: Optional[int] = None, # seconds
+            unrated: Optional[bool] = None,
+            pieces: Optional[int] = None, # stones per player, -1 for the default of the size
+            capstones: Optional[int] = None, # -1 for the default of the size
+            moves: Optional[list[str]] = None, # all PTN moves of the game, stored in `game_moves`
     ) -> int:
         assert self.conn is not None
 
-        insert_game_data_sql = f"""
-            INSERT INTO games (playtak_id, size, white, black, result, komi, rating_white, rating_black, 'date', tournament)
-            VALUES ('{playtak_id}', '{size}', '{white_name}', '{black_name}', '{result}', {komi}, {rating_white}, {rating_black}, {date}, {tournament})
-            RETURNING id;
-        """ # use RETURNING so that we can get the inserted id after the query
-
-        with closing(self.conn.cursor()) as curr:
-            curr.execute(insert_game_data_sql)
-            inserted_id = curr.fetchone()[0]
-            return inserted_id
-
-    def create_position_entry(self, tps: str, player_to_move: PlayerToMove):
-        assert self.conn is not None
-        insert_position_data_sql = "INSERT INTO positions (tps, player_to_move, moves) VALUES (:tps, :player_to_move, '');"
-        with closing(self.conn.cursor()) as curr:
-            curr.execute(insert_position_data_sql, { 'tps': tps, 'player_to_move': player_to_move })
+        self.max_game_id += 1
+        self.last_game = (self.max_game_id, white_name in BOTLIST or black_name in BOTLIST)
+        self.pending_games.append((
+            self.max_game_id, playtak_id, size, white_name, black_name, result, komi, rating_white, rating_black, date, tournament,
+            timertime, timerinc, unrated, pieces, capstones,
+        ))
+        if moves is not None:
+            try:
+                self.pending_game_moves.append((self.max_game_id, encode_moves(moves)))
+            except ValueError as exc:
+                # served from the playtak games database instead
+                print(f"not storing the moves of game {playtak_id}: {exc}")
+        self.pending_players.setdefault(white_name, [0, 0])[0] += 1
+        self.pending_players.setdefault(black_name, [0, 0])[1] += 1
+        if len(self.pending_games) >= self.write_batch_size:
+            self.flush()
+        return self.max_game_id
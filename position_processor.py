@@ -1,5 +1,5 @@
 from abc import abstractmethod, ABC
-from typing import Union
+from typing import Optional, Union
 from base_types import BoardSize
 
 from tak import GameState
@@ -20,6 +20,12 @@ class PositionProcessor(ABC):
         rating_black: int,
         date: int, # datetime timestamp
         tournament: bool,
+        timertime: Optional[int] = None,
+        timerinc: Optional[int] = None,
+        unrated: Optional[bool] = None,
+        pieces: Optional[int] = None,
+        capstones: Optional[int] = None,
+        moves: Optional[list[str]] = None,
     ) -> int:
         pass
 
@@ -0,0 +1,121 @@
+"""
+Optional per-stage profiling of the import (`ptn_parser.add_games_to_db` into a `PositionDataBase`).
+
+`Profiler.instrument` temporarily replaces the functions of every stage with timing wrappers and restores
+them afterwards, so the import runs the unmodified functions (and costs nothing extra) when it is not profiled.
+The time of a stage excludes the time of the stages it calls, e.g. `GameState.move` is not part of
+`ptn_parser.add_game`, so the stages add up to the profiled time.
+
+The stages run in the profiled process only, profile imports with one job.
+"""
+
+import json
+import time
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Iterator
+
+import ptn_parser
+import symmetry_normalisator
+from position_db import PositionDataBase
+from tak import GameState
+
+# (owner, attribute, stage name) of the instrumented functions
+STAGES: list[tuple[Any, str, str]] = [
+    (ptn_parser, 'add_game', 'ptn_parser.add_game'),
+    (ptn_parser, 'get_moves_array', 'get_moves_array'),
+    (GameState, 'move', 'GameState.move'),
+    (GameState, 'get_tps', 'GameState.get_tps'),
+    (symmetry_normalisator, 'get_tps_orientation', 'get_tps_orientation'),
+    (symmetry_normalisator, 'transform_move', 'transform_move'),
+    (PositionDataBase, 'add_game', 'PositionDataBase.add_game'),
+    (PositionDataBase, 'add_normalized_position', 'PositionDataBase.add_normalized_position'),
+    (PositionDataBase, 'get_position', 'PositionDataBase.get_position (SQLite lookup)'),
+    (PositionDataBase, 'load_moves', 'PositionDataBase.load_moves (SQLite)'),
+    (PositionDataBase, 'is_bot_game', 'PositionDataBase.is_bot_game (SQLite)'),
+    (PositionDataBase, 'flush', 'PositionDataBase.flush (SQLite writes)'),
+    (PositionDataBase, 'commit', 'PositionDataBase.commit (SQLite)'),
+]
+GAMES_STAGE = 'PositionDataBase.add_game'
+POSITIONS_STAGE = 'PositionDataBase.add_normalized_position'
+
+
+class Profiler:
+    def __init__(self):
+        # stage name -> [seconds without the called stages, calls]
+        self.stages: dict[str, list] = {}
+        # seconds spent in called stages, one entry per running stage
+        self.called_seconds: list[float] = []
+        self.seconds = 0.0
+
+    def timed(self, stage: str, function: Callable) -> Callable:
+        stages = self.stages
+        called_seconds = self.called_seconds
+
+        @wraps(function)
+        def timed_function(*args, **kwargs):
+            called_seconds.append(0.0)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                entry = stages.setdefault(stage, [0.0, 0])
+                entry[0] += elapsed - called_seconds.pop()
+                entry[1] += 1
+                if called_seconds:
+                    called_seconds[-1] += elapsed
+
+        return timed_function
+
+    @contextmanager
+    def instrument(self) -> Iterator['Profiler']:
+        """Profiles all `STAGES` while in the `with` block"""
+        originals = [(owner, attribute, owner.__dict__[attribute]) for owner, attribute, _stage in STAGES]
+        for owner, attribute, stage in STAGES:
+            setattr(owner, attribute, self.timed(stage, getattr(owner, attribute)))
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.seconds += time.perf_counter() - start
+            for owner, attribute, original in originals:
+                setattr(owner, attribute, original)
+
+    def calls(self, stage: str) -> int:
+        return self.stages.get(stage, [0.0, 0])[1]
+
+    def report(self) -> dict:
+        games = self.calls(GAMES_STAGE)
+        positions = self.calls(POSITIONS_STAGE)
+        staged_seconds = sum(seconds for seconds, _calls in self.stages.values())
+        return {
+            'seconds': round(self.seconds, 3),
+            'games': games,
+            'positions': positions,
+            'games_per_second': round(games / self.seconds, 1) if self.seconds else 0,
+            'positions_per_second': round(positions / self.seconds, 1) if self.seconds else 0,
+            'stages': {
+                **{
+                    stage: {'seconds': round(seconds, 3), 'calls': calls}
+                    for stage, (seconds, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])
+                },
+                'other': {'seconds': round(max(self.seconds - staged_seconds, 0), 3), 'calls': 0},
+            },
+        }
+
+    def print_report(self):
+        report = self.report()
+        print(f"{'stage':<50} {'seconds':>9} {'share':>6} {'calls':>10} {'us/call':>9}")
+        for stage, entry in report['stages'].items():
+            share = entry['seconds'] / self.seconds * 100 if self.seconds else 0
+            per_call = entry['seconds'] / entry['calls'] * 1e6 if entry['calls'] else 0
+            print(f"{stage:<50} {entry['seconds']:>9.3f} {share:>5.1f}% {entry['calls']:>10} {per_call:>9.1f}")
+        print(
+            f"{report['games']} games, {report['positions']} positions in {report['seconds']}s: "
+            f"{report['games_per_second']} games/s, {report['positions_per_second']} positions/s"
+        )
+
+    def write_report(self, report_file: str):
+        with open(report_file, 'w', encoding='utf-8') as output_file:
+            json.dump(self.report(), output_file, indent=2)
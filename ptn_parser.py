@@ -1,25 +1,25 @@
+import itertools
+import multiprocessing
 import sys
 import typing
+from functools import partial
 
 from tqdm import tqdm
 
+from position_db import NormalizedPly, PositionDataBase
 from position_processor import PositionProcessor
 from tak import GameState
 from db_extractor import get_moves_array
 
+# games handed to a worker process at once, small enough to keep the progress bar moving
+REPLAY_CHUNK_SIZE = 32
 
-def add_game(game: dict, dp: PositionProcessor, max_plies=sys.maxsize):
-    ptn_array = get_moves_array(game['notation'])
-    all_moves = ptn_array[0:min(len(ptn_array), max_plies)]
-
-    # create board
-    tak = GameState(game['size'])
 
-    # add game to database
-    result = game['result']
+def add_game_entry(game: dict, dp: PositionProcessor, moves: typing.Optional[list[str]] = None) -> int:
+    """Adds the game without its positions, `moves` are all PTN moves of the game, read from its notation if not given"""
     komi = int(game['komi'] or 0)
 
-    game_id = dp.add_game(
+    return dp.add_game(
         size=game['size'],
         playtak_id=game['id'],
         white_name=game['player_white'],
@@ -29,9 +29,27 @@ def add_game(game: dict, dp: PositionProcessor, max_plies=sys.maxsize):
         rating_white=game['rating_white'],
         rating_black=game['rating_black'],
         date=game['date'],
-        tournament=bool(game['tournament'])
+        tournament=bool(game['tournament']),
+        timertime=game.get('timertime'),
+        timerinc=game.get('timerinc'),
+        unrated=game.get('unrated'),
+        pieces=game.get('pieces'),
+        capstones=game.get('capstones'),
+        moves=moves if moves is not None else get_moves_array(game['notation']),
     )
 
+
+def add_game(game: dict, dp: PositionProcessor, max_plies=sys.maxsize):
+    ptn_array = get_moves_array(game['notation'])
+    all_moves = ptn_array[0:min(len(ptn_array), max_plies)]
+
+    # create board
+    tak = GameState(game['size'])
+
+    # add game to database
+    result = game['result']
+    game_id = add_game_entry(game, dp, ptn_array)
+
     # make all moves
     last_tps = tak.get_tps()
     for move in all_moves:
@@ -43,10 +61,59 @@ def add_game(game: dict, dp: PositionProcessor, max_plies=sys.maxsize):
     dp.add_position(game_id, None, result, last_tps, None, tak)
 
 
-def add_games_to_db(games: typing.Iterable[dict], dp: PositionProcessor, max_plies=30):
-    games = list(games)
+def replay_game(game: dict, max_plies=sys.maxsize) -> tuple[dict, list[str], list[NormalizedPly]]:
+    """
+    Replays `game` and normalizes every position like `PositionDataBase.add_position` would.
+    Also returns all PTN moves of the game, so the writing process does not parse its notation again.
+    Does not touch any database, so it can run in a worker process.
+    """
+    ptn_array = get_moves_array(game['notation'])
+    all_moves = ptn_array[0:min(len(ptn_array), max_plies)]
+
+    tak = GameState(game['size'])
+    plies: list[NormalizedPly] = []
+
+    last_tps = tak.get_tps()
+    for move in all_moves:
+        tak.move(move)
+        current_tps = tak.get_tps()
+        plies.append(PositionDataBase.normalize_position(move, last_tps, current_tps, tak)[0])
+        last_tps = current_tps
+
+    plies.append(PositionDataBase.normalize_position(None, last_tps, None, tak)[0])
+    return game, ptn_array, plies
+
+
+def add_games_to_db(games: typing.Iterable[dict], dp: PositionProcessor, max_plies=30, jobs=1, total: typing.Optional[int] = None):
+    """
+    Adds all `games` to `dp`, consuming them as they come. `total` is only used for the progress bar.
+    With `jobs > 1` and a `PositionDataBase`, games are replayed by a pool of worker processes
+    while this process writes the results in the original order, so all ids match a serial import.
+    """
+    with tqdm(total=total, mininterval=0.5, maxinterval=2.0) as progress:
+        if jobs > 1 and isinstance(dp, PositionDataBase):
+            def add_replayed_games(replayed_games: typing.Iterable[tuple[dict, list[str], list[NormalizedPly]]]):
+                for game, ptn_array, plies in replayed_games:
+                    game_id = add_game_entry(game, dp, ptn_array)
+                    for ply in plies:
+                        dp.add_normalized_position(game_id, game['result'], ply)
+                    progress.update()
+
+            with multiprocessing.Pool(jobs) as pool:
+                # `imap` reads all of its input at once, so hand it one batch at a time
+                # while the previous batch is written, to keep only two batches in memory
+                games_iter = iter(games)
+                batch_size = jobs * REPLAY_CHUNK_SIZE * 8
+                replayed_games = None
+                while batch := list(itertools.islice(games_iter, batch_size)):
+                    next_replayed_games = pool.imap(partial(replay_game, max_plies=max_plies), batch, chunksize=REPLAY_CHUNK_SIZE)
+                    if replayed_games is not None:
+                        add_replayed_games(replayed_games)
+                    replayed_games = next_replayed_games
+                if replayed_games is not None:
+                    add_replayed_games(replayed_games)
+            return
 
-    with tqdm(total=len(games), mininterval=0.5, maxinterval=2.0) as progress:
         for game in games:
             add_game(game, dp, max_plies)
             progress.update()
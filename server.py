@@ -1,46 +1,52 @@
 #!/usr/bin/env python3
 
 import os
+import re
 import sqlite3
+import subprocess
+import sys
+import threading
 import time
 import traceback
 from contextlib import closing
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta
-from typing import Optional, Union
+from dataclasses import astuple, dataclass, field, replace
+from datetime import datetime
+from typing import Any, Iterable, Iterator, Optional, Union
 
-import requests
-from flask import Flask, json, jsonify, request
+from flask import Flask, Response, g, json, jsonify, request
 from flask_apscheduler import APScheduler
 from flask_cors import CORS
-from werkzeug.exceptions import HTTPException, InternalServerError, NotFound
+from werkzeug.exceptions import BadRequest, HTTPException, InternalServerError, NotFound
 
-import ptn_parser
+import import_worker
 import symmetry_normalisator
-from db_extractor import BOTLIST, get_games_from_db, get_ptn
-from position_db import PositionDataBase
-from base_types import BoardSize, NormalizedTpsString, TpsString, TpsSymmetry, color_to_place_from_tps
+from analysis_cache import VersionedLruCache
+from db_connections import ReadOnlyConnections
+from db_extractor import BOTLIST, get_ptn, to_playtak_notation
+from metrics import MetricsRegistry
+from move_encoding import decode_moves
+from openings_config import (
+    DATA_DIR, DOWNLOAD_PLAYTAK_DB, IMPORT_SUMMARY_FILE, PLAYTAK_GAMES_DB, PROFILE_IMPORT, OpeningsDbConfig,
+    openings_db_configs,
+)
+from position_db import position_key
+from tak import GameState
+from base_types import NormalizedTpsString, PlayerToMove, TpsString, TpsSymmetry, color_to_place_from_tps, result_category
 
-DATA_DIR = 'data'
-PLAYTAK_GAMES_DB = os.path.join(DATA_DIR, 'games_anon.db')
 MAX_GAME_EXAMPLES = 4
 MAX_SUGGESTED_MOVES = 20
-MAX_PLIES = 30
-NUM_PLIES = 12
-NUM_GAMES = 100_000
-MIN_RATING = 1200
-
-@dataclass
-class OpeningsDbConfig:
-    min_rating: int
-    include_bot_games: bool
-    size: BoardSize = BoardSize(6)
-
-    @property
-    def db_file_name(self):
-        bots_text = "bots" if self.include_bot_games else "nobots"
-        file_name = f"openings_s{self.size}_{self.min_rating}_{bots_text}.db"
-        return os.path.join(DATA_DIR, file_name)
+ANALYSIS_CACHE_SIZE = 20_000
+MAX_BATCH_POSITIONS = 1000
+POSITION_IDS_PER_QUERY = 500
+DEFAULT_TREE_DEPTH = 4
+MAX_TREE_DEPTH = 12
+DEFAULT_TREE_CHILDREN = 5
+MAX_TREE_CHILDREN = MAX_SUGGESTED_MOVES
+MAX_TREE_NODES = 20_000
+ALL_DATABASES = -1 # db id of the player names of all databases
+IMPORT_POLL_SECONDS = 1.0 # how often the summary of a running import is read for newly swapped databases
+# a square of a TPS row after expanding `xn`
+TPS_SQUARE_RE = re.compile(r'x|[12]+[SC]?')
 
 @dataclass
 class PlayerInfo:
@@ -79,22 +85,72 @@ class PositionAnalysis:
     draw: int = 0# total draws,
     moves: list[PlayerInfo] = field(default_factory=list) # explored moves,
     games: list[GameInfo] = field(default_factory=list) # top games
+    cache_hit: bool = False # whether the analysis was served from `position_analysis_cache`
 
+@dataclass
+class OpeningTreeNode:
+    tps: str # in the orientation of the requested root, with the move number
+    ptn: Optional[str] = None # move leading to this position, `None` for the root
+    white: int = 0 # white wins
+    black: int = 0 # black wins
+    draw: int = 0 # draws
+    transposition: bool = False # position appeared earlier in the tree, its children are listed there
+    children: list['OpeningTreeNode'] = field(default_factory=list)
+
+@dataclass
+class OpeningTree:
+    config: OpeningsDbConfig # used DB configuration
+    settings: AnalysisSettings
+    max_depth: int # plies below the root
+    max_children: int # per node, the most played moves first
+    min_games: int # of a move to be listed
+    truncated: bool = False # stopped after `MAX_TREE_NODES` nodes
+    root: Optional[OpeningTreeNode] = None # `None` if the position is not in the database
 
-openings_db_configs = [
-    OpeningsDbConfig(min_rating=MIN_RATING, include_bot_games=False, size=BoardSize(6)),
-    OpeningsDbConfig(min_rating=1700, include_bot_games=True, size=BoardSize(6)),
-    OpeningsDbConfig(min_rating=1200, include_bot_games=True, size=BoardSize(7)),
-    OpeningsDbConfig(min_rating=1500, include_bot_games=True, size=BoardSize(8)),
-    # careful, 5x5 with 1500 elo and bots contains ~60k
-    OpeningsDbConfig(min_rating=1500, include_bot_games=True, size=BoardSize(5)),
-]
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
 app.config['JSON_SORT_KEYS'] = False
 app.config['SCHEDULER_API_ENABLED'] = True
 
+# analyses of normalized positions, keyed by db id, see `get_position_analysis`
+position_analysis_cache: VersionedLruCache['PositionAnalysis'] = VersionedLruCache(ANALYSIS_CACHE_SIZE)
+# sorted names of the players of white and black games, by db id or `ALL_DATABASES`, see `get_player_names_index`
+player_names_cache: VersionedLruCache[tuple[list[str], list[str]]] = VersionedLruCache(len(openings_db_configs) + 1)
+
+# connections of the request threads to all databases, see `ReadOnlyConnections`
+read_connections: dict[str, ReadOnlyConnections] = {
+    db_file: ReadOnlyConnections(db_file)
+    for db_file in [PLAYTAK_GAMES_DB, *(config.db_file_name for config in openings_db_configs)]
+}
+
+# served at `/metrics`, the `db_id` labels are indices of `openings_db_configs`
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram(
+    'takexplorer_request_duration_seconds', "Latency of API requests", ('route', 'method', 'status', 'db_id'))
+sql_seconds = metrics.histogram(
+    'takexplorer_sql_duration_seconds', "Time to execute and fetch SQL statements by class", ('statement', 'db_id'))
+cache_lookups = metrics.counter(
+    'takexplorer_cache_lookups_total', "Lookups of the analysis and player name caches", ('cache', 'db_id', 'result'))
+cache_entries = metrics.gauge('takexplorer_cache_entries', "Entries held by a cache", ('cache',))
+import_runs = metrics.counter('takexplorer_import_runs_total', "Runs of the import worker", ('result',))
+import_seconds = metrics.gauge('takexplorer_import_duration_seconds', "Duration of the last import of all databases")
+import_database_seconds = metrics.gauge(
+    'takexplorer_import_database_duration_seconds', "Duration of the last import into a database", ('db_id',))
+imported_games = metrics.counter('takexplorer_imported_games_total', "Games imported into a database", ('db_id',))
+import_games_per_second = metrics.gauge(
+    'takexplorer_import_games_per_second', "Throughput of the last import into a database", ('db_id',))
+metric_db_ids = {
+    PLAYTAK_GAMES_DB: 'games',
+    **{config.db_file_name: str(db_id) for db_id, config in enumerate(openings_db_configs)},
+}
+
+def collect_cache_entries():
+    cache_entries.set(len(position_analysis_cache), cache='position_analysis')
+    cache_entries.set(len(player_names_cache), cache='player_names')
+
+metrics.add_collector(collect_cache_entries)
+
 scheduler = APScheduler()
 scheduler.init_app(app)
 scheduler.start()
@@ -115,55 +171,86 @@ def to_symmetric_tps(tps: TpsString) -> tuple[NormalizedTpsString, TpsSymmetry]:
     return symmetry_normalisator.get_tps_orientation(tps)
 
 
-def download_playtak_db(url: str, destination: str):
-    playtak_db_min_age = timedelta(hours=10)
-    if (
-        os.path.exists(destination)
-        and (time.time() - os.stat(destination).st_mtime) <= playtak_db_min_age.seconds
-    ):
-        print(f"Playtak database already exists and is less than {playtak_db_min_age} old")
-        return
+def time_sql(statement: str, db_file: str):
+    """Context manager recording the time of SQL `statement` class on `db_file` in `sql_seconds`"""
+    return sql_seconds.time(statement=statement, db_id=metric_db_ids[db_file])
 
-    print("Fetching latest playtak games DB...")
-    try:
-        with requests.get(url, timeout=None) as requ, open(destination,'wb') as output_file:
-            output_file.write(requ.content)
-    except Exception as exc:  # pylint: disable=broad-exception-caught
-        print("Cannot reach playtak server")
-        if not os.path.exists(destination):
-            print("No saved games database. exiting.")
-            raise Exception("Failed to download playtak games database") from exc # pylint: disable=broad-exception-raised
-        print("Using potentially outdated save of games database.")
-
-def update_openings_db(playtak_db: str, config: OpeningsDbConfig):
-    print(f"extracting games from {playtak_db} to {config.db_file_name}")
-    with PositionDataBase(config.db_file_name) as pos_db:
-        games = get_games_from_db(
-            db_file=PLAYTAK_GAMES_DB,
-            board_size=config.size,
-            num_plies=NUM_PLIES,
-            num_games=NUM_GAMES,
-            min_rating=config.min_rating,
-            player_white=None,
-            player_black=None,
-            start_id=pos_db.max_id,
-            exclude_bots=not config.include_bot_games,
-        )
 
-        print("building opening table...")
-        ptn_parser.add_games_to_db(games, pos_db, max_plies=MAX_PLIES)
-        pos_db.commit()
+def invalidate_database(db_id: int):
+    """Drops everything cached about database `db_id` after its file was swapped"""
+    position_analysis_cache.invalidate(db_id)
+    player_names_cache.invalidate(db_id)
+    player_names_cache.invalidate(ALL_DATABASES)
+    read_connections[openings_db_configs[db_id].db_file_name].recycle()
 
-        print("...done!")
+# held while an import runs, a scheduled import and one started through the scheduler API must not overlap
+import_lock = threading.Lock()
 
 # import dayly update of playtak database
 @scheduler.task('cron', id='import_playtak_games', hour='17', minute="10", misfire_grace_time=900)
 def import_playtak_games():
-    download_playtak_db('https://www.playtak.com/games_anon.db', PLAYTAK_GAMES_DB)
+    """Runs the import unless one is running already, see `run_import_worker`"""
+    if not import_lock.acquire(blocking=False):
+        print("import already running")
+        return
+    try:
+        run_import_worker()
+    finally:
+        import_lock.release()
 
-    for config in openings_db_configs:
-        update_openings_db(PLAYTAK_GAMES_DB, config)
-    print(f"updated {len(openings_db_configs)} opening dbs")
+
+def read_swapped_databases() -> list[dict]:
+    """Databases the running import already swapped in, as listed in its summary"""
+    if not os.path.exists(IMPORT_SUMMARY_FILE):
+        return []
+    return import_worker.read_import_summary(IMPORT_SUMMARY_FILE)['databases']
+
+
+def run_import_worker():
+    """
+    Runs `import_worker.py` in its own process, so the import neither competes for the GIL
+    nor locks the databases of the requests.
+    Every database is invalidated as soon as the summary of the worker lists it as swapped in,
+    and all of them if the worker fails, as it may have swapped some without listing them.
+    """
+    worker = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_worker.py')
+    options = [
+        *(['--profile'] if PROFILE_IMPORT else []),
+        *([] if DOWNLOAD_PLAYTAK_DB else ['--no-download']),
+    ]
+    # the summary of the last run must not be taken for databases swapped by this one
+    if os.path.exists(IMPORT_SUMMARY_FILE):
+        os.remove(IMPORT_SUMMARY_FILE)
+    invalidated: set[int] = set()
+
+    def invalidate_swapped_databases():
+        for database in read_swapped_databases():
+            db_id = database['db_id']
+            if db_id in invalidated:
+                continue
+            invalidated.add(db_id)
+            invalidate_database(db_id)
+            import_database_seconds.set(database['seconds'], db_id=db_id)
+            imported_games.inc(database['imported_games'], db_id=db_id)
+            import_games_per_second.set(database['imported_games'] / max(database['seconds'], 0.001), db_id=db_id)
+
+    with subprocess.Popen([sys.executable, worker, '--summary', IMPORT_SUMMARY_FILE, *options]) as process:
+        while process.poll() is None:
+            time.sleep(IMPORT_POLL_SECONDS)
+            invalidate_swapped_databases()
+
+    if process.returncode != 0:
+        print(f"import worker failed with exit code {process.returncode}")
+        import_runs.inc(result='failed')
+        for db_id in range(len(openings_db_configs)):
+            invalidate_database(db_id)
+        return
+
+    invalidate_swapped_databases()
+    summary = import_worker.read_import_summary(IMPORT_SUMMARY_FILE)
+    import_runs.inc(result='succeeded')
+    import_seconds.set(summary['seconds'])
+    print(f"import finished in {summary['seconds']}s:", summary['databases'])
 
 
 @app.errorhandler(HTTPException)  # type: ignore
@@ -191,6 +278,30 @@ def handle_exception(exc: Exception):
     return handle_httpexception(err)
 
 
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def observe_request_duration(response: Response):
+    """Records the request in `request_seconds`, handlers set `g.db_id` to label the database they used"""
+    if 'request_started' in g:
+        request_seconds.observe(
+            time.perf_counter() - g.request_started,
+            route=request.url_rule.rule if request.url_rule else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+            db_id=g.get('db_id', ''),
+        )
+    return response
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 @app.route('/', methods=['GET'])
 def hello():
     return "hello"
@@ -199,30 +310,73 @@ def hello():
 def options():
     return jsonify(openings_db_configs)
 
-@app.route('/api/v1/game/<game_id>', methods=['get'])
-def get_game(game_id):
-    select_game_sql = "SELECT * FROM games WHERE id=:game_id;"
-    with closing(sqlite3.connect(PLAYTAK_GAMES_DB)) as db:
-        db.row_factory = sqlite3.Row
+# fields of `/api/v1/game/<id>` besides `ptn`, the columns of the playtak `games` table
+GAME_FIELDS = [
+    'id', 'date', 'size', 'player_white', 'player_black', 'notation', 'result', 'timertime', 'timerinc',
+    'rating_white', 'rating_black', 'unrated', 'tournament', 'komi', 'pieces', 'capstones',
+]
+SELECT_PLAYTAK_GAME_SQL = f"SELECT {', '.join(GAME_FIELDS)} FROM games WHERE id=:game_id;"
+# games imported into an openings database with their moves, see `PositionDataBase.add_game`
+SELECT_IMPORTED_GAME_SQL = """
+    SELECT games.playtak_id AS id, games.date, games.size, games.white AS player_white, games.black AS player_black,
+        games.result, games.timertime, games.timerinc, games.rating_white, games.rating_black, games.unrated,
+        games.tournament, games.komi, games.pieces, games.capstones, game_moves.moves
+    FROM games, game_moves
+    WHERE games.playtak_id = :playtak_id AND game_moves.game_id = games.id
+    LIMIT 1;
+"""
+
+def get_imported_game(playtak_id: int) -> Optional[tuple[int, dict]]:
+    """Db id and row of the game from the first openings database storing its moves, `None` if there is none"""
+    for db_id, config in enumerate(openings_db_configs):
+        try:
+            db = read_connections[config.db_file_name].connection()
+            with closing(db.cursor()) as cur:
+                with time_sql('game', config.db_file_name):
+                    cur.execute(SELECT_IMPORTED_GAME_SQL, { "playtak_id": playtak_id })
+                    row = cur.fetchone()
+        except sqlite3.OperationalError:
+            # not imported yet, or by a version that did not store moves (no `game_moves` table)
+            continue
+        if row is not None:
+            return db_id, dict(row)
+    return None
+
+@app.route('/api/v1/game/<int:game_id>', methods=['get'])
+def get_game(game_id: int):
+    """
+    The game with playtak id `game_id`. Read from the openings databases if they store its moves,
+    otherwise from the playtak games database, which does not have to exist on the serving host.
+    """
+    imported_game = get_imported_game(game_id)
+    if imported_game is not None:
+        g.db_id, row = imported_game
+        moves = decode_moves(row['moves'])
+        row['notation'] = to_playtak_notation(moves)
+        game = {field: row[field] for field in GAME_FIELDS}
+        game['ptn'] = get_ptn(game, moves)
+    else:
+        if not os.path.exists(PLAYTAK_GAMES_DB):
+            raise NotFound(f"game {game_id} was not imported")
+        db = read_connections[PLAYTAK_GAMES_DB].connection()
         with closing(db.cursor()) as cur:
-            cur.execute(select_game_sql, { "game_id": game_id })
-
-            game = dict(cur.fetchone())
-            game['ptn'] = get_ptn(game)
-            komi = float(game['komi'] or 0) / 2 # correct komi
-            game['komi'] = komi
-
+            with time_sql('game', PLAYTAK_GAMES_DB):
+                cur.execute(SELECT_PLAYTAK_GAME_SQL, { "game_id": game_id })
+                row = cur.fetchone()
+        if row is None:
+            raise NotFound(f"game {game_id} does not exist")
+        game = dict(row)
+        game['ptn'] = get_ptn(game)
+
+    komi = float(game['komi'] or 0) / 2 # correct komi
+    game['komi'] = komi
     return jsonify(game)
 
-def get_position_analysis(
-    config: OpeningsDbConfig,
-    settings: AnalysisSettings,
-    tps: TpsString,
-) -> PositionAnalysis:
-    print(f'requested position with white: {settings.white}, black: {settings.black}, min rating: {settings.min_rating}, tps: {tps}')
-
-    player_to_move = color_to_place_from_tps(tps)
-
+def normalize_settings(config: OpeningsDbConfig, settings: AnalysisSettings):
+    """
+    Applies the limits of `config` to `settings` and brings all values into one form.
+    `settings` is part of the response, so the one making the request knows what was actually applied.
+    """
     settings.min_rating = max(config.min_rating, settings.min_rating) if settings.min_rating else config.min_rating
     settings.include_bot_games = config.include_bot_games and settings.include_bot_games
     settings.min_date = datetime_from(settings.min_date).isoformat() if settings.min_date else None
@@ -232,204 +386,506 @@ def get_position_analysis(
     else:
         raise ValueError(f"tournament field is '{settings.tournament}' of type '{type(settings.tournament)}' but should be bool or null")
 
+    komi: Optional[list[float]] = settings.komi if isinstance(settings.komi, list) \
+        else [settings.komi] if settings.komi is not None \
+        else None
+    # db stores komi as an integer (double of what it actually is)
+    settings.komi = [round(k * 2, None) / 2 for k in komi] if komi else None
+
+
+def is_int(value: Any) -> bool:
+    # `bool` is a subclass of `int`
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def is_number(value: Any) -> bool:
+    return is_int(value) or isinstance(value, float)
+
+
+def is_one_or_more(check):
+    """Accepts `None`, a value passing `check` or a list of such values"""
+    return lambda value: value is None or check(value) or isinstance(value, list) and all(map(check, value))
+
+
+# type checks of the fields of `AnalysisSettings` in request bodies
+SETTINGS_CHECKS = {
+    'white': is_one_or_more(lambda value: isinstance(value, str)),
+    'black': is_one_or_more(lambda value: isinstance(value, str)),
+    'min_rating': is_int,
+    'max_suggested_moves': is_int,
+    'include_bot_games': lambda value: isinstance(value, bool),
+    'komi': is_one_or_more(is_number),
+    'min_date': lambda value: value is None or isinstance(value, str),
+    'max_date': lambda value: value is None or isinstance(value, str),
+    'tournament': lambda value: value is None or isinstance(value, bool),
+}
+
+
+def parse_settings(json_data: Any, config: OpeningsDbConfig) -> AnalysisSettings:
+    """`AnalysisSettings` from a request body, raises `BadRequest` unless it is an object of valid settings"""
+    if not json_data:
+        return AnalysisSettings()
+    if not isinstance(json_data, dict):
+        raise BadRequest("settings must be a JSON object")
+    unknown_keys = set(json_data) - set(SETTINGS_CHECKS)
+    if unknown_keys:
+        raise BadRequest(f"unknown settings {sorted(unknown_keys)}")
+    invalid_keys = [key for key, value in json_data.items() if not SETTINGS_CHECKS[key](value)]
+    if invalid_keys:
+        raise BadRequest(f"invalid values of settings {sorted(invalid_keys)}")
+    settings = AnalysisSettings(**json_data)
+    try:
+        normalize_settings(config, replace(settings))
+    except (TypeError, ValueError) as exc:
+        raise BadRequest(f"invalid settings: {exc}") from exc
+    return settings
+
 
-    # we don't care about move number:
-    sym_tps, symmetry = to_symmetric_tps(tps)
-    print(f"Searching for player={player_to_move} with", config, settings, "sym_tps=", sym_tps)
+def parse_tps(tps: str, config: OpeningsDbConfig) -> TpsString:
+    """`tps` if it is a position on the board size of `config`, raises `BadRequest` otherwise"""
+    parts = tps.split(' ')
+    rows = [row.split(',') for row in symmetry_normalisator.expand_tps_xn(TpsString(parts[0])).split('/')]
+    if (
+        len(parts) != 3
+        or parts[1] not in ('1', '2')
+        or not parts[2].isdecimal()
+        or len(rows) != config.size
+        or any(len(row) != config.size or not all(TPS_SQUARE_RE.fullmatch(square) for square in row) for row in rows)
+    ):
+        raise BadRequest(f"invalid TPS '{tps}' for board size {config.size}")
+    return TpsString(tps)
 
-    select_results_sql = "SELECT * FROM positions WHERE tps=:sym_tps AND player_to_move=:player_to_move"
 
-    with closing(sqlite3.connect(config.db_file_name)) as db:
-        db.row_factory = sqlite3.Row
-        with closing(db.cursor()) as cur:
-            cur.execute(select_results_sql, {"sym_tps": sym_tps, "player_to_move": player_to_move})
+def settings_cache_key(settings: AnalysisSettings) -> tuple:
+    """Hashable form of normalized `settings`"""
+    return tuple(tuple(value) if isinstance(value, list) else value for value in astuple(settings))
 
-            rows = cur.fetchone()
-            if rows is None:
-                return PositionAnalysis(config=config, settings=settings)
-
-            rows = dict(rows)
-            if rows['moves'] == '':
-                position_moves = []
-            else:
-                position_moves = rows['moves'].split(';')
-
-            moves_list: list[tuple[str, str]] = list(map(lambda x: x.split(','), position_moves))
-
-            explored_position_ids: set[str] = set()
-            moves = []
-
-            total_wwins = 0
-            total_bwins = 0
-            total_draws = 0
-            def build_condition(
-                field_name: str,
-                values: Optional[Union[list[str], list[int], list[float], int, float, str, bool]],
-                negate: bool = False,
-                variable_name: Optional[str] = None,
-            ):
-                """
-                Returns a partial SQL condition checking that `field_name` equals or is in `values`
-                @param variable_name The placeholder-name used in the SQL query. Uses `field_name` if `None`.
-                """
-                if variable_name is None:
-                    variable_name = field_name
-                if values == [] or values is None or values == "":  # intentionally allow e.g. `0``
-                    return "", {}
-
-                if isinstance(values, list) and len(values) == 1:
-                    values = values[0]
-
-                if isinstance(values, list):
-                    kv_map = {f'{field_name}{i}':v for i, v in enumerate(values)}
-                    field_names = [f":{k}" for k in kv_map.keys()]
-                    operator = 'NOT IN' if negate else 'IN'
-                    return f"AND games.{field_name} {operator} ({','.join(field_names)})", kv_map
-
-                operator = '!=' if negate else '='
-                return f"AND games.{field_name} = :{field_name}", { field_name: values }
-
-            white_str, white_vals = build_condition("white", settings.white)
-            black_str, black_vals = build_condition("black", settings.black)
-            bot_names = [] if settings.include_bot_games else BOTLIST
-            exclude_bots_white_str, excl_bots_white_vals = build_condition("white", bot_names, True, "excl_white_names")
-            exclude_bots_black_str, excl_bots_black_vals = build_condition("black", bot_names, True, "excl_black_names")
-
-            # db stores komi as an integer (double of what it actually is)
-            komi_raw: Optional[list[float]] = settings.komi if isinstance(settings.komi, list) \
-                else [settings.komi] if settings.komi is not None \
-                else None
-            komi: Optional[list[int]] = [round(k * 2, None) for k in komi_raw] if komi_raw else None
-            komi_str, komi_vals  = build_condition("komi", komi)
-            # update `settings` because it's part of the response and thus
-            # the one making the response knows, what was actually applied
-            settings.komi = [k / 2 for k in komi] if komi else None
-
-            min_date_str = "AND games.date >= :min_date" if settings.min_date else ""
-            max_date_str = "AND games.date <= :max_date" if settings.max_date else ""
-            tournament_str, tournament_vals = build_condition("tournament", settings.tournament)
-
-            default_query_vars = {
+
+def get_position_analysis(
+    db_id: int,
+    settings: AnalysisSettings,
+    tps: TpsString,
+) -> PositionAnalysis:
+    """
+    Analysis of `tps` in its own orientation.
+    Analyses are cached in the normalized orientation until the next import into the database.
+    """
+    print(f'requested position with white: {settings.white}, black: {settings.black}, min rating: {settings.min_rating}, tps: {tps}')
+    return get_position_analyses(db_id, settings, [tps])[0]
+
+
+def get_position_analyses(
+    db_id: int,
+    settings: AnalysisSettings,
+    tps_list: list[TpsString],
+) -> list[PositionAnalysis]:
+    """
+    Analyses of all positions of `tps_list` with the same `settings`, see `get_position_analysis`.
+    Symmetric positions are looked up only once.
+    """
+    config = openings_db_configs[db_id]
+    normalize_settings(config, settings)
+    settings_key = settings_cache_key(settings)
+
+    normalized_analyses: dict[tuple, tuple[PositionAnalysis, bool]] = {}
+    analyses = []
+    for tps in tps_list:
+        player_to_move = color_to_place_from_tps(tps)
+        # we don't care about move number:
+        sym_tps, symmetry = to_symmetric_tps(tps)
+        cache_key = (sym_tps, player_to_move, settings_key)
+
+        if cache_key in normalized_analyses:
+            analysis, cache_hit = normalized_analyses[cache_key]
+        else:
+            analysis = position_analysis_cache.get(db_id, cache_key)
+            cache_hit = analysis is not None
+            cache_lookups.inc(cache='position_analysis', db_id=db_id, result='hit' if cache_hit else 'miss')
+            if analysis is None:
+                generation = position_analysis_cache.generation(db_id)
+                analysis = get_normalized_position_analysis(config, settings, sym_tps, player_to_move)
+                position_analysis_cache.put(db_id, cache_key, analysis, generation)
+            normalized_analyses[cache_key] = (analysis, cache_hit)
+
+        moves = [
+            {**move, "ptn": symmetry_normalisator.transposed_transform_move(move["ptn"], symmetry, config.size)}
+            for move in analysis.moves
+        ]
+        analyses.append(PositionAnalysis(
+            config = config,
+            settings = settings,
+            white = analysis.white,
+            black = analysis.black,
+            draw = analysis.draw,
+            moves = moves,
+            games = analysis.games,
+            cache_hit = cache_hit,
+        ))
+    return analyses
+
+
+def build_condition(
+    field_name: str,
+    values: Optional[Union[list[str], list[int], list[float], int, float, str, bool]],
+    negate: bool = False,
+    variable_name: Optional[str] = None,
+) -> tuple[str, dict[str, Any]]:
+    """
+    Returns a partial SQL condition checking that `field_name` equals or is in `values`
+    @param variable_name The placeholder-name used in the SQL query. Uses `field_name` if `None`.
+    """
+    if variable_name is None:
+        variable_name = field_name
+    if values == [] or values is None or values == "":  # intentionally allow e.g. `0``
+        return "", {}
+
+    if isinstance(values, list) and len(values) == 1:
+        values = values[0]
+
+    if isinstance(values, list):
+        kv_map = {f'{variable_name}{i}':v for i, v in enumerate(values)}
+        field_names = [f":{k}" for k in kv_map.keys()]
+        operator = 'NOT IN' if negate else 'IN'
+        return f"AND games.{field_name} {operator} ({','.join(field_names)})", kv_map
+
+    operator = '!=' if negate else '='
+    return f"AND games.{field_name} {operator} :{variable_name}", { variable_name: values }
+
+
+def build_games_filter(config: OpeningsDbConfig, settings: AnalysisSettings) -> tuple[str, dict[str, Any], bool]:
+    """
+    Returns the SQL conditions on `games` applying the normalized `settings`, each starting with `AND`,
+    their query parameters and whether they filter more games than the import into `config` did.
+    """
+    white_str, white_vals = build_condition("white", settings.white)
+    black_str, black_vals = build_condition("black", settings.black)
+    bot_names = [] if settings.include_bot_games else BOTLIST
+    exclude_bots_white_str, excl_bots_white_vals = build_condition("white", bot_names, True, "excl_white_names")
+    exclude_bots_black_str, excl_bots_black_vals = build_condition("black", bot_names, True, "excl_black_names")
+
+    # db stores komi as an integer (double of what it actually is)
+    komi: Optional[list[int]] = [round(k * 2, None) for k in settings.komi] if settings.komi else None # type: ignore # normalized to a list
+    komi_str, komi_vals  = build_condition("komi", komi)
+
+    min_date_str = "AND games.date >= :min_date" if settings.min_date else ""
+    max_date_str = "AND games.date <= :max_date" if settings.max_date else ""
+    tournament_str, tournament_vals = build_condition("tournament", settings.tournament)
+
+    conditions = f"""
+        AND games.rating_white >= :min_rating
+        AND games.rating_black >= :min_rating
+        {tournament_str}
+        {min_date_str}
+        {max_date_str}
+        {white_str}
+        {black_str}
+        {exclude_bots_white_str}
+        {exclude_bots_black_str}
+        {komi_str}
+    """
+    query_vars = {
+        "min_rating": settings.min_rating,
+        "min_date": playtak_timestamp_from(settings.min_date) if settings.min_date else None,
+        "max_date": playtak_timestamp_from(settings.max_date) if settings.max_date else None,
+        **white_vals,
+        **black_vals,
+        **excl_bots_white_vals,
+        **excl_bots_black_vals,
+        **komi_vals,
+        **tournament_vals,
+    }
+    uses_game_filters = bool(
+        white_str or black_str or komi_str or tournament_str or min_date_str or max_date_str
+        or settings.min_rating > config.min_rating
+    )
+    return conditions, query_vars, uses_game_filters
+
+
+def chunk_position_ids(position_ids: Iterable[int]) -> Iterator[tuple[str, dict[str, int]]]:
+    """Placeholder list for an `IN (...)` condition and its query parameters, per `POSITION_IDS_PER_QUERY` ids"""
+    position_ids = list(position_ids)
+    for chunk_start in range(0, len(position_ids), POSITION_IDS_PER_QUERY):
+        chunk = position_ids[chunk_start:chunk_start + POSITION_IDS_PER_QUERY]
+        ids_vars = {f"position_id{i}": position_id for i, position_id in enumerate(chunk)}
+        yield ','.join(f":{name}" for name in ids_vars), ids_vars
+
+
+def get_position_moves(cur: sqlite3.Cursor, position_ids: Iterable[int]) -> dict[int, list[tuple[str, int]]]:
+    """(move, next position id) of all moves from `position_ids`, in the normalized orientation of each position"""
+    moves: dict[int, list[tuple[str, int]]] = {}
+    for ids_str, ids_vars in chunk_position_ids(position_ids):
+        cur.execute(f"""
+            SELECT position_id, move, next_position_id
+            FROM position_moves
+            WHERE position_id IN ({ids_str})
+            ORDER BY position_id, move
+        """, ids_vars)
+        for row in cur.fetchall():
+            moves.setdefault(row['position_id'], []).append((row['move'], row['next_position_id']))
+    return moves
+
+
+def get_position_results(
+    cur: sqlite3.Cursor,
+    position_ids: Iterable[int],
+    settings: AnalysisSettings,
+    games_filter: str,
+    query_vars: dict[str, Any],
+    uses_game_filters: bool,
+) -> dict[int, tuple[int, int, int]]:
+    """
+    (white wins, black wins, draws) of all `position_ids` with matching games,
+    queried in chunks of `POSITION_IDS_PER_QUERY` positions.
+    `games_filter`, `query_vars` and `uses_game_filters` as returned by `build_games_filter`.
+    """
+    results: dict[int, tuple[int, int, int]] = {}
+    for ids_str, ids_vars in chunk_position_ids(position_ids):
+        # the result counters of a position include all games, so they can only be used without game filters
+        if not uses_game_filters:
+            cur.execute(f"""
+                SELECT position_id, SUM(white) AS white, SUM(black) AS black, SUM(draw) AS draw
+                FROM position_results
+                WHERE position_id IN ({ids_str})
+                    AND bot_game <= :include_bot_games
+                GROUP BY position_id
+            """, {"include_bot_games": settings.include_bot_games, **ids_vars})
+            for row in cur.fetchall():
+                results[row['position_id']] = (row['white'], row['black'], row['draw'])
+            continue
+
+        # no need to specify player_to_move here, because we're walking by positions.id
+        cur.execute(f"""
+            SELECT game_position_xref.position_id, games.result, count(games.result) AS count
+            FROM game_position_xref, games
+            WHERE game_position_xref.position_id IN ({ids_str})
+                AND games.id = game_position_xref.game_id
+                {games_filter}
+            GROUP BY game_position_xref.position_id, games.result
+        """, {**query_vars, **ids_vars})
+        for row in cur.fetchall():
+            wwins, bwins, draws = results.get(row['position_id'], (0, 0, 0))
+            category = result_category(row['result'])
+            if category == 'black':
+                bwins += row['count']
+            elif category == 'white':
+                wwins += row['count']
+            elif category == 'draw':
+                draws += row['count']
+            results[row['position_id']] = (wwins, bwins, draws)
+    return results
+
+
+def get_normalized_position_analysis(
+    config: OpeningsDbConfig,
+    settings: AnalysisSettings,
+    sym_tps: NormalizedTpsString,
+    player_to_move: PlayerToMove,
+) -> PositionAnalysis:
+    """Analysis of the normalized position `sym_tps`, the moves are in the same orientation"""
+    print(f"Searching for player={player_to_move} with", config, settings, "sym_tps=", sym_tps)
+
+    select_results_sql = "SELECT * FROM positions WHERE key=:key AND tps=:sym_tps AND player_to_move=:player_to_move"
+
+    db_file = config.db_file_name
+    db = read_connections[db_file].connection()
+    with closing(db.cursor()) as cur:
+        with time_sql('position_lookup', db_file):
+            cur.execute(select_results_sql, {
+                "key": position_key(sym_tps, player_to_move),
+                "sym_tps": sym_tps,
                 "player_to_move": player_to_move,
-                "min_rating": settings.min_rating,
-                "min_date": playtak_timestamp_from(settings.min_date) if settings.min_date else None,
-                "max_date": playtak_timestamp_from(settings.max_date) if settings.max_date else None,
-                **white_vals,
-                **black_vals,
-                **excl_bots_white_vals,
-                **excl_bots_black_vals,
-                **komi_vals,
-                **tournament_vals,
-            }
-
-            for (move, position_id) in moves_list:
-                if position_id in explored_position_ids:
-                    continue
-                explored_position_ids.add(position_id)
-
-                # no need to specify player_to_move here, because we're already walking by positions.id
-                select_games_sql = f"""
-                    SELECT games.result, count(games.result) AS count
-                    FROM game_position_xref, games, positions
-                    WHERE game_position_xref.position_id = positions.id
-                        AND games.id = game_position_xref.game_id
-                        AND positions.id = {position_id}
-                        AND games.rating_white >= :min_rating
-                        AND games.rating_black >= :min_rating
-                        {tournament_str}
-                        {min_date_str}
-                        {max_date_str}
-                        {white_str}
-                        {black_str}
-                        {exclude_bots_white_str}
-                        {exclude_bots_black_str}
-                        {komi_str}
-                    GROUP BY games.result
-                """
-                cur.execute(select_games_sql, default_query_vars)
-                exe_res = list(cur.fetchall())
-                if len(exe_res) == 0:
-                    continue
-
-                wwins = 0
-                bwins = 0
-                draws = 0
-                for next_row in map(dict, exe_res):
-                    if next_row['result'].startswith('0-'):
-                        bwins += next_row['count']
-                    elif next_row['result'].endswith('-0'):
-                        wwins += next_row['count']
-                    elif next_row['result'] == '1/2-1/2':
-                        draws += next_row['count']
-
-                total_wwins += wwins
-                total_bwins += bwins
-                total_draws += draws
-
-                move = symmetry_normalisator.transposed_transform_move(
-                    move,
-                    symmetry,
-                    config.size,
-                )
-
-                moves.append({"ptn": move, "white": wwins, "black": bwins, "draw": draws})
-
-            moves.sort(key=lambda x: x['white']+x['black']+x['draw'], reverse=True)
-
-            position_analysis = PositionAnalysis(
-                config = config,
-                settings = settings,
-                white = total_wwins,
-                black = total_bwins,
-                draw = total_draws,
-                moves = moves[:settings.max_suggested_moves],
-                games = [],
+            })
+            rows = cur.fetchone()
+        if rows is None:
+            return PositionAnalysis(config=config, settings=settings)
+
+        rows = dict(rows)
+        with time_sql('position_moves', db_file):
+            cur.execute(
+                "SELECT move, next_position_id FROM position_moves WHERE position_id=:position_id",
+                {"position_id": rows['id']},
+            )
+            moves_list: list[tuple[str, int]] = [(row['move'], row['next_position_id']) for row in cur.fetchall()]
+
+        games_filter, default_query_vars, uses_game_filters = build_games_filter(config, settings)
+        with time_sql('child_aggregation', db_file):
+            child_results = get_position_results(
+                cur,
+                {position_id for (_move, position_id) in moves_list},
+                settings,
+                games_filter,
+                default_query_vars,
+                uses_game_filters,
             )
 
-            # get top games
-            select_games_sql = f"""
-                SELECT games.id, games.playtak_id, games.white, games.black, games.result, games.komi, games.rating_white, games.rating_black, games.date, games.tournament,
-                    game_position_xref.game_id, game_position_xref.position_id,
-                    positions.id, positions.tps, (games.rating_white+games.rating_black)/2 AS avg_rating
-                FROM game_position_xref, games, positions
-                WHERE game_position_xref.position_id=positions.id
-                    AND games.id = game_position_xref.game_id
-                    AND positions.tps = :sym_tps
-                    AND positions.player_to_move = :player_to_move
-                    AND games.rating_white >= :min_rating
-                    AND games.rating_black >= :min_rating
-                    {tournament_str}
-                    {min_date_str}
-                    {max_date_str}
-                    {white_str}
-                    {black_str}
-                    {exclude_bots_white_str}
-                    {exclude_bots_black_str}
-                    {komi_str}
-                ORDER BY AVG_rating DESC
-                LIMIT {MAX_GAME_EXAMPLES};
-            """
+        explored_position_ids: set[int] = set()
+        moves = []
+
+        total_wwins = 0
+        total_bwins = 0
+        total_draws = 0
+        for (move, position_id) in moves_list:
+            if position_id in explored_position_ids or position_id not in child_results:
+                continue
+            explored_position_ids.add(position_id)
+
+            wwins, bwins, draws = child_results[position_id]
+            total_wwins += wwins
+            total_bwins += bwins
+            total_draws += draws
+
+            moves.append({"ptn": move, "white": wwins, "black": bwins, "draw": draws})
+
+        moves.sort(key=lambda x: x['white']+x['black']+x['draw'], reverse=True)
+
+        position_analysis = PositionAnalysis(
+            config = config,
+            settings = settings,
+            white = total_wwins,
+            black = total_bwins,
+            draw = total_draws,
+            moves = moves[:settings.max_suggested_moves],
+            games = [],
+        )
+
+        # get top games
+        select_games_sql = f"""
+            SELECT games.id, games.playtak_id, games.white, games.black, games.result, games.komi, games.rating_white, games.rating_black, games.date, games.tournament,
+                game_position_xref.game_id, game_position_xref.position_id,
+                (games.rating_white+games.rating_black)/2 AS avg_rating
+            FROM game_position_xref, games
+            WHERE game_position_xref.position_id = :position_id
+                AND games.id = game_position_xref.game_id
+                {games_filter}
+            ORDER BY AVG_rating DESC
+            LIMIT {MAX_GAME_EXAMPLES};
+        """
+        with time_sql('top_games', db_file):
             cur.execute(select_games_sql, {
-                'sym_tps': sym_tps,
+                'position_id': rows['id'],
                 **default_query_vars,
             })
             top_games = cur.fetchall()
 
 
-            # todo: normalize (rotate) game so that users aren't interrupted in their
-            # exploration with suddenly rotated games
-            for game in map(dict, top_games):
-                position_analysis.games.append(GameInfo(
-                    playtak_id = game['playtak_id'],
-                    result = game['result'],
-                    white = PlayerInfo(name=game['white'], rating=game['rating_white']),
-                    black = PlayerInfo(name=game['black'], rating=game['rating_black']),
-                    komi = float(game['komi'] or 0) / 2,
-                    date = isoformat_from(game['date']),
-                    tournament=bool(game['tournament']),
-                ))
+        # todo: normalize (rotate) game so that users aren't interrupted in their
+        # exploration with suddenly rotated games
+        for game in map(dict, top_games):
+            position_analysis.games.append(GameInfo(
+                playtak_id = game['playtak_id'],
+                result = game['result'],
+                white = PlayerInfo(name=game['white'], rating=game['rating_white']),
+                black = PlayerInfo(name=game['black'], rating=game['rating_black']),
+                komi = float(game['komi'] or 0) / 2,
+                date = isoformat_from(game['date']),
+                tournament=bool(game['tournament']),
+            ))
 
-            return position_analysis
+        return position_analysis
+
+def to_standard_tps(game: GameState) -> str:
+    """TPS of `game` with the move number instead of the ply counter"""
+    board, player, _ply_counter = game.get_tps().split(' ')
+    return f"{board} {player} {game.ply_counter // 2 + 1}"
+
+
+def get_opening_tree(
+    db_id: int,
+    settings: AnalysisSettings,
+    tps: TpsString,
+    max_depth: int,
+    max_children: int,
+    min_games: int,
+) -> OpeningTree:
+    """
+    The most played moves from `tps`, walked breadth-first with one query per level for all moves and results.
+    Positions reached again by a transposition are listed, but expanded only at their first occurrence.
+    """
+    config = openings_db_configs[db_id]
+    normalize_settings(config, settings)
+    tree = OpeningTree(
+        config=config,
+        settings=settings,
+        max_depth=max_depth,
+        max_children=max_children,
+        min_games=min_games,
+    )
+
+    root_game = GameState.from_tps(tps)
+    player_to_move = color_to_place_from_tps(tps)
+    # normalize like the import, which uses the ply counter, so the stored moves are in the same orientation
+    sym_tps, root_symmetry = symmetry_normalisator.get_tps_orientation(TpsString(root_game.get_tps()))
+
+    db_file = config.db_file_name
+    db = read_connections[db_file].connection()
+    with closing(db.cursor()) as cur:
+        with time_sql('position_lookup', db_file):
+            cur.execute("SELECT id FROM positions WHERE key=:key AND tps=:sym_tps AND player_to_move=:player_to_move", {
+                "key": position_key(sym_tps, player_to_move),
+                "sym_tps": sym_tps,
+                "player_to_move": player_to_move,
+            })
+            row = cur.fetchone()
+        if row is None:
+            return tree
+
+        games_filter, query_vars, uses_game_filters = build_games_filter(config, settings)
+        def get_results(position_ids: Iterable[int]):
+            with time_sql('child_aggregation', db_file):
+                return get_position_results(cur, position_ids, settings, games_filter, query_vars, uses_game_filters)
+
+        root_id = row['id']
+        white, black, draw = get_results([root_id]).get(root_id, (0, 0, 0))
+        tree.root = OpeningTreeNode(tps=to_standard_tps(root_game), white=white, black=black, draw=draw)
+
+        expanded_position_ids = {root_id}
+        node_count = 1
+        # (node, its game state, its position id, symmetry from the game state to the normalized position)
+        level: list[tuple[OpeningTreeNode, GameState, int, TpsSymmetry]] = [(tree.root, root_game, root_id, root_symmetry)]
+        for _depth in range(max_depth):
+            if not level:
+                break
+            with time_sql('position_moves', db_file):
+                level_moves = get_position_moves(cur, [position_id for (_node, _game, position_id, _symmetry) in level])
+            child_results = get_results({
+                next_position_id for moves in level_moves.values() for (_move, next_position_id) in moves
+            })
+
+            next_level: list[tuple[OpeningTreeNode, GameState, int, TpsSymmetry]] = []
+            for node, game, position_id, symmetry in level:
+                # symmetric moves lead to the same position, list it once
+                moves_by_position: dict[int, str] = {}
+                for move, next_position_id in level_moves.get(position_id, []):
+                    if (
+                        next_position_id not in moves_by_position
+                        and next_position_id in child_results
+                        and sum(child_results[next_position_id]) >= min_games
+                    ):
+                        moves_by_position[next_position_id] = move
+                most_played = sorted(moves_by_position.items(), key=lambda item: sum(child_results[item[0]]), reverse=True)
+
+                for next_position_id, move in most_played[:max_children]:
+                    if node_count >= MAX_TREE_NODES:
+                        tree.truncated = True
+                        break
+                    node_count += 1
+
+                    ptn = symmetry_normalisator.transposed_transform_move(move, symmetry, config.size)
+                    child_game = game.clone()
+                    child_game.move(ptn)
+                    white, black, draw = child_results[next_position_id]
+                    child = OpeningTreeNode(tps=to_standard_tps(child_game), ptn=ptn, white=white, black=black, draw=draw)
+                    node.children.append(child)
+
+                    if next_position_id in expanded_position_ids:
+                        child.transposition = True
+                        continue
+                    expanded_position_ids.add(next_position_id)
+                    _, child_symmetry = symmetry_normalisator.get_tps_orientation(TpsString(child_game.get_tps()))
+                    next_level.append((child, child_game, next_position_id, child_symmetry))
+            level = next_level
+
+    return tree
 
 # for access of specific DB
 # not implemented because we use only one DB currently
@@ -446,8 +902,9 @@ def get_position_with_db_id(db_id: int, tps: str):
 
     if db_id >= len(openings_db_configs):
         raise NotFound("database index out of range, query api/v1/databases for options")
+    g.db_id = db_id
     tps_string = TpsString(tps)
-    analysis = get_position_analysis(openings_db_configs[db_id], settings, tps_string)
+    analysis = get_position_analysis(db_id, settings, tps_string)
     return jsonify(analysis)
 
 @app.route('/api/v1/opening/<path:tps>', methods=['POST', 'GET'])
@@ -455,28 +912,126 @@ def get_position(tps: str):
     return  get_position_with_db_id(0, tps)
 
 
-@app.route('/api/v1/players', methods=['GET'])
-def get_player_names():
+@app.route('/api/v1/openings/batch', methods=['POST'])
+def get_positions_batch():
     """
-    Returns the list of `white` and `black` player names whose games appear in
-    any of the `openings_db_configs`
+    Analyses of several positions with shared settings, in the order of the request.
+    Expects `{"db_id": 0, "positions": [tps, ...], "settings": {...}}`, `db_id` and `settings` are optional.
     """
+    json_data = request.get_json(silent=True)
+    if not isinstance(json_data, dict):
+        raise BadRequest("expected a JSON object with a list of `positions`")
+
+    db_id = json_data.get('db_id', 0)
+    if not is_int(db_id):
+        raise BadRequest("`db_id` must be an integer")
+    if not 0 <= db_id < len(openings_db_configs):
+        raise NotFound("database index out of range, query api/v1/databases for options")
+    g.db_id = db_id
+    config = openings_db_configs[db_id]
+
+    positions = json_data.get('positions')
+    if not isinstance(positions, list) or not all(isinstance(tps, str) for tps in positions):
+        raise BadRequest("`positions` must be a list of TPS strings")
+    if len(positions) > MAX_BATCH_POSITIONS:
+        raise BadRequest(f"at most {MAX_BATCH_POSITIONS} positions can be requested at once")
+
+    settings = parse_settings(json_data.get('settings'), config)
+    tps_list = [parse_tps(tps, config) for tps in positions]
+    print(f"requested {len(positions)} positions with", settings)
+    analyses = get_position_analyses(db_id, settings, tps_list)
+    return jsonify({'analyses': analyses})
+
+
+@app.route('/api/v1/tree/<int:db_id>/<path:tps>', methods=['GET', 'POST'])
+def get_opening_tree_with_db_id(db_id: int, tps: str):
+    """
+    Opening tree from `tps`, limited by the query parameters `max_depth`, `max_children` and `min_games`.
+    Filtered like the `opening` endpoints with `AnalysisSettings` in the body.
+    """
+    if db_id >= len(openings_db_configs):
+        raise NotFound("database index out of range, query api/v1/databases for options")
+    g.db_id = db_id
+    config = openings_db_configs[db_id]
+
+    settings = parse_settings(request.json if request.is_json else None, config)
+    tps_string = parse_tps(tps, config)
+    max_depth = min(max(get_int_arg('max_depth', DEFAULT_TREE_DEPTH), 0), MAX_TREE_DEPTH)
+    max_children = min(max(get_int_arg('max_children', DEFAULT_TREE_CHILDREN), 1), MAX_TREE_CHILDREN)
+    min_games = max(get_int_arg('min_games', 1), 1)
+
+    print(f"requested tree of depth {max_depth} with {max_children} children and {min_games} games from {tps}")
+    tree = get_opening_tree(db_id, settings, tps_string, max_depth, max_children, min_games)
+    return jsonify(tree)
+
+@app.route('/api/v1/tree/<path:tps>', methods=['GET', 'POST'])
+def get_opening_tree_default_db(tps: str):
+    return get_opening_tree_with_db_id(0, tps)
+
+
+def get_player_names_index(db_id: int) -> tuple[list[str], list[str]]:
+    """
+    Sorted names of all players of white and black games in database `db_id` or in any database with `ALL_DATABASES`.
+    Built from the `players` tables and cached until the next import.
+    """
+    names = player_names_cache.get(db_id, 'players')
+    cache_lookups.inc(cache='player_names', db_id=db_id, result='miss' if names is None else 'hit')
+    if names is not None:
+        return names
+
+    generation = player_names_cache.generation(db_id)
+    configs = openings_db_configs if db_id == ALL_DATABASES else [openings_db_configs[db_id]]
     white_names = set()
     black_names = set()
-    for config in openings_db_configs:
-        with closing(sqlite3.connect(config.db_file_name)) as db:
-            db.row_factory = sqlite3.Row
-            with closing(db.cursor()) as cur:
+    for config in configs:
+        db = read_connections[config.db_file_name].connection()
+        with closing(db.cursor()) as cur, time_sql('players', config.db_file_name):
+            cur.execute("SELECT name, white_games, black_games FROM players")
+            for row in cur.fetchall():
+                if row['white_games'] > 0:
+                    white_names.add(row['name'])
+                if row['black_games'] > 0:
+                    black_names.add(row['name'])
+
+    names = (sorted(white_names), sorted(black_names))
+    player_names_cache.put(db_id, 'players', names, generation)
+    return names
+
+
+def get_int_arg(name: str, default: Optional[int]) -> Optional[int]:
+    """Integer query parameter `name`, raises `BadRequest` if it is no integer"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise BadRequest(f"`{name}` must be an integer") from exc
+
 
-                cur.execute("SELECT DISTINCT white AS name from games")
-                white_names.update(map(lambda x: x['name'], cur.fetchall()))
+@app.route('/api/v1/players', methods=['GET'])
+def get_player_names():
+    """
+    Returns the list of `white` and `black` player names whose games appear in
+    any of the `openings_db_configs`, or only in database `db_id` if given.
+    The optional query parameters `prefix` (case insensitive) and `limit` narrow down both lists.
+    """
+    db_id = get_int_arg('db_id', ALL_DATABASES)
+    if db_id != ALL_DATABASES and not 0 <= db_id < len(openings_db_configs):
+        raise NotFound("database index out of range, query api/v1/databases for options")
+    g.db_id = db_id
+    prefix = request.args.get('prefix', '').lower()
+    limit = get_int_arg('limit', None)
 
-                cur.execute("SELECT DISTINCT black AS name from games")
-                black_names.update(map(lambda x: x['name'], cur.fetchall()))
+    def select(names: list[str]) -> list[str]:
+        if prefix:
+            names = [name for name in names if name.lower().startswith(prefix)]
+        return names[:max(limit, 0)] if limit is not None else names
 
+    white_names, black_names = get_player_names_index(db_id)
     return jsonify({
-        'white': sorted(white_names),
-        'black': sorted(black_names),
+        'white': select(white_names),
+        'black': select(black_names),
     })
 
 print("sqlite3 version", sqlite3.sqlite_version)
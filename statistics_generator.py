@@ -41,7 +41,13 @@ class StatisticsGenerator(PositionProcessor):
         rating_white: int,
         rating_black: int,
         date: int, # timestamp
-        tournament: bool
+        tournament: bool,
+        timertime: Optional[int] = None,
+        timerinc: Optional[int] = None,
+        unrated: Optional[bool] = None,
+        pieces: Optional[int] = None,
+        capstones: Optional[int] = None,
+        moves: Optional[list[str]] = None,
     ) -> int:
         self.reset_game_data(result)
         return 0
@@ -58,31 +64,21 @@ class StatisticsGenerator(PositionProcessor):
             else:
                 self.cap_24[player][self.result] += 1
         if not self.w_has_hard_cap:
-            for a in tak.board:
-                for s in a:
-                    l = len(s.stones)
-                    if l > 1:
-                        top = s.stones[-1]
-                        below = s.stones[-1]
-                        if top.colour == 'white' and below.colour == 'white' and top.stone_type == 'C':
-                            self.w_has_hard_cap = True
-                            if self.ply < 18:
-                                self.hard_cap_18[0][self.result] += 1
-                            else:
-                                self.hard_cap_24[0][self.result] += 1
+            for stack, top_type in zip(tak.stacks, tak.tops):
+                if len(stack) > 1 and stack[-1] == '1' and top_type == 'C':
+                    self.w_has_hard_cap = True
+                    if self.ply < 18:
+                        self.hard_cap_18[0][self.result] += 1
+                    else:
+                        self.hard_cap_24[0][self.result] += 1
         elif not self.b_has_hard_cap:
-            for a in tak.board:
-                for s in a:
-                    l = len(s.stones)
-                    if l > 1:
-                        top = s.stones[-1]
-                        below = s.stones[-1]
-                        if top.colour == 'black' and below.colour == 'black' and top.stone_type == 'C':
-                            self.b_has_hard_cap = True
-                            if self.ply < 18:
-                                self.hard_cap_18[1][self.result] += 1
-                            else:
-                                self.hard_cap_24[1][self.result] += 1
+            for stack, top_type in zip(tak.stacks, tak.tops):
+                if len(stack) > 1 and stack[-1] == '2' and top_type == 'C':
+                    self.b_has_hard_cap = True
+                    if self.ply < 18:
+                        self.hard_cap_18[1][self.result] += 1
+                    else:
+                        self.hard_cap_24[1][self.result] += 1
         self.ply += 1
 
     def reset_game_data(self, result: str):
@@ -1,4 +1,6 @@
-from typing import Tuple
+from functools import lru_cache
+from operator import itemgetter
+from typing import Callable, Sequence, Tuple
 
 from base_types import BoardSize, NormalizedTpsString, TpsString, TpsStringExpanded, TpsSymmetry
 
@@ -51,35 +53,59 @@ def rotate_tps(tps_expanded: TpsStringExpanded) -> TpsStringExpanded:
     return TpsStringExpanded(tps_expanded_rotated)
 
 
+def get_orientation_permutations(board_size: BoardSize) -> list[list[int]]:
+    """
+    For every orientation (see `transform_tps`) the index of the source square of each square,
+    with squares numbered in TPS order (top row first, left to right).
+    """
+    tps_expanded = TpsStringExpanded('/'.join(
+        ','.join(str(row * board_size + col) for col in range(board_size)) for row in range(board_size)
+    ))
+    permutations = []
+    for orientation in range(8):
+        oriented = flip_tps(tps_expanded) if orientation > 3 else tps_expanded
+        for _ in range(orientation % 4):
+            oriented = rotate_tps(oriented)
+        permutations.append([int(square) for square in oriented.replace('/', ',').split(',')])
+    return permutations
+
+
+# itemgetters applying the permutations of `get_orientation_permutations` to a list of squares
+ORIENTATION_GETTERS: dict[int, list[Callable[[list[str]], tuple[str, ...]]]] = {
+    size: [itemgetter(*permutation) for permutation in get_orientation_permutations(BoardSize(size))]
+    for size in range(3, 9)
+}
+
+
+@lru_cache(maxsize=2**16)
 def get_tps_orientation(tps: TpsString) -> Tuple[NormalizedTpsString, TpsSymmetry]:
     """
-    nitzel 20230603: I've tried improving the performance by reducing the number
-    of `NormalizedTpsString <-> list[list[str]]` conversions but that slowed it down instead.
+    Returns the lexicographically smallest orientation of `tps` and the symmetry leading to it.
+    All orientations are read from the same list of squares via precomputed permutations.
+    Comparing them joined by `,` only is equivalent to comparing the full expanded TPS,
+    because `,` and `/` sort the same way relative to all characters of a square.
+
+    Cached because consecutive plies and popular openings normalize the same TPS again.
     """
     # ignore ending (current player)
     tps = TpsString(tps[:-4])
 
-    tps_expanded = expand_tps_xn(tps)
-    o = 0
-    best_tps = tps_expanded
+    squares = expand_tps_xn(tps).replace('/', ',').split(',')
+    board_size = tps.count('/') + 1
 
-    rot_tps = tps_expanded
-    for i in range(1, 4):
-        rot_tps = rotate_tps(rot_tps)
+    o = 0
+    best_squares: Sequence[str] = squares
+    best_tps = ','.join(squares)
+    for i, getter in enumerate(ORIENTATION_GETTERS[board_size][1:], start=1):
+        rot_squares = getter(squares)
+        rot_tps = ','.join(rot_squares)
         if rot_tps < best_tps:
             o = i
             best_tps = rot_tps
+            best_squares = rot_squares
 
-    rot_tps = flip_tps(tps_expanded)
-    if rot_tps < best_tps:
-        o = 4
-        best_tps = rot_tps
-    for i in range(5, 8):
-        rot_tps = rotate_tps(rot_tps)
-        if rot_tps < best_tps:
-            o = i
-            best_tps = rot_tps
-    return NormalizedTpsString(best_tps), TpsSymmetry(o)
+    rows = [','.join(best_squares[row:row + board_size]) for row in range(0, len(best_squares), board_size)]
+    return NormalizedTpsString('/'.join(rows)), TpsSymmetry(o)
 
 
 def transform_tps(tps: TpsString, orientation: int) -> TpsString:
@@ -151,10 +177,10 @@ def swapsquare(move: str, board_size: BoardSize):
     raise ValueError(f"Move '{move}' does not contain any lowercase characters and thus is no proper move")
 
 
-def transform_move(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+def transform_move_by_rewriting(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+    """Reference implementation of `transform_move`, rewriting the move string once per mirror and rotation"""
     mirror: bool = orientation >= 4
     number_of_rotations: int = orientation - 4 if mirror else orientation
-    # orig_move = move
     if mirror:
         move = swapchars(move, '+', '-')
         move = swapsquare(move, board_size)
@@ -162,18 +188,11 @@ def transform_move(move: str, orientation: TpsSymmetry, board_size: BoardSize) -
     for _ in range(0, number_of_rotations):
         move = rotate_move(move, board_size)
 
-    # Disabled for ~10% performance
-    # test_transpose = transposed_transform_move(
-    #     move=move,
-    #     orientation=orientation,
-    #     board_size=board_size
-    # )
-    # assert test_transpose == orig_move
-
     return move
 
 
-def transposed_transform_move(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+def transposed_transform_move_by_rewriting(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+    """Reference implementation of `transposed_transform_move`"""
     mirror: bool = orientation >= 4
     number_of_rotations: int = orientation - 4 if mirror else orientation
 
@@ -186,3 +205,76 @@ def transposed_transform_move(move: str, orientation: TpsSymmetry, board_size: B
         move = swapchars(move, '+', '-')
         move = swapsquare(move, board_size)
     return move
+
+
+MoveTransform = Callable[[str, TpsSymmetry, BoardSize], str]
+
+
+def get_square_transforms(board_size: BoardSize, transform: MoveTransform) -> list[dict[str, str]]:
+    """For every orientation the square each square is moved to by `transform`"""
+    squares = [chr(ord('a') + col) + str(row + 1) for row in range(board_size) for col in range(board_size)]
+    return [
+        {square: transform(square, TpsSymmetry(orientation), board_size) for square in squares}
+        for orientation in range(8)
+    ]
+
+
+def get_direction_transforms(transform: MoveTransform) -> list[dict[str, str]]:
+    """For every orientation the direction each spread direction is turned to by `transform`"""
+    return [
+        {
+            direction: transform(f"a1{direction}", TpsSymmetry(orientation), BoardSize(3))[2]
+            for direction in '+-<>'
+        }
+        for orientation in range(8)
+    ]
+
+
+# lookup tables of `transform_move` and `transposed_transform_move` by board size and orientation,
+# built from the string rewriting reference implementations
+SQUARE_TRANSFORMS: dict[int, list[dict[str, str]]] = {
+    size: get_square_transforms(BoardSize(size), transform_move_by_rewriting) for size in range(3, 9)
+}
+TRANSPOSED_SQUARE_TRANSFORMS: dict[int, list[dict[str, str]]] = {
+    size: get_square_transforms(BoardSize(size), transposed_transform_move_by_rewriting) for size in range(3, 9)
+}
+DIRECTION_TRANSFORMS = get_direction_transforms(transform_move_by_rewriting)
+TRANSPOSED_DIRECTION_TRANSFORMS = get_direction_transforms(transposed_transform_move_by_rewriting)
+
+
+def lookup_move_transform(
+    move: str,
+    square_transforms: dict[str, str],
+    direction_transforms: dict[str, str],
+) -> str:
+    # moves are `[count][stone]<square>[direction][drops]`, the square is the first lower case character and a digit
+    for (i, c) in enumerate(move):
+        if c.islower():
+            break
+    else:
+        raise ValueError(f"Move '{move}' does not contain any lowercase characters and thus is no proper move")
+
+    square = square_transforms.get(move[i:i + 2])
+    if square is None:
+        raise ValueError(f"Move '{move}' is not on the board")
+    direction = move[i + 2:i + 3]
+    if not direction:
+        return move[:i] + square
+    return move[:i] + square + direction_transforms.get(direction, direction) + move[i + 3:]
+
+
+def transform_move(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+    """
+    Moves `move` to the board oriented by `orientation` (see `transform_tps`).
+    Same as `transform_move_by_rewriting`, but with two dict lookups instead of rewriting the move string once per mirror and rotation.
+    """
+    return lookup_move_transform(move, SQUARE_TRANSFORMS[board_size][orientation], DIRECTION_TRANSFORMS[orientation])
+
+
+def transposed_transform_move(move: str, orientation: TpsSymmetry, board_size: BoardSize) -> str:
+    """The inverse of `transform_move`, same as `transposed_transform_move_by_rewriting`"""
+    return lookup_move_transform(
+        move,
+        TRANSPOSED_SQUARE_TRANSFORMS[board_size][orientation],
+        TRANSPOSED_DIRECTION_TRANSFORMS[orientation],
+    )
@@ -0,0 +1,156 @@
+"""
+Random but legal Tak games, for benchmarks and synthetic playtak databases.
+
+Moves are chosen at random, so the games look nothing like human games, but every move is legal and games
+end like real ones: with a road, a full board or a player out of stones. Games still going after `max_plies`
+are resigned. The same `random.Random` seed always gives the same games.
+"""
+
+import random
+from typing import Optional
+
+from tak import DIRECTION_OFFSETS, GameState
+
+# (stones, capstones) of each player by board size
+STONE_COUNTS = {3: (10, 0), 4: (15, 0), 5: (21, 1), 6: (30, 1), 7: (40, 2), 8: (50, 2)}
+# chance to spread a stack instead of placing a stone, once there are stacks to spread
+SPREAD_PROBABILITY = 0.4
+# chances to place a wall or a capstone (while available) instead of a flat stone
+WALL_PROBABILITY = 0.1
+CAPSTONE_PROBABILITY = 0.05
+# random spreads tried before giving up and placing a stone
+SPREAD_ATTEMPTS = 20
+
+
+def square_name(size: int, square: int) -> str:
+    return chr(ord('a') + square % size) + str(square // size + 1)
+
+
+def random_spread(game: GameState, colour: str, rng: random.Random) -> Optional[str]:
+    """A legal spread of a stack controlled by `colour` in PTN, `None` if none was found"""
+    size = game.size
+    stacks = game.stacks
+    tops = game.tops
+    own_squares = [square for square, stack in enumerate(stacks) if stack and stack[-1] == colour]
+    if not own_squares:
+        return None
+
+    for _attempt in range(SPREAD_ATTEMPTS):
+        square = rng.choice(own_squares)
+        direction = rng.choice('<>+-')
+        dx, dy = DIRECTION_OFFSETS[direction]
+        carried = rng.randint(1, min(len(stacks[square]), size))
+        x, y = square % size, square // size
+        drops = []
+        remaining = carried
+        while remaining:
+            x += dx
+            y += dy
+            if not (0 <= x < size and 0 <= y < size) or tops[y * size + x] == 'C':
+                break
+            if tops[y * size + x] == 'S':
+                # only a capstone moving on its own flattens a wall
+                if remaining == 1 and tops[square] == 'C':
+                    drops.append(1)
+                    remaining = 0
+                break
+            drop = remaining if rng.random() < 0.5 else rng.randint(1, remaining)
+            drops.append(drop)
+            remaining -= drop
+        if not remaining:
+            return f"{carried}{square_name(size, square)}{direction}{''.join(map(str, drops))}"
+    return None
+
+
+def random_placement(game: GameState, reserves: dict[str, list[int]], rng: random.Random) -> Optional[str]:
+    """A stone of the colour to play placed on a random empty square in PTN, `None` if the board is full"""
+    empty_squares = [square for square, stack in enumerate(game.stacks) if not stack]
+    if not empty_squares:
+        return None
+    square = square_name(game.size, rng.choice(empty_squares))
+    if GameState.is_first_move(game.ply_counter):
+        return square
+
+    stones, capstones = reserves['1' if GameState.colour_to_play(game.ply_counter) == 'white' else '2']
+    kind = rng.random()
+    if capstones and kind < CAPSTONE_PROBABILITY or not stones:
+        return 'C' + square
+    if kind < CAPSTONE_PROBABILITY + WALL_PROBABILITY:
+        return 'S' + square
+    return square
+
+
+def has_road(game: GameState, colour: str) -> bool:
+    """Whether the flat stones and capstones of `colour` connect opposite edges"""
+    size = game.size
+    road_squares = {
+        square for square, stack in enumerate(game.stacks)
+        if stack and stack[-1] == colour and game.tops[square] != 'S'
+    }
+    for start_edge, is_end_edge in (
+        ([y * size for y in range(size)], lambda square: square % size == size - 1),
+        (list(range(size)), lambda square: square // size == size - 1),
+    ):
+        todo = [square for square in start_edge if square in road_squares]
+        reached = set(todo)
+        while todo:
+            square = todo.pop()
+            if is_end_edge(square):
+                return True
+            x, y = square % size, square // size
+            for dx, dy in DIRECTION_OFFSETS.values():
+                neighbour = (y + dy) * size + x + dx
+                if 0 <= x + dx < size and 0 <= y + dy < size and neighbour in road_squares and neighbour not in reached:
+                    reached.add(neighbour)
+                    todo.append(neighbour)
+    return False
+
+
+def game_result(game: GameState, mover: str, reserves: dict[str, list[int]], komi: int) -> Optional[str]:
+    """Playtak result if the game is over after `mover` moved, `komi` in half flats for black"""
+    for colour in (mover, '2' if mover == '1' else '1'):
+        if has_road(game, colour):
+            return 'R-0' if colour == '1' else '0-R'
+
+    board_full = all(game.stacks)
+    if not board_full and all(sum(reserve) for reserve in reserves.values()):
+        return None
+    flats = {'1': 0, '2': 0}
+    for stack, top in zip(game.stacks, game.tops):
+        if stack and top == '':
+            flats[stack[-1]] += 1
+    white_score = 2 * flats['1']
+    black_score = 2 * flats['2'] + komi
+    if white_score > black_score:
+        return 'F-0'
+    if black_score > white_score:
+        return '0-F'
+    return '1/2-1/2'
+
+
+def random_game(rng: random.Random, size: int, max_plies: int, komi: int = 0) -> tuple[list[str], str]:
+    """PTN moves and playtak result of a random game of at most `max_plies` plies"""
+    game = GameState(size)
+    reserves = {colour: list(STONE_COUNTS[size]) for colour in '12'}
+    moves: list[str] = []
+    while len(moves) < max_plies:
+        mover = '1' if game.player == 'white' else '2'
+        move = None
+        if not GameState.is_first_move(game.ply_counter) and rng.random() < SPREAD_PROBABILITY:
+            move = random_spread(game, mover, rng)
+        if move is None:
+            move = random_placement(game, reserves, rng)
+        if move is None:
+            break
+
+        if not move[0].isdecimal():
+            placed = reserves['1' if GameState.colour_to_play(game.ply_counter) == 'white' else '2']
+            placed[1 if move[0] == 'C' else 0] -= 1
+        game.move(move)
+        moves.append(move)
+
+        result = game_result(game, mover, reserves, komi)
+        if result is not None:
+            return moves, result
+    # resigned or lost on time
+    return moves, rng.choice(('1-0', '0-1'))
@@ -1,60 +1,52 @@
-from base_types import PlayerToMove, get_opponent
-
-
-class Stone:
-    def __init__(self, colour: str, stone_type: str):
-        self.colour = colour
-        self.stone_type = stone_type
-
-    def __str__(self):
-        return self.stone_type if self.colour == "white" else self.stone_type.lower()
-
-    def clone(self):
-        return Stone(self.colour, self.stone_type)
-
+from typing import Optional
 
-class Square:
-    def __init__(self):
-        self.stones = []
+from base_types import PlayerToMove, get_opponent
 
-    def __str__(self):
-        # r = ''.join(map(str, self.stones))
-        r = ''.join(self.stones)
-        for _ in range(0, 8 - len(r)):
-            r += ' '
-        return r + '|'
+# (file, rank) step to the neighbouring square per spread direction
+DIRECTION_OFFSETS = { '>': (1, 0), '<': (-1, 0), '+': (0, 1), '-': (0, -1) }
 
-    def clone(self):
-        c = Square()
-        c.stones = [stone.clone() for stone in self.stones]
-        return c
 
+class GameState:
+    """
+    The board is stored as two flat lists, indexed by `rank * size + file` (so `a1` is 0):
+    `stacks` holds the colours of the stones of each square from bottom to top as string
+    (`'1'` white, `'2'` black, `''` empty) and `tops` the type of the top stone
+    (`''` flat, `'S'` wall, `'C'` capstone), which is all a TPS needs.
 
-def get_adjacent(square_idx: str, direction: str):
-    x = ord(square_idx[0].lower())
-    y = int(square_idx[1])
-    if direction == '>':
-        x += 1
-    elif direction == '<':
-        x -= 1
-    elif direction == '+':
-        y += 1
-    elif direction == '-':
-        y -= 1
-    res = chr(x) + str(y)
-    return res
-
+    `row_tps` caches the TPS of each rank, a move resets the ranks it touched to `None`.
+    """
+    __slots__ = ('size', 'ply_counter', 'stacks', 'tops', 'row_tps')
 
-class GameState:
     def __init__(self, size):
-        self.board = []
         self.size = size
-        for i in range(0, size):
-            self.board.append([])
-            for j in range(0, size):
-                self.board[i].append(Square())
+        self.stacks: list[str] = [''] * (size * size)
+        self.tops: list[str] = [''] * (size * size)
+        self.row_tps: list[Optional[str]] = [None] * size
         self.ply_counter = 0
 
+    @staticmethod
+    def from_tps(tps: str) -> 'GameState':
+        """
+        Game state of a standard TPS (`<board> <player> <move number>`).
+        Note that `get_tps` writes the ply counter instead of the move number.
+        """
+        board, player, move_number = tps.split(' ')
+        rows = board.split('/')
+        size = len(rows)
+        game = GameState(size)
+        for y, row in enumerate(reversed(rows)):
+            x = 0
+            for square in row.split(','):
+                if square[0] == 'x':
+                    x += int(square[1:] or 1)
+                    continue
+                top = square[-1] if square[-1] in ('S', 'C') else ''
+                game.stacks[y * size + x] = square[:-1] if top else square
+                game.tops[y * size + x] = top
+                x += 1
+        game.ply_counter = (int(move_number) - 1) * 2 + int(player) - 1
+        return game
+
     @staticmethod
     def get_player(ply_counter) -> PlayerToMove:
         player_id = ply_counter % 2
@@ -78,108 +70,110 @@ class GameState:
         return GameState.get_player(self.ply_counter)
 
     def clone(self):
-        c = GameState(self.size)
+        c = GameState.__new__(GameState)
+        c.size = self.size
         c.ply_counter = self.ply_counter
-        for y in range(0, self.size):
-            for x in range(0, self.size):
-                c.board[x][y] = self.board[x][y].clone()
+        c.stacks = self.stacks.copy()
+        c.tops = self.tops.copy()
+        c.row_tps = self.row_tps.copy()
         return c
 
-    def get_square(self, ptn: str):
+    def get_square(self, ptn: str) -> int:
+        """Index of the square `ptn` (e.g. `c4`) in `stacks` and `tops`"""
         x = ord(ptn[0].lower()) - 97
         y = int(ptn[1]) - 1
-        return self.board[x][y]
+        return y * self.size + x
 
     def print_state(self):
         print('state:')
         for y in range(self.size - 1, -1, -1):
             res = ''
             for x in range(0, self.size):
-                res += str(self.board[x][y])
+                square = y * self.size + x
+                res += (self.stacks[square] + self.tops[square]).ljust(8) + '|'
             print(res)
         print('')
 
     def move(self, ptn: str):
+        stacks = self.stacks
+        tops = self.tops
+        row_tps = self.row_tps
+        size = self.size
 
-        colour_to_place = GameState.colour_to_play(self.ply_counter)
         # check for move command:
         first_char = ptn[0]
-        move_command = first_char.isdecimal()
-        stack_height = int(first_char) if move_command else 0
-
-        if move_command:
-            ptn = ptn[1:]
-            square_idx = ptn[0:2]
-            square = self.get_square(square_idx)
-
-            s = []
-            for _ in range(0, stack_height):
-                s.append(square.stones.pop())
-            direction = ptn[2]
-            rest = ptn[3:]
-            for drop_count in rest:
-                square_idx = get_adjacent(square_idx, direction)
-                square = self.get_square(square_idx)
-                # flatten if top stone is wall
-                try:
-                    top_stone = square.stones.pop()
-                    top_stone.stone_type = 'F'
-                    square.stones.append(top_stone)
-                except IndexError:
-                    top_stone = None
+        if first_char.isdecimal():
+            stack_height = int(first_char)
+            square = self.get_square(ptn[1:3])
+            dx, dy = DIRECTION_OFFSETS[ptn[3]]
+            offset = dx + dy * size
+
+            stack = stacks[square]
+            carried = stack[-stack_height:]
+            carried_top = tops[square]
+            stacks[square] = stack[:-stack_height]
+            tops[square] = ''
+            row_tps[square // size] = None
+
+            for drop_count in ptn[4:]:
+                square += offset
+                row_tps[square // size] = None
                 count = int(drop_count)
-                for _ in range(0, count):
-                    square.stones.append(s.pop())
-            count = len(s)
-            for _ in range(0, count):
-                square.stones.append(s.pop())
+                # flatten if top stone is wall, the dropped stones below the carried top are flats
+                tops[square] = ''
+                stacks[square] += carried[:count]
+                carried = carried[count:]
+            # the top stone of the carried stack always ends up on the last square
+            stacks[square] += carried
+            tops[square] = carried_top
 
         else:  # place command
+            colour_to_place = GameState.colour_to_play(self.ply_counter)
             # check for special stones
-            stone_type = 'F'
-            if ptn[0].isupper():
-                stone_type = ptn[0]
+            stone_type = ''
+            if first_char.isupper():
+                stone_type = first_char if first_char != 'F' else ''
                 ptn = ptn[1:]
 
             # get target square
             square = self.get_square(ptn)
-            square.stones.append(Stone(colour_to_place, stone_type))
+            stacks[square] += '1' if colour_to_place == "white" else '2'
+            tops[square] = stone_type
+            row_tps[square // size] = None
 
         self.ply_counter += 1
 
+    def get_row_tps(self, y: int) -> str:
+        """TPS of rank `y` (0 is rank 1), with runs of empty squares collapsed to `xn`"""
+        stacks = self.stacks
+        tops = self.tops
+        row = []
+        empty_count = 0
+        for square in range(y * self.size, (y + 1) * self.size):
+            stack = stacks[square]
+            if not stack:
+                empty_count += 1
+                continue
+            if empty_count:
+                row.append('x' if empty_count == 1 else f'x{empty_count}')
+                empty_count = 0
+            row.append(stack + tops[square])
+        if empty_count:
+            row.append('x' if empty_count == 1 else f'x{empty_count}')
+        return ','.join(row)
+
     def get_tps(self):
-        res = ''
-        for y in range(self.size - 1, -1, -1):
-            row = ''
-            for x in range(0, self.size):
-                square = self.board[x][y]
-                if len(square.stones) == 0:
-                    if len(row) > 0:
-                        if row[-1].isnumeric() and len(row) > 1 and row[-2] == 'x':
-                            row = row[0:-1] + str(int(row[-1]) + 1)
-                        elif row[-1] == 'x':
-                            row += '2'
-                        else:
-                            row += ',x'
-                    else:
-                        row += 'x'
-                else:
-                    if len(row) > 0:
-                        row += ','
-                    for stone in square.stones:
-                        row += '1' if stone.colour == "white" else '2'
-                        if stone.stone_type.lower() != 'f':
-                            row += stone.stone_type.upper()
-            res += row + '/'
-        res = res[:-1] # remove trailing /
+        row_tps = self.row_tps
+        for y, row in enumerate(row_tps):
+            if row is None:
+                row_tps[y] = self.get_row_tps(y)
+        res = '/'.join(reversed(row_tps)) # type: ignore # all rows are set now
         res = res + (' 1' if self.player == "white" else ' 2') # add current player
         res = res + ' ' + str(self.ply_counter) #TODO: also add ply_counter in symmetry_normalisator.py?
         return res
 
     def reset(self):
-        self.board = []
-        for i in range(0, self.size):
-            self.board.append([])
-            for _ in range(0, self.size):
-                self.board[i].append(Square())
+        self.stacks = [''] * (self.size * self.size)
+        self.tops = [''] * (self.size * self.size)
+        self.row_tps = [None] * self.size
         self.ply_counter = 0
@@ -0,0 +1,37 @@
+from analysis_cache import VersionedLruCache
+
+
+class TestVersionedLruCache():
+    def test_get_put(self):
+        cache: VersionedLruCache[str] = VersionedLruCache(max_size=10)
+        assert cache.get(0, "a") is None
+        cache.put(0, "a", "value", cache.generation(0))
+        assert cache.get(0, "a") == "value"
+        # entries of different databases don't mix
+        assert cache.get(1, "a") is None
+
+    def test_evicts_least_recently_used(self):
+        cache: VersionedLruCache[int] = VersionedLruCache(max_size=2)
+        cache.put(0, "a", 1, 0)
+        cache.put(0, "b", 2, 0)
+        cache.get(0, "a")
+        cache.put(0, "c", 3, 0)
+        assert cache.get(0, "a") == 1
+        assert cache.get(0, "b") is None
+        assert cache.get(0, "c") == 3
+        assert len(cache) == 2
+
+    def test_invalidate(self):
+        cache: VersionedLruCache[str] = VersionedLruCache(max_size=10)
+        cache.put(0, "a", "old", cache.generation(0))
+        cache.put(1, "a", "other", cache.generation(1))
+        cache.invalidate(0)
+        assert cache.get(0, "a") is None
+        assert cache.get(1, "a") == "other"
+
+    def test_put_computed_before_invalidate(self):
+        cache: VersionedLruCache[str] = VersionedLruCache(max_size=10)
+        generation = cache.generation(0)
+        cache.invalidate(0)
+        cache.put(0, "a", "stale", generation)
+        assert cache.get(0, "a") is None
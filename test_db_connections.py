@@ -0,0 +1,53 @@
+import os
+import sqlite3
+import threading
+
+import pytest
+from db_connections import ReadOnlyConnections
+
+
+def create_db(db_file: str, value: int):
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE t (a integer)")
+        conn.execute("INSERT INTO t VALUES (?)", (value,))
+    conn.close()
+
+
+class TestReadOnlyConnections():
+    def test_reuses_connection_per_thread(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        create_db(db_file, 1)
+        connections = ReadOnlyConnections(db_file)
+        conn = connections.connection()
+        assert connections.connection() is conn
+
+        other_thread_connections = []
+        thread = threading.Thread(target=lambda: other_thread_connections.append(connections.connection()))
+        thread.start()
+        thread.join()
+        assert other_thread_connections[0] is not conn
+
+    def test_read_only(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        create_db(db_file, 1)
+        with pytest.raises(sqlite3.OperationalError):
+            ReadOnlyConnections(db_file).connection().execute("INSERT INTO t VALUES (2)")
+
+    def test_reopens_replaced_file(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        new_db_file = str(tmp_path / "new.db")
+        create_db(db_file, 1)
+        create_db(new_db_file, 2)
+        connections = ReadOnlyConnections(db_file)
+        assert connections.connection().execute("SELECT a FROM t").fetchone()[0] == 1
+
+        os.replace(new_db_file, db_file)
+        assert connections.connection().execute("SELECT a FROM t").fetchone()[0] == 2
+
+    def test_recycle(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        create_db(db_file, 1)
+        connections = ReadOnlyConnections(db_file)
+        conn = connections.connection()
+        connections.recycle()
+        assert connections.connection() is not conn
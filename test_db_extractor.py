@@ -0,0 +1,20 @@
+from db_extractor import estimate_games_from_db, get_games_from_db
+from util.generate_games_db import GeneratorOptions, generate_games_db
+
+options = GeneratorOptions(
+    seed=11, sizes={5: 1, 6: 3}, num_players=5, rating_mean=1500, rating_stdev=200, bot_ratio=0.2, komis=[0, 4],
+    tournament_ratio=0.1, start_date=1_500_000_000_000, end_date=1_600_000_000_000, min_plies=10, max_plies=20,
+)
+
+
+class TestEstimateGames():
+    def test_upper_bound_of_size(self, tmp_path):
+        games_db = str(tmp_path / "games_anon.db")
+        generate_games_db(games_db, 80, options)
+        for board_size in (5, 6):
+            games_query = dict(db_file=games_db, board_size=board_size, num_plies=0, num_games=1000, min_rating=0)
+            games = len(list(get_games_from_db(**games_query)))
+            estimate = estimate_games_from_db(**games_query)
+            assert 0 < games <= estimate < 80
+            assert estimate_games_from_db(**{**games_query, 'num_games': 3}) == 3
+            assert estimate_games_from_db(**{**games_query, 'start_id': 80}) == 0
@@ -0,0 +1,131 @@
+import os
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from downloader import PART_SUFFIX, DownloadError, download_file
+
+
+def games_db_bytes(tmp_path, num_games: int) -> bytes:
+    db_file = str(tmp_path / f"source_{num_games}.db")
+    with sqlite3.connect(db_file) as conn:
+        conn.execute("CREATE TABLE games (id integer PRIMARY KEY, notation text)")
+        conn.executemany("INSERT INTO games VALUES (?, ?)", [(i, 'a1,b2' * 50) for i in range(num_games)])
+    conn.close()
+    with open(db_file, 'rb') as input_file:
+        return input_file.read()
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves `content` with an ETag and supports conditional and range requests"""
+    def __init__(self, content: bytes):
+        super().__init__(('127.0.0.1', 0), FileRequestHandler)
+        self.requests: list[dict] = []
+        self.set_content(content)
+
+    def set_content(self, content: bytes, etag: str = '"v1"'):
+        self.content = content
+        self.etag = etag
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/games_anon.db"
+
+
+class FileRequestHandler(BaseHTTPRequestHandler):
+    server: FileServer
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        start = 0
+        range_header = self.headers.get('Range')
+        if range_header and self.headers.get('If-Range') == server.etag:
+            start = int(range_header.removeprefix('bytes=').rstrip('-'))
+        body = server.content[start:]
+
+        self.send_response(206 if start else 200)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(body)))
+        if start:
+            self.send_header('Content-Range', f'bytes {start}-{len(server.content) - 1}/{len(server.content)}')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def file_server(tmp_path):
+    server = FileServer(games_db_bytes(tmp_path, 100))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def read(file_name: str) -> bytes:
+    with open(file_name, 'rb') as input_file:
+        return input_file.read()
+
+
+class TestDownloadFile():
+    @pytest.mark.parametrize('dir_name', ['data?mode=rw', 'data#1', 'data%20'])
+    def test_special_characters_in_path(self, file_server, tmp_path, dir_name):
+        (tmp_path / dir_name).mkdir()
+        destination = str(tmp_path / dir_name / "games_anon.db")
+        assert download_file(file_server.url, destination)
+        assert read(destination) == file_server.content
+
+    def test_download_and_conditional_request(self, file_server, tmp_path):
+        destination = str(tmp_path / "games_anon.db")
+        assert download_file(file_server.url, destination, chunk_size=1024)
+        assert read(destination) == file_server.content
+        assert not os.path.exists(destination + PART_SUFFIX)
+
+        assert not download_file(file_server.url, destination)
+        assert file_server.requests[-1]['If-None-Match'] == '"v1"'
+
+        file_server.set_content(games_db_bytes(tmp_path, 200), etag='"v2"')
+        assert download_file(file_server.url, destination)
+        assert read(destination) == file_server.content
+
+    def test_resume(self, file_server, tmp_path):
+        destination = str(tmp_path / "games_anon.db")
+        with open(destination + PART_SUFFIX, 'wb') as part_file:
+            part_file.write(file_server.content[:1000])
+        with open(destination + PART_SUFFIX + '.meta', 'w', encoding='utf-8') as meta_file:
+            meta_file.write(f'{{"url": "{file_server.url}", "etag": "\\"v1\\"", "last_modified": null}}')
+
+        assert download_file(file_server.url, destination)
+        assert file_server.requests[-1]['Range'] == 'bytes=1000-'
+        assert read(destination) == file_server.content
+
+    def test_resume_changed_file(self, file_server, tmp_path):
+        destination = str(tmp_path / "games_anon.db")
+        with open(destination + PART_SUFFIX, 'wb') as part_file:
+            part_file.write(b'old content')
+        with open(destination + PART_SUFFIX + '.meta', 'w', encoding='utf-8') as meta_file:
+            meta_file.write(f'{{"url": "{file_server.url}", "etag": "\\"v0\\"", "last_modified": null}}')
+
+        assert download_file(file_server.url, destination)
+        assert read(destination) == file_server.content
+
+    def test_keeps_old_file_if_verification_fails(self, file_server, tmp_path):
+        destination = str(tmp_path / "games_anon.db")
+        assert download_file(file_server.url, destination)
+        old_content = read(destination)
+
+        file_server.set_content(b'not a database', etag='"broken"')
+        with pytest.raises(DownloadError):
+            download_file(file_server.url, destination)
+        assert read(destination) == old_content
+        assert not os.path.exists(destination + PART_SUFFIX)
@@ -0,0 +1,20 @@
+import sqlite3
+from contextlib import closing
+
+import pytest
+from import_worker import create_staging_copy
+
+
+class TestStagingCopy():
+    @pytest.mark.parametrize('dir_name', ['data', 'data?mode=rw', 'data#1', 'data%20'])
+    def test_special_characters_in_path(self, tmp_path, dir_name):
+        (tmp_path / dir_name).mkdir()
+        db_file = str(tmp_path / dir_name / "openings.db")
+        with closing(sqlite3.connect(db_file)) as conn:
+            conn.execute("CREATE TABLE t (a integer)")
+            conn.execute("INSERT INTO t VALUES (1)")
+            conn.commit()
+
+        staging_file = create_staging_copy(db_file)
+        with closing(sqlite3.connect(staging_file)) as staging:
+            assert staging.execute("SELECT a FROM t").fetchall() == [(1,)]
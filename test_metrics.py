@@ -0,0 +1,45 @@
+from metrics import MetricsRegistry
+
+
+class TestMetricsRegistry():
+    def test_counter_and_gauge(self):
+        metrics = MetricsRegistry()
+        counter = metrics.counter('lookups_total', "Cache lookups", ('result',))
+        gauge = metrics.gauge('entries', "Cache entries")
+        counter.inc(result='hit')
+        counter.inc(2, result='hit')
+        counter.inc(result='mi"ss')
+        gauge.set(0.5)
+        assert metrics.render() == (
+            '# HELP lookups_total Cache lookups\n'
+            '# TYPE lookups_total counter\n'
+            'lookups_total{result="hit"} 3\n'
+            'lookups_total{result="mi\\"ss"} 1\n'
+            '# HELP entries Cache entries\n'
+            '# TYPE entries gauge\n'
+            'entries 0.5\n'
+        )
+
+    def test_histogram(self):
+        metrics = MetricsRegistry()
+        histogram = metrics.histogram('request_seconds', "Latency", ('route',), buckets=(0.1, 1.0))
+        histogram.observe(0.05, route='/a')
+        histogram.observe(0.1, route='/a')
+        histogram.observe(2, route='/a')
+        with histogram.time(route='/b'):
+            pass
+        lines = metrics.render().splitlines()
+        assert lines[2:7] == [
+            'request_seconds_bucket{route="/a",le="0.1"} 2',
+            'request_seconds_bucket{route="/a",le="1"} 2',
+            'request_seconds_bucket{route="/a",le="+Inf"} 3',
+            'request_seconds_sum{route="/a"} 2.15',
+            'request_seconds_count{route="/a"} 3',
+        ]
+        assert 'request_seconds_count{route="/b"} 1' in lines
+
+    def test_collector(self):
+        metrics = MetricsRegistry()
+        gauge = metrics.gauge('entries', "Cache entries")
+        metrics.add_collector(lambda: gauge.set(7))
+        assert 'entries 7' in metrics.render().splitlines()
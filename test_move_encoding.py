@@ -0,0 +1,48 @@
+import random
+
+import pytest
+from db_extractor import get_moves_array, get_ptn, to_playtak_notation
+from move_encoding import decode_moves, encode_move, encode_moves
+from synthetic_games import STONE_COUNTS, random_game
+
+
+class TestMoveEncoding():
+    @pytest.mark.parametrize('size', STONE_COUNTS.keys())
+    def test_round_trip(self, size):
+        rng = random.Random(size)
+        for _ in range(50):
+            moves, _result = random_game(rng, size, 200)
+            assert decode_moves(encode_moves(moves)) == moves
+
+    def test_all_spreads(self):
+        for count in range(1, 9):
+            for mask in range(2 ** (count - 1)):
+                cuts = [carried for carried in range(1, count) if mask >> (carried - 1) & 1]
+                drops = ''.join(str(end - start) for start, end in zip([0, *cuts], [*cuts, count]))
+                move = f"{count}h8<{drops}"
+                assert decode_moves(encode_move(move)) == [move]
+
+    def test_sizes(self):
+        assert len(encode_moves(['a1', 'Sh8', 'Cd4'])) == 3
+        assert len(encode_move('3c2+12')) == 3
+
+    def test_implicit_count_and_drops(self):
+        assert decode_moves(encode_moves(['a1>', '3b2-'])) == ['1a1>1', '3b2-3']
+
+    @pytest.mark.parametrize('move', ['', 'i1', 'a9', 'Fa1', '3a1+4', '9a1+9', 'a1*', '3a1+120'])
+    def test_invalid_move(self, move):
+        with pytest.raises(ValueError):
+            encode_move(move)
+
+    def test_truncated_spread(self):
+        with pytest.raises(ValueError):
+            decode_moves(encode_move('3c2+12')[:2])
+
+    def test_ptn_from_moves(self):
+        moves, result = random_game(random.Random(3), 6, 40)
+        game = {
+            'id': 1, 'date': 1600000000000, 'size': 6, 'player_white': 'alice', 'player_black': 'bob',
+            'notation': to_playtak_notation(moves), 'result': result, 'rating_white': 1500, 'rating_black': 1600,
+            'timertime': 600, 'timerinc': 10, 'komi': 4,
+        }
+        assert get_ptn(game, decode_moves(encode_moves(get_moves_array(game['notation'])))) == get_ptn(game)
@@ -0,0 +1,231 @@
+import random
+import sqlite3
+from contextlib import closing
+
+import position_db
+import ptn_parser
+from db_extractor import to_playtak_notation
+from position_db import PositionDataBase
+from synthetic_games import random_game
+
+# (white, black, result) of the games of `known_games`
+PLAYERS_AND_RESULTS = [
+    ('alice', 'bob', 'R-0'),
+    ('bob', 'alice', '0-F'),
+    ('alice', 'TopazBot', '1/2-1/2'),
+    ('TopazBot', 'carol', 'F-0'),
+    ('carol', 'alice', '0-1'),
+    ('bob', 'carol', '1-0'),
+]
+# positions and moves are compared by these columns, ids are compared through the tables that reference them
+TABLE_QUERIES = {
+    'games': "SELECT * FROM games ORDER BY id;",
+    'positions': "SELECT id, key, tps, player_to_move FROM positions ORDER BY id;",
+    'position_moves': "SELECT * FROM position_moves ORDER BY position_id, move;",
+    'game_position_xref': "SELECT * FROM game_position_xref ORDER BY id;",
+    'position_results': "SELECT * FROM position_results ORDER BY position_id, bot_game;",
+    'players': "SELECT * FROM players ORDER BY name;",
+    'game_moves': "SELECT * FROM game_moves ORDER BY game_id;",
+}
+
+
+# schema of the databases written before positions were cached (the first version of `PositionDataBase`)
+BASELINE_SCHEMA = """
+    CREATE TABLE games (
+        id integer PRIMARY KEY,
+        playtak_id integer,
+        size integer,
+        white text NOT NULL,
+        black text NOT NULL,
+        result text NOT NULL,
+        komi integer,
+        rating_white integer DEFAULT 1000,
+        rating_black integer DEFAULT 1000,
+        date integer,
+        tournament integer
+    );
+    CREATE TABLE positions (
+        id integer PRIMARY KEY,
+        tps text NOT NULL,
+        player_to_move text NOT NULL,
+        moves text
+    );
+    CREATE TABLE game_position_xref (
+        id integer PRIMARY KEY,
+        game_id integer,
+        position_id integer,
+        FOREIGN KEY (game_id) REFERENCES games(id),
+        FOREIGN KEY (position_id) REFERENCES positions(id)
+    );
+    CREATE UNIQUE INDEX idx_position_tps ON positions (tps, player_to_move);
+"""
+
+
+def known_games() -> list[dict]:
+    """Rows of the playtak `games` table of random 6x6 games, the same on every run"""
+    rng = random.Random(7)
+    games = []
+    for game_id, (white, black, result) in enumerate(PLAYERS_AND_RESULTS, start=1):
+        moves, _result = random_game(rng, 6, 24)
+        games.append({
+            'id': game_id, 'date': 1_500_000_000_000 + game_id, 'size': 6, 'player_white': white, 'player_black': black,
+            'notation': to_playtak_notation(moves), 'result': result, 'timertime': 600, 'timerinc': 5,
+            'rating_white': 1500, 'rating_black': 1600, 'unrated': 0, 'tournament': game_id % 2, 'komi': 4,
+            'pieces': -1, 'capstones': -1,
+        })
+    return games
+
+
+def import_games(db_file: str, games: list[dict], **db_options):
+    with PositionDataBase(db_file, **db_options) as db:
+        ptn_parser.add_games_to_db(games, db, max_plies=12)
+        db.commit()
+
+
+def read_tables(db_file: str) -> dict[str, list[tuple]]:
+    with closing(sqlite3.connect(db_file)) as conn:
+        return {table: conn.execute(query).fetchall() for table, query in TABLE_QUERIES.items()}
+
+
+class TestPositionCache():
+    def test_small_cache(self, tmp_path):
+        import_games(str(tmp_path / "large.db"), known_games())
+        import_games(str(tmp_path / "small.db"), known_games(), position_cache_size=4)
+        assert read_tables(str(tmp_path / "small.db")) == read_tables(str(tmp_path / "large.db"))
+
+    def test_import_in_two_runs(self, tmp_path):
+        games = known_games()
+        import_games(str(tmp_path / "once.db"), games)
+        import_games(str(tmp_path / "twice.db"), games[:3])
+        import_games(str(tmp_path / "twice.db"), games[3:], position_cache_size=4)
+        assert read_tables(str(tmp_path / "twice.db")) == read_tables(str(tmp_path / "once.db"))
+
+    def test_write_behind(self, tmp_path):
+        with PositionDataBase(str(tmp_path / "test.db")) as db:
+            ptn_parser.add_games_to_db(known_games()[:1], db, max_plies=12)
+            assert db.conn is not None
+            positions = len(db.new_positions)
+            assert positions > 0
+            assert db.conn.execute("SELECT COUNT(*) FROM positions;").fetchone()[0] == 0
+
+            db.flush()
+            assert not db.new_positions
+            assert db.conn.execute("SELECT COUNT(*) FROM positions;").fetchone()[0] == positions
+            # flushed positions are still found in the cache and the database
+            assert db.get_position(*db.conn.execute("SELECT tps, player_to_move FROM positions ORDER BY id;").fetchone()).id == 1
+            db.position_cache.clear()
+            assert db.get_position(*db.conn.execute("SELECT tps, player_to_move FROM positions ORDER BY id;").fetchone()).id == 1
+
+
+class TestWriteBatches():
+    def test_batch_sizes(self, tmp_path):
+        import_games(str(tmp_path / "default.db"), known_games())
+        for write_batch_size in (1, 3):
+            db_file = str(tmp_path / f"batch_{write_batch_size}.db")
+            import_games(db_file, known_games(), write_batch_size=write_batch_size)
+            assert read_tables(db_file) == read_tables(str(tmp_path / "default.db"))
+
+    def test_games_written_on_commit(self, tmp_path):
+        with PositionDataBase(str(tmp_path / "test.db"), write_batch_size=4) as db:
+            ptn_parser.add_games_to_db(known_games()[:3], db, max_plies=0)
+            assert db.conn is not None
+            assert len(db.pending_games) == 3
+            db.commit()
+            assert not db.pending_games and not db.pending_xrefs
+            assert [row[0] for row in db.conn.execute("SELECT playtak_id FROM games ORDER BY id;")] == [1, 2, 3]
+            assert db.conn.execute("SELECT COUNT(*) FROM game_position_xref;").fetchone()[0] == 3
+
+
+def write_baseline_db(source_db: str, baseline_db: str):
+    """Writes the games and positions of `source_db` to `baseline_db` in `BASELINE_SCHEMA`"""
+    with closing(sqlite3.connect(baseline_db)) as conn:
+        conn.executescript(BASELINE_SCHEMA)
+        conn.execute("ATTACH DATABASE ? AS source;", (source_db,))
+        conn.execute("""
+            INSERT INTO games
+            SELECT id, playtak_id, size, white, black, result, komi, rating_white, rating_black, date, tournament
+            FROM source.games;
+        """)
+        # moves as `move,next_id;move,next_id;...`, an empty string for none
+        conn.execute("""
+            INSERT INTO positions (id, tps, player_to_move, moves)
+            SELECT id, tps, player_to_move, COALESCE((
+                SELECT GROUP_CONCAT(move || ',' || next_position_id, ';')
+                FROM source.position_moves
+                WHERE position_id = source.positions.id
+            ), '')
+            FROM source.positions;
+        """)
+        conn.execute("INSERT INTO game_position_xref SELECT * FROM source.game_position_xref;")
+        conn.commit()
+
+
+class TestPositionResults():
+    def test_bot_game_split(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        import_games(db_file, known_games())
+        with closing(sqlite3.connect(db_file)) as conn:
+            rows = conn.execute("""
+                SELECT bot_game, white, black, draw
+                FROM position_results, positions
+                WHERE positions.id = position_results.position_id AND positions.tps = ?
+                ORDER BY bot_game;
+            """, ('/'.join([','.join('x' * 6)] * 6),)).fetchall()
+        # the empty board of every game, 0-1 and 1-0 are counted like any other win
+        assert rows == [(0, 2, 2, 0), (1, 1, 0, 1)]
+
+
+class TestPositionKeys():
+    def test_colliding_keys(self, tmp_path, monkeypatch):
+        import_games(str(tmp_path / "unique.db"), known_games())
+        monkeypatch.setattr(position_db, 'position_key', lambda _tps, _player_to_move: 42)
+        import_games(str(tmp_path / "colliding.db"), known_games(), position_cache_size=4)
+
+        unique = read_tables(str(tmp_path / "unique.db"))
+        colliding = read_tables(str(tmp_path / "colliding.db"))
+        assert {key for _id, key, _tps, _player in colliding['positions']} == {42}
+        # positions are told apart by their tps and player to move
+        assert [(id, tps, player) for id, _key, tps, player in colliding['positions']] == \
+            [(id, tps, player) for id, _key, tps, player in unique['positions']]
+        assert {table: rows for table, rows in colliding.items() if table != 'positions'} == \
+            {table: rows for table, rows in unique.items() if table != 'positions'}
+
+
+class TestPlayers():
+    def test_player_counts(self, tmp_path):
+        db_file = str(tmp_path / "test.db")
+        games = known_games()
+        import_games(db_file, games[:2])
+        import_games(db_file, games[2:])
+        expected = {}
+        for white, black, _result in PLAYERS_AND_RESULTS:
+            expected.setdefault(white, [0, 0])[0] += 1
+            expected.setdefault(black, [0, 0])[1] += 1
+        assert read_tables(db_file)['players'] == [(name, *counts) for name, counts in sorted(expected.items())]
+
+
+class TestMigration():
+    def test_migrate_baseline_db(self, tmp_path):
+        fresh_db = str(tmp_path / "fresh.db")
+        migrated_db = str(tmp_path / "migrated.db")
+        games = known_games()
+        import_games(fresh_db, games[:3])
+        write_baseline_db(fresh_db, migrated_db)
+        # the migrated database keeps growing like one that was never migrated
+        import_games(fresh_db, games[3:])
+        import_games(migrated_db, games[3:])
+
+        fresh = read_tables(fresh_db)
+        migrated = read_tables(migrated_db)
+        assert migrated['position_moves'] == fresh['position_moves']
+        assert migrated['game_position_xref'] == fresh['game_position_xref']
+        assert migrated['position_results'] == fresh['position_results']
+        assert migrated['positions'] == fresh['positions']
+        assert migrated['players'] == fresh['players']
+        # games imported before the migration have no time control, unrated, pieces, capstones and moves
+        assert migrated['games'] == [game[:-5] + (None,) * 5 for game in fresh['games'][:3]] + fresh['games'][3:]
+        assert migrated['game_moves'] == fresh['game_moves'][3:]
+        with closing(sqlite3.connect(migrated_db)) as conn:
+            assert 'moves' not in [row[1] for row in conn.execute("PRAGMA table_info(positions);")]
+            indexes = [row[1] for row in conn.execute("PRAGMA index_list(positions);")]
+            assert 'idx_position_key' in indexes and 'idx_position_tps' not in indexes
@@ -0,0 +1,31 @@
+import ptn_parser
+import symmetry_normalisator
+from position_db import PositionDataBase
+from profiling import Profiler
+from tak import GameState
+
+game = {
+    'id': 1, 'size': 6, 'notation': 'P A1,P F6,P B2,P C3', 'result': 'R-0', 'komi': 0,
+    'player_white': 'alice', 'player_black': 'bob', 'rating_white': 1500, 'rating_black': 1500,
+    'date': 0, 'tournament': 0,
+}
+
+
+class TestProfiler():
+    def test_instrument(self, tmp_path):
+        move = GameState.move
+        get_tps_orientation = symmetry_normalisator.get_tps_orientation
+        profiler = Profiler()
+        with PositionDataBase(str(tmp_path / "test.db")) as db, profiler.instrument():
+            ptn_parser.add_games_to_db([game], db)
+            db.commit()
+
+        # the original functions are back
+        assert GameState.move is move
+        assert symmetry_normalisator.get_tps_orientation is get_tps_orientation
+
+        report = profiler.report()
+        assert report['games'] == 1
+        assert report['positions'] == 5
+        assert report['stages']['GameState.move']['calls'] == 4
+        assert abs(sum(stage['seconds'] for stage in report['stages'].values()) - report['seconds']) < 0.01
@@ -0,0 +1,48 @@
+import sqlite3
+from contextlib import closing
+
+import ptn_parser
+from db_extractor import get_games_from_db, get_moves_array
+from position_db import PositionDataBase
+from util.generate_games_db import GeneratorOptions, generate_games_db
+
+options = GeneratorOptions(
+    seed=3, sizes={6: 1}, num_players=5, rating_mean=1500, rating_stdev=200, bot_ratio=0.2, komis=[0, 4],
+    tournament_ratio=0.1, start_date=1_500_000_000_000, end_date=1_600_000_000_000, min_plies=10, max_plies=40,
+)
+
+
+def import_games(games_db: str, db_file: str, jobs: int) -> list[str]:
+    with PositionDataBase(db_file) as db:
+        games = get_games_from_db(games_db, 6, num_plies=0, num_games=1000, min_rating=0)
+        ptn_parser.add_games_to_db(games, db, max_plies=12, jobs=jobs)
+        db.commit()
+    with closing(sqlite3.connect(db_file)) as conn:
+        return list(conn.iterdump())
+
+
+class TestAddGamesToDb():
+    def test_parallel_import_matches_serial(self, tmp_path):
+        games_db = str(tmp_path / "games_anon.db")
+        generate_games_db(games_db, 60, options)
+
+        serial = import_games(games_db, str(tmp_path / "serial.db"), jobs=1)
+        parallel = import_games(games_db, str(tmp_path / "parallel.db"), jobs=2)
+        assert any(line.startswith('INSERT INTO "game_moves"') for line in serial)
+        assert parallel == serial
+
+    def test_parallel_import_passes_moves(self, tmp_path, monkeypatch):
+        games_db = str(tmp_path / "games_anon.db")
+        generate_games_db(games_db, 10, options)
+        add_game_entry = ptn_parser.add_game_entry
+        passed_moves = []
+
+        def add_game_entry_spy(game, dp, moves=None):
+            passed_moves.append((moves, get_moves_array(game['notation'])))
+            return add_game_entry(game, dp, moves)
+
+        # the moves parsed by the workers are stored, not parsed once more by the writing process
+        monkeypatch.setattr(ptn_parser, 'add_game_entry', add_game_entry_spy)
+        import_games(games_db, str(tmp_path / "parallel.db"), jobs=2)
+        assert passed_moves
+        assert all(moves == expected for moves, expected in passed_moves)
@@ -0,0 +1,275 @@
+import os
+import time
+from dataclasses import fields
+
+import pytest
+import import_worker
+import openings_config
+from util.generate_games_db import GeneratorOptions, generate_games_db
+
+IMPORT_TIMEOUT_SECONDS = 120
+
+options = GeneratorOptions(
+    seed=5, sizes={6: 1}, num_players=8, rating_mean=1800, rating_stdev=200, bot_ratio=0.1, komis=[0, 4],
+    tournament_ratio=0.1, start_date=1_500_000_000_000, end_date=1_600_000_000_000, min_plies=20, max_plies=60,
+)
+
+
+@pytest.fixture(scope='module')
+def server(tmp_path_factory):
+    """The server module, imported in a fresh data directory after its initial import of synthetic games"""
+    work_dir = tmp_path_factory.mktemp('server')
+    os.mkdir(work_dir / openings_config.DATA_DIR)
+    generate_games_db(str(work_dir / openings_config.PLAYTAK_GAMES_DB), 200, options)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(work_dir)
+        monkeypatch.setattr(openings_config, 'DOWNLOAD_PLAYTAK_DB', False)
+        import server as server_module  # pylint: disable=import-outside-toplevel
+
+        # the import worker writes the summary while the server holds `import_lock`
+        deadline = time.monotonic() + IMPORT_TIMEOUT_SECONDS
+        while not os.path.exists(openings_config.IMPORT_SUMMARY_FILE) or server_module.import_lock.locked():
+            assert time.monotonic() < deadline, "initial import did not finish"
+            time.sleep(0.1)
+        yield server_module
+
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
+
+
+def imported_game_id(server) -> int:
+    db = server.read_connections[server.openings_db_configs[0].db_file_name].connection()
+    return db.execute("SELECT MIN(playtak_id) FROM games;").fetchone()[0]
+
+
+class FakeImportWorker():
+    """Stands in for the import worker process, swapping one database per poll and exiting with `returncode`"""
+
+    def __init__(self, server, swapped_db_ids: list[int], returncode: int):
+        self.server = server
+        self.swapped_db_ids = swapped_db_ids
+        self.final_returncode = returncode
+        self.returncode = None
+        self.summary: dict = {'started': '2020-01-01T00:00:00', 'databases': []}
+        self.generations_seen: list[list[int]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_exc_info):
+        pass
+
+    def poll(self):
+        self.generations_seen.append(generations(self.server))
+        if len(self.summary['databases']) == len(self.swapped_db_ids):
+            self.returncode = self.final_returncode
+            if self.returncode == 0:
+                self.summary['seconds'] = 1.0
+                import_worker.write_import_summary(openings_config.IMPORT_SUMMARY_FILE, self.summary)
+            return self.returncode
+        db_id = self.swapped_db_ids[len(self.summary['databases'])]
+        self.summary['databases'].append({'db_id': db_id, 'file': '', 'imported_games': 1, 'seconds': 1.0})
+        import_worker.write_import_summary(openings_config.IMPORT_SUMMARY_FILE, self.summary)
+        return None
+
+
+def generations(server) -> list[int]:
+    return [server.position_analysis_cache.generation(db_id) for db_id in range(len(server.openings_db_configs))]
+
+
+class TestImportWorker():
+    def run_fake_worker(self, server, monkeypatch, swapped_db_ids: list[int], returncode: int) -> FakeImportWorker:
+        worker = FakeImportWorker(server, swapped_db_ids, returncode)
+        monkeypatch.setattr(server, 'IMPORT_POLL_SECONDS', 0)
+        monkeypatch.setattr(server.subprocess, 'Popen', lambda *_args, **_kwargs: worker)
+        server.run_import_worker()
+        return worker
+
+    def test_invalidated_when_swapped(self, server, monkeypatch):
+        before = generations(server)
+        worker = self.run_fake_worker(server, monkeypatch, [0, 1], returncode=0)
+        # database 0 is invalidated before the worker swaps database 1
+        assert worker.generations_seen[1][0] == before[0] + 1
+        assert worker.generations_seen[1][1] == before[1]
+        after = generations(server)
+        assert after[:2] == [before[0] + 1, before[1] + 1]
+        assert after[2:] == before[2:]
+
+    def test_all_invalidated_when_failed(self, server, monkeypatch):
+        before = generations(server)
+        self.run_fake_worker(server, monkeypatch, [0], returncode=1)
+        assert generations(server)[1:] == [generation + 1 for generation in before[1:]]
+        assert generations(server)[0] > before[0]
+
+
+class TestGame():
+    def test_imported_game_matches_playtak_game(self, server, client, monkeypatch):
+        game_id = imported_game_id(server)
+        imported = client.get(f'/api/v1/game/{game_id}')
+        monkeypatch.setattr(server, 'get_imported_game', lambda _playtak_id: None)
+        from_playtak_db = client.get(f'/api/v1/game/{game_id}')
+        assert imported.status_code == from_playtak_db.status_code == 200
+        assert set(imported.get_json()) == {*server.GAME_FIELDS, 'ptn'}
+        assert imported.get_json() == from_playtak_db.get_json()
+
+    def test_unknown_game(self, client):
+        assert client.get('/api/v1/game/999999').status_code == 404
+
+
+START_TPS = 'x6/x6/x6/x6/x6/x6 1 1'
+
+
+def child_results(server, extra_condition: str = '', params: tuple = ()) -> list[tuple[int, int, int]]:
+    """(white, black, draw) of every move from the start position of database 0, counted game by game"""
+    db = server.read_connections[server.openings_db_configs[0].db_file_name].connection()
+    root_id = db.execute(
+        "SELECT id FROM positions WHERE tps=? AND player_to_move='black';",
+        (server.symmetry_normalisator.get_tps_orientation(START_TPS)[0],),
+    ).fetchone()[0]
+    results = []
+    # symmetric moves lead to the same position, which the analysis lists once
+    next_position_ids = db.execute("SELECT DISTINCT next_position_id FROM position_moves WHERE position_id=?;", (root_id,))
+    for (next_position_id,) in next_position_ids.fetchall():
+        counts = {'white': 0, 'black': 0, 'draw': 0}
+        for (result,) in db.execute(f"""
+            SELECT games.result FROM game_position_xref, games
+            WHERE game_position_xref.position_id = ? AND games.id = game_position_xref.game_id {extra_condition};
+        """, (next_position_id, *params)):
+            category = server.result_category(result)
+            if category is not None:
+                counts[category] += 1
+        if sum(counts.values()):
+            results.append((counts['white'], counts['black'], counts['draw']))
+    return sorted(results)
+
+
+class TestOpening():
+    def test_move_results(self, server, client):
+        analysis = client.get(f'/api/v1/opening/0/{START_TPS}').get_json()
+        moves = sorted((move['white'], move['black'], move['draw']) for move in analysis['moves'])
+        assert moves and moves == child_results(server)
+        assert (analysis['white'], analysis['black'], analysis['draw']) == tuple(map(sum, zip(*moves)))
+
+    def test_filtered_move_results(self, server, client):
+        player = client.get('/api/v1/players?db_id=0').get_json()['white'][0]
+        analysis = client.post(f'/api/v1/opening/0/{START_TPS}', json={'white': player}).get_json()
+        moves = sorted((move['white'], move['black'], move['draw']) for move in analysis['moves'])
+        assert moves and moves == child_results(server, "AND games.white = ?", (player,))
+
+
+class TestBatch():
+    def test_same_as_single_positions(self, client):
+        positions = [START_TPS, 'x6/x6/x6/x6/x6/x5,2 1 1', 'x6/x6/x6/x6/x6/2,x5 1 1']
+        settings = {'include_bot_games': True, 'max_suggested_moves': 3}
+        response = client.post('/api/v1/openings/batch', json={'db_id': 1, 'positions': positions, 'settings': settings})
+        assert response.status_code == 200
+        for tps, analysis in zip(positions, response.get_json()['analyses'], strict=True):
+            single = client.post(f'/api/v1/opening/1/{tps}', json=settings).get_json()
+            for key in ('white', 'black', 'draw', 'moves', 'games', 'settings'):
+                assert analysis[key] == single[key]
+
+    def test_settings_fields(self, server):
+        assert set(server.SETTINGS_CHECKS) == {field.name for field in fields(server.AnalysisSettings)}
+
+    @pytest.mark.parametrize('body', [
+        [START_TPS],
+        {'positions': START_TPS},
+        {'positions': [1]},
+        {'positions': ['x6/x6/x6/x6/x6/x6']},
+        {'positions': ['x5/x6/x6/x6/x6/x6 1 1']},
+        {'positions': ['x5 1 1']},
+        {'positions': ['x6/x6/x6/x6/x6/q6 1 1']},
+        {'positions': ['x6/x6/x6/x6/x6/x6 3 1']},
+        {'positions': [START_TPS], 'db_id': True},
+        {'positions': [START_TPS], 'db_id': '0'},
+        {'positions': [START_TPS], 'settings': {'colour': 'white'}},
+        {'positions': [START_TPS], 'settings': ['white']},
+        {'positions': [START_TPS], 'settings': {'min_rating': 'high'}},
+        {'positions': [START_TPS], 'settings': {'max_suggested_moves': False}},
+        {'positions': [START_TPS], 'settings': {'white': ['alice', 3]}},
+        {'positions': [START_TPS], 'settings': {'min_date': 'yesterday'}},
+        {'positions': [START_TPS], 'settings': {'tournament': 'yes'}},
+    ])
+    def test_bad_request(self, client, body):
+        response = client.post('/api/v1/openings/batch', json=body)
+        assert response.status_code == 400, response.get_json()
+
+    def test_unknown_database(self, client):
+        response = client.post('/api/v1/openings/batch', json={'db_id': 99, 'positions': [START_TPS]})
+        assert response.status_code == 404
+
+
+def tree_nodes(node: dict, depth: int = 0):
+    yield node, depth
+    for child in node['children']:
+        yield from tree_nodes(child, depth + 1)
+
+
+class TestTree():
+    def test_limits_and_results(self, client):
+        response = client.get(f'/api/v1/tree/0/{START_TPS}?max_depth=2&max_children=3&min_games=2')
+        assert response.status_code == 200
+        root = response.get_json()['root']
+        nodes = list(tree_nodes(root))
+        assert max(depth for _node, depth in nodes) == 2
+        for node, _depth in nodes:
+            assert len(node['children']) <= 3
+            assert node is root or node['white'] + node['black'] + node['draw'] >= 2
+
+        # the children of a node are the most played moves of the analysis of its position
+        root_analysis = client.get(f"/api/v1/opening/0/{START_TPS}").get_json()
+        assert (root['white'], root['black'], root['draw']) == \
+            (root_analysis['white'], root_analysis['black'], root_analysis['draw'])
+        for node, depth in nodes:
+            if depth == 2 or node['transposition']:
+                continue
+            analysis = client.get(f"/api/v1/opening/0/{node['tps']}").get_json()
+            played = sorted((move['white'] + move['black'] + move['draw'] for move in analysis['moves']), reverse=True)
+            children = [child['white'] + child['black'] + child['draw'] for child in node['children']]
+            assert children == [games for games in played if games >= 2][:3]
+
+    @pytest.mark.parametrize(('path', 'body'), [
+        ('/api/v1/tree/0/x6/x6/x6/x6/x6 1 1', None),
+        ('/api/v1/tree/0/x6/x6/x6/x6/x6/x6', None),
+        ('/api/v1/tree/2/x6/x6/x6/x6/x6/x6 1 1', None), # 7x7 database
+        (f'/api/v1/tree/0/{START_TPS}', {'colour': 'white'}),
+        (f'/api/v1/tree/0/{START_TPS}', {'komi': 'none'}),
+        (f'/api/v1/tree/0/{START_TPS}?max_depth=two', None),
+        (f'/api/v1/tree/0/{START_TPS}?max_children=1.5', None),
+        (f'/api/v1/tree/0/{START_TPS}?min_games=', None),
+    ])
+    def test_bad_request(self, client, path, body):
+        response = client.post(path, json=body) if body is not None else client.get(path)
+        assert response.status_code == 400, response.get_json()
+
+    def test_unknown_database(self, client):
+        assert client.get(f'/api/v1/tree/99/{START_TPS}').status_code == 404
+
+
+class TestPlayers():
+    def test_all_players(self, server, client):
+        names = client.get('/api/v1/players').get_json()
+        expected_white = set()
+        for config in server.openings_db_configs:
+            db = server.read_connections[config.db_file_name].connection()
+            expected_white |= {row[0] for row in db.execute("SELECT white FROM games;")}
+        assert names['white'] == sorted(expected_white)
+
+    def test_prefix_and_limit(self, client):
+        names = client.get('/api/v1/players?db_id=0').get_json()
+        prefix = names['white'][0][:7].upper() # case insensitive
+        selected = client.get(f'/api/v1/players?db_id=0&prefix={prefix}&limit=2').get_json()
+        expected = [name for name in names['white'] if name.lower().startswith(prefix.lower())][:2]
+        assert selected['white'] == expected and expected
+        assert len(selected['black']) <= 2
+        assert all(name.lower().startswith(prefix.lower()) for name in selected['black'])
+        assert client.get('/api/v1/players?db_id=0&limit=0').get_json() == {'white': [], 'black': []}
+
+    @pytest.mark.parametrize('query', ['db_id=zero', 'limit=ten', 'db_id=true'])
+    def test_bad_request(self, client, query):
+        assert client.get(f'/api/v1/players?{query}').status_code == 400
+
+    def test_unknown_database(self, client):
+        assert client.get('/api/v1/players?db_id=99').status_code == 404
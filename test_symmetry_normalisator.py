@@ -121,3 +121,58 @@ class TestTransformMove():
         ]
         actual = [symnorm.transform_move(expected[0], TpsSymmetry(i), size) for i in range(len(expected))]
         assert actual == expected
+
+    @pytest.mark.parametrize("size", range(3, 9))
+    def test_lookup_matches_rewriting(self, size: int):
+        board_size = BoardSize(size)
+        for move in all_moves(size):
+            for orientation in map(TpsSymmetry, range(8)):
+                transformed = symnorm.transform_move(move, orientation, board_size)
+                assert transformed == symnorm.transform_move_by_rewriting(move, orientation, board_size)
+                assert symnorm.transposed_transform_move(move, orientation, board_size) == \
+                    symnorm.transposed_transform_move_by_rewriting(move, orientation, board_size)
+                assert symnorm.transposed_transform_move(transformed, orientation, board_size) == move
+
+    @pytest.mark.parametrize("move", ["", "3+1", "C", "i1", "a9"])
+    def test_invalid_move(self, move: str):
+        with pytest.raises(ValueError):
+            symnorm.transform_move(move, TpsSymmetry(1), BoardSize(8))
+
+
+def all_moves(size: int) -> list[str]:
+    """Every placement and a spread of every count and direction from every square"""
+    squares = [chr(ord('a') + col) + str(row + 1) for row in range(size) for col in range(size)]
+    moves = [stone + square for square in squares for stone in ('', 'S', 'C')]
+    moves += [f"{count}{square}{direction}{count}" for square in squares for direction in '+-<>' for count in range(1, size + 1)]
+    moves += [f"{square}{direction}" for square in squares for direction in '+-<>']
+    return moves
+
+
+# (tps, expected normalized tps, expected orientation)
+tps_orientations: list[tuple[str, str, int]] = [
+    ("x6/x6/x6/x6/x6/x6 1 1", "x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x", 0),
+    ("x5,1/x6/x6/x6/x6/2,x5 1 2", "1,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,x/x,x,x,x,x,2", 1),
+    ("x,21,1/x3/2,x2 2 5", "1,21,x/x,x,x/x,x,2", 6),
+]
+
+
+def reference_tps_orientation(tps: str) -> tuple[str, int]:
+    """The smallest of all orientations produced by `transform_tps`"""
+    orientations = [symnorm.expand_tps_xn(symnorm.transform_tps(tps, i))[:-4] for i in range(8)]
+    smallest = min(orientations)
+    return smallest, orientations.index(smallest)
+
+
+class TestTpsOrientation():
+    @pytest.mark.parametrize(("tps", "expected_tps", "expected_orientation"), tps_orientations)
+    def test_get_tps_orientation(self, tps: str, expected_tps: str, expected_orientation: int):
+        assert symnorm.get_tps_orientation(tps) == (expected_tps, expected_orientation)
+
+    @pytest.mark.parametrize("size", range(3, 9))
+    def test_matches_transform_tps(self, size: int):
+        # every square differs, so all orientations are distinct
+        squares = [f"{i % 2 + 1}" * (i // 2 + 1) for i in range(size * size)]
+        tps = '/'.join(','.join(squares[row:row + size]) for row in range(0, len(squares), size)) + " 1 2"
+        for i in range(8):
+            transformed = symnorm.transform_tps(tps, i)
+            assert symnorm.get_tps_orientation(transformed) == reference_tps_orientation(transformed)
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+from db_extractor import get_moves_array, to_playtak_notation
+from synthetic_games import STONE_COUNTS, has_road, random_game
+from tak import GameState
+
+
+def play(size: int, moves: list[str]) -> GameState:
+    game = GameState(size)
+    for move in moves:
+        game.move(move)
+    return game
+
+
+class TestRandomGame():
+    def test_same_seed_same_games(self):
+        assert random_game(random.Random(5), 6, 60) == random_game(random.Random(5), 6, 60)
+
+    @pytest.mark.parametrize('size', STONE_COUNTS.keys())
+    def test_games_are_legal(self, size):
+        rng = random.Random(size)
+        for _ in range(20):
+            moves, result = random_game(rng, size, 200)
+            game = play(size, moves)
+            stones, capstones = STONE_COUNTS[size]
+            for colour in '12':
+                assert sum(stack.count(colour) for stack in game.stacks) <= stones + capstones
+            assert game.tops.count('C') <= 2 * capstones
+            if result == 'R-0':
+                assert has_road(game, '1')
+            elif result == '0-R':
+                assert has_road(game, '2')
+
+    def test_playtak_notation(self):
+        moves = ['a1', 'f6', 'Sb2', 'Cc3', '1b2<1', '2a2+11']
+        assert to_playtak_notation(moves) == 'P A1,P F6,P B2 W,P C3 C,M B2 A2 1,M A2 A4 1 1'
+        assert get_moves_array(to_playtak_notation(moves)) == moves
+
+
+def test_has_road():
+    # the first stones are placed for the opponent
+    game = play(3, ['c3', 'a1', 'a2', 'b3', 'a3'])
+    assert not has_road(game, '2')
+    assert has_road(game, '1')
+    assert not has_road(play(3, ['c3', 'a1', 'a2', 'b3', 'Sa3']), '1')
@@ -0,0 +1,58 @@
+import pytest
+from tak import GameState
+
+# (size, moves, expected tps after all moves)
+games: list[tuple[int, list[str], str]] = [
+    (6, [], "x6/x6/x6/x6/x6/x6 1 0"),
+    (6, ["a1", "f6"], "x5,1/x6/x6/x6/x6/2,x5 1 2"),
+    (6, ["a1", "f6", "Sb1", "Cc1"], "x5,1/x6/x6/x6/x6/2,1S,2C,x3 1 4"),
+    # moved walls and capstones stay on top of the target square
+    (5, ["a1", "e5", "b1", "Sa2", "Cc1", "b2", "1c1<1"], "x4,1/x5/x5/2S,2,x3/2,11C,x3 2 7"),
+    (5, ["a1", "e5", "Sb1", "Ca2", "1b1<1"], "x4,1/x5/x5/2C,x4/21S,x4 2 5"),
+    (5, ["a1", "e5", "Sb1", "Ca2", "1a2-1"], "x4,1/x5/x5/x5/22C,1S,x3 2 5"),
+    # spreads with multiple drops
+    (6, ["a1", "f6", "a2", "b2", "1a2-1", "b1", "2a1+11"], "x5,1/x6/x6/1,x5/2,2,x4/x,2,x4 2 7"),
+    (6, ["f1", "a6", "e1", "f2", "1e1>1", "f3", "2f1+11"], "1,x5/x6/x6/x5,21/x5,22/x6 2 7"),
+    # capstone moving onto a wall
+    (6, ["a1", "f6", "c3", "d3", "Cc4", "Sd4", "1c4>1", "1c3+1"], "x5,1/x6/x2,1,21C,x2/x3,2,x2/x6/2,x5 1 8"),
+    (8, ["a1", "h8", "a8", "h1"], "1,x6,1/x8/x8/x8/x8/x8/x8/2,x6,2 1 4"),
+    (3, ["a1", "c3", "b2", "b3", "1b2+1"], "x,21,1/x3/2,x2 2 5"),
+]
+
+
+class TestGameState():
+    @pytest.mark.parametrize(("size", "moves", "expected"), games)
+    def test_get_tps(self, size: int, moves: list[str], expected: str):
+        game = GameState(size)
+        for move in moves:
+            game.move(move)
+        assert game.get_tps() == expected
+
+    @pytest.mark.parametrize(("size", "moves", "expected"), games)
+    def test_clone_is_independent(self, size: int, moves: list[str], expected: str):
+        game = GameState(size)
+        for move in moves:
+            game.move(move)
+        clone = game.clone()
+        clone.move("a1" if clone.stacks[0] == '' else "1a1>1")
+        assert game.get_tps() == expected
+        assert clone.get_tps() != expected
+
+    def test_reset(self):
+        game = GameState(6)
+        game.move("a1")
+        game.reset()
+        assert game.get_tps() == "x6/x6/x6/x6/x6/x6 1 0"
+
+    @pytest.mark.parametrize(("size", "moves", "expected"), games)
+    def test_from_tps(self, size: int, moves: list[str], expected: str):
+        game = GameState(size)
+        for move in moves:
+            game.move(move)
+        board, player, ply = expected.split(' ')
+        parsed = GameState.from_tps(f"{board} {player} {int(ply) // 2 + 1}")
+        assert parsed.size == game.size
+        assert parsed.ply_counter == game.ply_counter
+        assert parsed.stacks == game.stacks
+        assert parsed.tops == game.tops
+        assert parsed.get_tps() == expected
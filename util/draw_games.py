@@ -6,9 +6,11 @@ con = sqlite3.connect('../data/openings_s6_1200.db')
 con.row_factory = sqlite3.Row
 
 query = '''
-SELECT *, wwins+bwins AS num_games
-FROM positions
-WHERE length(tps) > 35
+SELECT positions.*, SUM(position_results.white) + SUM(position_results.black) AS num_games
+FROM positions, position_results
+WHERE position_results.position_id = positions.id
+    AND length(tps) > 35
+GROUP BY positions.id
 ORDER BY num_games DESC
 '''
 
@@ -13,6 +13,13 @@ with closing(sqlite3.connect('data/openings_s6_1200.db')) as con:
             csv_writer.writerow([i[0] for i in cur.description])
             csv_writer.writerows(cur)
 
+        # dump moves between positions
+        cur.execute("SELECT * FROM position_moves ORDER BY position_id;")
+        with open("position_moves.csv", "w", encoding="UTF-8") as csv_file:
+            csv_writer = csv.writer(csv_file, delimiter="\t")
+            csv_writer.writerow([i[0] for i in cur.description])
+            csv_writer.writerows(cur)
+
         # dump games
         cur.execute("SELECT * FROM games;")
         with open("games.csv", "w", encoding="UTF-8") as csv_file:
@@ -31,6 +38,8 @@ total: str = ""
 
 with open("positions.csv", encoding="UTF-8") as t:
     total += t.read() + "\nTABLE\n"
+with open("position_moves.csv", encoding="UTF-8") as t:
+    total += t.read() + "\nTABLE\n"
 with open("games.csv", encoding="UTF-8") as t:
     total += t.read() + "\nTABLE\n"
 with open("game_references.csv", encoding="UTF-8") as t:
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Writes a synthetic playtak games database (the `games` table of `games_anon.db`) with random legal games,
+for load and scale tests without downloading the real database. The same options and seed always give
+the same games, no matter how many jobs generate them.
+
+    python util/generate_games_db.py -o data/games_anon.db -n 100000 --sizes 6:4,5:1,7:1 --seed 1
+    python import_worker.py --no-download
+
+Existing databases are extended, new games get the ids after the highest one, like a newer download.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import sys
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from functools import partial
+from typing import Iterator
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from db_extractor import BOTLIST, to_playtak_notation
+from synthetic_games import STONE_COUNTS, random_game
+
+# schema of the playtak games database
+CREATE_GAMES_SQL = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    date INT,
+    size INT,
+    player_white VARCHAR(20),
+    player_black VARCHAR(20),
+    notation TEXT,
+    result VARCHAR(10),
+    timertime INT DEFAULT 0,
+    timerinc INT DEFAULT 0,
+    rating_white INT DEFAULT 1000,
+    rating_black INT DEFAULT 1000,
+    unrated INT DEFAULT 0,
+    tournament INT DEFAULT 0,
+    komi INT DEFAULT 0,
+    pieces INT DEFAULT -1,
+    capstones INT DEFAULT -1
+);
+"""
+INSERT_GAME_SQL = """
+INSERT INTO games (
+    id, date, size, player_white, player_black, notation, result, timertime, timerinc,
+    rating_white, rating_black, unrated, tournament, komi, pieces, capstones
+)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+"""
+# games generated by a worker process and inserted at once
+GAMES_PER_CHUNK = 1000
+MIN_RATING = 700
+MAX_RATING = 2800
+
+
+@dataclass
+class GeneratorOptions:
+    seed: int
+    sizes: dict[int, float] # relative frequency of each board size
+    num_players: int # human players, named `player<n>`
+    rating_mean: float
+    rating_stdev: float
+    bot_ratio: float # chance of each player to be a bot of `BOTLIST`
+    komis: list[int] # in half flats, picked uniformly
+    tournament_ratio: float
+    start_date: int # playtak timestamps (milliseconds) of the first and the last game
+    end_date: int
+    min_plies: int
+    max_plies: int
+
+
+def random_player(rng: random.Random, options: GeneratorOptions) -> str:
+    if rng.random() < options.bot_ratio:
+        return rng.choice(BOTLIST)
+    return f"player{rng.randrange(options.num_players)}"
+
+
+def random_rating(rng: random.Random, options: GeneratorOptions) -> int:
+    return min(max(round(rng.gauss(options.rating_mean, options.rating_stdev)), MIN_RATING), MAX_RATING)
+
+
+def generate_game(game_id: int, first_id: int, num_games: int, options: GeneratorOptions) -> tuple:
+    """Row of the `games` table for `game_id`, which only depends on the options and the id"""
+    rng = random.Random(options.seed * 1_000_003 + game_id)
+    size = rng.choices(list(options.sizes), weights=list(options.sizes.values()))[0]
+    white = random_player(rng, options)
+    black = random_player(rng, options)
+    while black == white:
+        black = random_player(rng, options)
+    komi = rng.choice(options.komis)
+    moves, result = random_game(rng, size, rng.randint(options.min_plies, options.max_plies), komi)
+    # dates grow with the ids, like in the real database
+    date = options.start_date + (options.end_date - options.start_date) * (game_id - first_id) // max(num_games - 1, 1)
+    return (
+        game_id,
+        date,
+        size,
+        white,
+        black,
+        to_playtak_notation(moves),
+        result,
+        rng.choice((180, 600, 900, 1200)), # timertime
+        rng.choice((0, 5, 10, 20)), # timerinc
+        random_rating(rng, options),
+        random_rating(rng, options),
+        0, # unrated
+        int(rng.random() < options.tournament_ratio),
+        komi,
+        -1, # pieces
+        -1, # capstones
+    )
+
+
+def chunk_ids(game_ids: range) -> Iterator[list[int]]:
+    for chunk_start in range(game_ids.start, game_ids.stop, GAMES_PER_CHUNK):
+        yield list(range(chunk_start, min(chunk_start + GAMES_PER_CHUNK, game_ids.stop)))
+
+
+def generate_chunk(game_ids: list[int], first_id: int, num_games: int, options: GeneratorOptions) -> list[tuple]:
+    return [generate_game(game_id, first_id, num_games, options) for game_id in game_ids]
+
+
+def generate_games_db(db_file: str, num_games: int, options: GeneratorOptions, jobs: int = 1) -> range:
+    """Appends `num_games` random games to `db_file` and returns their ids"""
+    with closing(sqlite3.connect(db_file)) as db:
+        db.execute(CREATE_GAMES_SQL)
+        first_id = (db.execute("SELECT MAX(id) FROM games;").fetchone()[0] or 0) + 1
+        game_ids = range(first_id, first_id + num_games)
+        generate = partial(generate_chunk, first_id=first_id, num_games=num_games, options=options)
+
+        def insert(chunks: Iterator[list[tuple]]):
+            written = 0
+            for rows in chunks:
+                db.executemany(INSERT_GAME_SQL, rows)
+                db.commit()
+                written += len(rows)
+                print(f"{written}/{num_games} games", end='\r', flush=True)
+            print()
+
+        if jobs > 1:
+            with multiprocessing.Pool(jobs) as pool:
+                insert(pool.imap(generate, chunk_ids(game_ids)))
+        else:
+            insert(map(generate, chunk_ids(game_ids)))
+    return game_ids
+
+
+def parse_sizes(sizes: str) -> dict[int, float]:
+    """`6:4,5:1` -> {6: 4.0, 5: 1.0}, a size without weight counts 1"""
+    weights = {}
+    for entry in sizes.split(','):
+        size, _, weight = entry.partition(':')
+        if int(size) not in STONE_COUNTS:
+            raise argparse.ArgumentTypeError(f"unsupported board size {size}")
+        weights[int(size)] = float(weight or 1)
+    return weights
+
+
+def parse_date(date: str) -> int:
+    return round(datetime.fromisoformat(date).timestamp() * 1000)
+
+
+def main(args: list[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-o', '--output', required=True, help="games database to write or extend")
+    parser.add_argument('-n', '--num-games', type=int, default=10_000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--sizes', type=parse_sizes, default='6', help="board sizes with weights, e.g. 6:4,5:1,7:1")
+    parser.add_argument('--players', type=int, default=500, help="number of human players")
+    parser.add_argument('--rating-mean', type=float, default=1500)
+    parser.add_argument('--rating-stdev', type=float, default=250)
+    parser.add_argument('--bot-ratio', type=float, default=0.2, help="chance of each player to be a bot")
+    parser.add_argument('--komi', default='0', help="komi values in half flats to choose from, e.g. 0,4")
+    parser.add_argument('--tournament-ratio', type=float, default=0.05)
+    parser.add_argument('--start-date', type=parse_date, default='2016-04-25', help="ISO date of the first game")
+    parser.add_argument('--end-date', type=parse_date, default='2023-01-01', help="ISO date of the last game")
+    parser.add_argument('--min-plies', type=int, default=20, help="plies after which games are resigned at the earliest")
+    parser.add_argument('--max-plies', type=int, default=100, help="plies after which games are resigned at the latest")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help="worker processes generating games")
+    options = parser.parse_args(args)
+
+    generator_options = GeneratorOptions(
+        seed=options.seed,
+        sizes=options.sizes,
+        num_players=options.players,
+        rating_mean=options.rating_mean,
+        rating_stdev=options.rating_stdev,
+        bot_ratio=options.bot_ratio,
+        komis=[int(komi) for komi in options.komi.split(',')],
+        tournament_ratio=options.tournament_ratio,
+        start_date=options.start_date,
+        end_date=options.end_date,
+        min_plies=options.min_plies,
+        max_plies=options.max_plies,
+    )
+    game_ids = generate_games_db(options.output, options.num_games, generator_options, options.jobs)
+    print(f"wrote games {game_ids.start} to {game_ids.stop - 1} to {options.output}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Load test of the opening API with a mix of requests like real traffic:
+
+- `opening`: GET of positions from the games of the database, the more games reach a position, the more often
+- `filtered`: POST of the same positions with player, rating, komi, bot or tournament settings
+- `game`: a game of the games database
+- `players`: player names, also with a prefix
+
+It reports throughput and latency percentiles per endpoint. Run it from the repository root, against the
+Flask app in this process (the default, waits for the initial import first) or a running server:
+
+    python util/load_test.py -c 8 -d 30
+    python util/load_test.py --url http://localhost:5000 -c 16 -d 60 --during-import
+
+With `--during-import` an import is started through the scheduler API when the load starts, and the requests
+made while it runs are reported separately. `--append-games` adds synthetic games to the games database first,
+so the import has something to do (set `DOWNLOAD_PLAYTAK_DB = False` so it is not replaced by a download).
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from urllib.parse import quote
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from db_extractor import get_games_from_db, get_moves_array
+from generate_games_db import GeneratorOptions, generate_games_db
+from openings_config import NUM_PLIES, PLAYTAK_GAMES_DB, openings_db_configs
+from tak import GameState
+
+DEFAULT_MIX = 'opening=70,filtered=20,game=5,players=5'
+IMPORT_JOB_PATH = '/scheduler/jobs/import_playtak_games/run'
+
+
+@dataclass
+class Workload:
+    db_id: int
+    positions: list[str] # standard TPS
+    weights: list[int] # games reaching each position
+    players: list[str]
+    game_ids: list[int]
+
+
+@dataclass
+class Sample:
+    endpoint: str
+    started: float
+    seconds: float
+    ok: bool
+
+
+@dataclass
+class ImportWindow:
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    errors: list[str] = field(default_factory=list)
+
+    def contains(self, timestamp: float) -> bool:
+        return self.started is not None and self.started <= timestamp and (self.finished is None or timestamp < self.finished)
+
+
+def build_workload(games_db: str, db_id: int, num_games: int, plies: int) -> Workload:
+    """Positions of the first `plies` plies of `num_games` games the openings database `db_id` imports"""
+    config = openings_db_configs[db_id]
+    positions: Counter[str] = Counter()
+    players = set()
+    game_ids = []
+    games = get_games_from_db(
+        games_db,
+        board_size=config.size,
+        num_plies=plies,
+        num_games=num_games,
+        min_rating=config.min_rating,
+        exclude_bots=not config.include_bot_games,
+    )
+    for game in games:
+        game_ids.append(game['id'])
+        players.update((game['player_white'], game['player_black']))
+        state = GameState(config.size)
+        for move in get_moves_array(game['notation'])[:plies]:
+            board, player, _ply_counter = state.get_tps().split(' ')
+            positions[f"{board} {player} {state.ply_counter // 2 + 1}"] += 1
+            state.move(move)
+    if not positions:
+        raise ValueError(f"no games for database {db_id} in {games_db}")
+    return Workload(
+        db_id=db_id,
+        positions=list(positions),
+        weights=list(positions.values()),
+        players=sorted(players),
+        game_ids=game_ids,
+    )
+
+
+def append_games(games_db: str, db_id: int, num_games: int, seed: int):
+    """Appends `num_games` synthetic games of the last day that the openings database `db_id` imports"""
+    config = openings_db_configs[db_id]
+    now = round(time.time() * 1000)
+    options = GeneratorOptions(
+        seed=seed,
+        sizes={config.size: 1},
+        num_players=500,
+        rating_mean=config.min_rating + 300,
+        rating_stdev=200,
+        bot_ratio=0.2 if config.include_bot_games else 0,
+        komis=[0, 4],
+        tournament_ratio=0.05,
+        start_date=now - 24 * 60 * 60 * 1000,
+        end_date=now,
+        min_plies=20,
+        max_plies=100,
+    )
+    generate_games_db(games_db, num_games, options, jobs=os.cpu_count() or 1)
+
+
+def random_settings(rng: random.Random, workload: Workload) -> dict[str, Any]:
+    settings: dict[str, Any] = {}
+    kind = rng.randrange(5)
+    if kind == 0:
+        settings['white'] = rng.choice(workload.players)
+    elif kind == 1:
+        settings['black'] = rng.sample(workload.players, min(2, len(workload.players)))
+    elif kind == 2:
+        settings['min_rating'] = rng.choice((1400, 1600, 1800))
+    elif kind == 3:
+        settings['komi'] = rng.choice(([0], [4], [0, 4]))
+    else:
+        settings['tournament'] = True
+    if rng.random() < 0.3:
+        settings['include_bot_games'] = True
+    return settings
+
+
+def random_request(rng: random.Random, workload: Workload, endpoint: str) -> tuple[str, str, Optional[dict]]:
+    """(method, path, JSON body) of a random request to `endpoint`"""
+    if endpoint in ('opening', 'filtered'):
+        tps = rng.choices(workload.positions, weights=workload.weights)[0]
+        path = f"/api/v1/opening/{workload.db_id}/{quote(tps, safe='/,')}"
+        if endpoint == 'opening':
+            return 'GET', path, None
+        return 'POST', path, random_settings(rng, workload)
+    if endpoint == 'game':
+        return 'GET', f"/api/v1/game/{rng.choice(workload.game_ids)}", None
+    if endpoint == 'players':
+        if rng.random() < 0.5:
+            return 'GET', '/api/v1/players', None
+        prefix = rng.choice(workload.players)[:2]
+        return 'GET', f"/api/v1/players?db_id={workload.db_id}&prefix={quote(prefix)}&limit=20", None
+    raise ValueError(f"unknown endpoint {endpoint}")
+
+
+class FlaskTarget:
+    """Requests to the Flask app in this process, with one test client per thread"""
+    def __init__(self):
+        import server  # pylint: disable=import-outside-toplevel
+        self.server = server
+        self.local = threading.local()
+
+    def wait_for_import(self):
+        print("waiting for the initial import...")
+        while self.server.scheduler.get_job('initial_import') is not None:
+            time.sleep(0.5)
+        # the job was handed to a thread, which takes the lock right away
+        time.sleep(1)
+        with self.server.import_lock:
+            pass
+
+    def request(self, method: str, path: str, body: Optional[dict]) -> int:
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = self.server.app.test_client()
+        return client.open(path, method=method, json=body).status_code
+
+
+class HttpTarget:
+    """Requests to a running server, with one session per thread"""
+    def __init__(self, url: str):
+        self.url = url.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method: str, path: str, body: Optional[dict]) -> int:
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+        return session.request(method, self.url + path, json=body, timeout=300).status_code
+
+
+def run_import(target, window: ImportWindow):
+    window.started = time.perf_counter()
+    try:
+        status = target.request('POST', IMPORT_JOB_PATH, None)
+        if status >= 400:
+            window.errors.append(f"the import failed with status {status}")
+    except requests.RequestException as exc:
+        window.errors.append(f"the import failed: {exc}")
+    finally:
+        window.finished = time.perf_counter()
+
+
+def run_load(
+    target,
+    workload: Workload,
+    mix: dict[str, float],
+    concurrency: int,
+    duration: float,
+    seed: int,
+    during_import: bool,
+) -> tuple[list[Sample], ImportWindow, float]:
+    """Sends requests from `concurrency` threads for `duration` seconds, returns the samples and seconds taken"""
+    samples: list[Sample] = []
+    samples_lock = threading.Lock()
+    window = ImportWindow()
+    started = time.perf_counter()
+    deadline = started + duration
+
+    def send_requests(thread_seed: int):
+        rng = random.Random(thread_seed)
+        endpoints = list(mix)
+        weights = list(mix.values())
+        thread_samples = []
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, weights=weights)[0]
+            method, path, body = random_request(rng, workload, endpoint)
+            request_started = time.perf_counter()
+            try:
+                ok = target.request(method, path, body) < 400
+            except requests.RequestException:
+                ok = False
+            thread_samples.append(Sample(endpoint, request_started, time.perf_counter() - request_started, ok))
+        with samples_lock:
+            samples.extend(thread_samples)
+
+    if during_import:
+        threading.Thread(target=run_import, args=(target, window), daemon=True).start()
+    threads = [threading.Thread(target=send_requests, args=(seed * 1000 + i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, window, time.perf_counter() - started
+
+
+def summarize(samples: list[Sample], seconds: float) -> dict[str, dict[str, float]]:
+    """Throughput and latency percentiles (in ms) per endpoint and of all requests"""
+    by_endpoint: dict[str, list[Sample]] = {}
+    for sample in samples:
+        by_endpoint.setdefault(sample.endpoint, []).append(sample)
+    by_endpoint['all'] = samples
+
+    summary = {}
+    for endpoint, endpoint_samples in by_endpoint.items():
+        if not endpoint_samples:
+            continue
+        latencies = sorted(sample.seconds * 1000 for sample in endpoint_samples)
+        percentiles = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+        summary[endpoint] = {
+            'requests': len(endpoint_samples),
+            'errors': sum(not sample.ok for sample in endpoint_samples),
+            'requests_per_second': round(len(endpoint_samples) / seconds, 1),
+            'p50': round(percentiles[49], 2),
+            'p95': round(percentiles[94], 2),
+            'p99': round(percentiles[98], 2),
+            'max': round(latencies[-1], 2),
+        }
+    return summary
+
+
+def print_summary(title: str, summary: dict[str, dict[str, float]]):
+    print(title)
+    print(f"{'endpoint':<10} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for endpoint, stats in summary.items():
+        print(
+            f"{endpoint:<10} {stats['requests']:>9} {stats['errors']:>7} {stats['requests_per_second']:>8} "
+            f"{stats['p50']:>8} {stats['p95']:>8} {stats['p99']:>8} {stats['max']:>8}"
+        )
+
+
+def parse_mix(mix: str) -> dict[str, float]:
+    """`opening=70,game=30` -> {'opening': 70.0, 'game': 30.0}"""
+    weights = {}
+    for entry in mix.split(','):
+        endpoint, _, weight = entry.partition('=')
+        weights[endpoint] = float(weight or 1)
+    return weights
+
+
+def main(args: list[str]):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', help="base URL of a running server, instead of the Flask app in this process")
+    parser.add_argument('-c', '--concurrency', type=int, default=8, help="threads sending requests")
+    parser.add_argument('-d', '--duration', type=float, default=30, help="seconds to send requests for")
+    parser.add_argument('--db-id', type=int, default=0, help="openings database to query")
+    parser.add_argument('--games-db', default=PLAYTAK_GAMES_DB, help="games database to take the positions from")
+    parser.add_argument('--games', type=int, default=2000, help="games to take the positions from")
+    parser.add_argument('--plies', type=int, default=NUM_PLIES, help="plies of each game to take positions from")
+    parser.add_argument('--mix', type=parse_mix, default=DEFAULT_MIX, help=f"weights of the endpoints, default {DEFAULT_MIX}")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--during-import', action='store_true', help="start an import together with the load")
+    parser.add_argument('--append-games', type=int, default=0, help="synthetic games to add before the import")
+    parser.add_argument('--json', help="JSON file to write the results to")
+    options = parser.parse_args(args)
+
+    workload = build_workload(options.games_db, options.db_id, options.games, options.plies)
+    print(f"{len(workload.positions)} positions of {len(workload.game_ids)} games")
+
+    if options.url:
+        target: Any = HttpTarget(options.url)
+    else:
+        target = FlaskTarget()
+        target.wait_for_import()
+    if options.append_games:
+        append_games(options.games_db, options.db_id, options.append_games, options.seed)
+
+    samples, window, seconds = run_load(
+        target, workload, options.mix, options.concurrency, options.duration, options.seed, options.during_import
+    )
+    results = {'seconds': round(seconds, 3), 'concurrency': options.concurrency, 'all': summarize(samples, seconds)}
+    print_summary(f"{len(samples)} requests in {seconds:.1f}s with {options.concurrency} threads", results['all'])
+
+    if options.during_import:
+        for error in window.errors:
+            print(error)
+        if window.started is not None:
+            load_finished = window.started + seconds
+            import_finished = window.finished if window.finished is not None else load_finished
+            import_seconds = max(min(import_finished, load_finished) - window.started, 0.001)
+            results['during_import'] = summarize([sample for sample in samples if window.contains(sample.started)], import_seconds)
+            print_summary(f"while the import ran ({import_seconds:.1f}s)", results['during_import'])
+            # only meaningful if the import finished well before the load
+            if seconds - import_seconds >= 1:
+                results['after_import'] = summarize(
+                    [sample for sample in samples if not window.contains(sample.started)], seconds - import_seconds
+                )
+                print_summary(f"after the import ({seconds - import_seconds:.1f}s)", results['after_import'])
+
+            if window.finished is None:
+                print("waiting for the import to finish...")
+                while window.finished is None:
+                    time.sleep(0.5)
+            results['import_seconds'] = round(window.finished - window.started, 3)
+            print(f"import took {results['import_seconds']}s")
+
+    if options.json:
+        with open(options.json, 'w', encoding='utf-8') as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])